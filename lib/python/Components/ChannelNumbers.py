@@ -0,0 +1,98 @@
+from os import stat
+
+from enigma import eServiceCenter, eServiceReference
+
+from Tools.Directories import SCOPE_CONFIG, resolveFilename
+
+
+class ChannelNumbers:
+	"""
+	Index of the channel numbers of the bouquets for numeric zapping.  The
+	services of a bouquet are listed once and kept as a dictionary of channel
+	number to service, together with the offset of the bouquet, and the
+	bouquets of a bouquet root are kept as a list.  The index is invalidated
+	when the bouquets are edited, reloaded or renumbered.  As a safety net for
+	code that writes the bouquet files directly it is also invalidated when
+	the configuration directory changes, the bouquet files are written to a
+	temporary file that is then renamed.
+	"""
+	def __init__(self):
+		self.signature = None
+		self.generation = 0  # Counts the invalidations, lets other caches of bouquet contents detect changes.
+		self.bouquets = {}  # Bouquet root string: list of the visible bouquets.
+		self.services = {}  # Bouquet string: (dictionary of channel number to the first service with it, offset).
+		self.numbers = {}  # Bouquet root string: dictionary of channel number to (service, bouquet) of the first bouquet with it.
+
+	def invalidate(self, *args):  # Also used as a notifier of config elements.
+		self.generation += 1
+		self.bouquets.clear()
+		self.services.clear()
+		self.numbers.clear()
+
+	def checkSignature(self):
+		try:
+			status = stat(resolveFilename(SCOPE_CONFIG))
+			signature = (status.st_mtime_ns, status.st_ino)
+		except OSError:
+			signature = None
+		if signature != self.signature:
+			self.signature = signature
+			self.invalidate()
+
+	def getBouquets(self, root):
+		self.checkSignature()
+		key = root.toString()
+		bouquets = self.bouquets.get(key)
+		if bouquets is None:
+			bouquets = self.bouquets[key] = []
+			bouquetList = eServiceCenter.getInstance().list(root)
+			if bouquetList:
+				bouquet = bouquetList.getNext()
+				while bouquet.valid():
+					if bouquet.flags & eServiceReference.isDirectory and not bouquet.flags & eServiceReference.isInvisible:
+						bouquets.append(bouquet)
+					bouquet = bouquetList.getNext()
+		return bouquets
+
+	def getServices(self, bouquet):
+		self.checkSignature()
+		key = bouquet.toString()
+		services = self.services.get(key)
+		if services is None:
+			numbers = {}
+			offset = None
+			serviceList = eServiceCenter.getInstance().list(bouquet)
+			if serviceList:
+				service = serviceList.getNext()
+				while service.valid():
+					number = service.getChannelNum()
+					if number > 0:
+						if offset is None:
+							offset = number - 1
+						if number not in numbers:
+							numbers[number] = service
+					service = serviceList.getNext()
+			services = self.services[key] = (numbers, offset or 0)
+		return services
+
+	def getService(self, bouquet, number):
+		return self.getServices(bouquet)[0].get(number)
+
+	def getOffset(self, bouquet):
+		# The channel number of the first numbered service of the bouquet minus 1.
+		return self.getServices(bouquet)[1]
+
+	def getNumbers(self, root):
+		self.checkSignature()
+		key = root.toString()
+		numbers = self.numbers.get(key)
+		if numbers is None:
+			numbers = self.numbers[key] = {}
+			for bouquet in self.getBouquets(root):
+				for number, service in self.getServices(bouquet)[0].items():
+					if number not in numbers:
+						numbers[number] = (service, bouquet)
+		return numbers
+
+
+channelNumbers = ChannelNumbers()
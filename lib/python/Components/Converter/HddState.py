@@ -1,11 +1,10 @@
 from Components.Converter.Converter import Converter
 from Components.Element import cached
-from Components.Harddisk import harddiskmanager
+from Components.Harddisk import diskActivityMonitor, harddiskmanager
 from Components.config import config
 from Components.SystemInfo import SystemInfo
 from Tools.Hex2strColor import Hex2strColor
 from skin import parameters
-from enigma import eTimer
 
 '''
 	***************************************************************
@@ -43,12 +42,9 @@ class HddState(Converter):
 			self.type = self.EXTERNAL
 		else:
 			self.type = self.ALL
-		self.standby_time = 150
 		self.isActive = False
 		self.state_text = ""
 		self.isHDD()
-		self.timer = eTimer()
-		self.timer.callback.append(self.updateHddState)
 		self.idle_time = int(config.usage.hdd_standby.value)
 		config.usage.hdd_standby.addNotifier(self.setStandbyTime, initial_call=False)
 		self.colors = parameters.get("HddStateColors", (0x00FFFF00, 0x0000FF00))  # standby - yellow, active - green
@@ -56,9 +52,21 @@ class HddState(Converter):
 			self.updateHddState(force=True)
 		if self.onPartitionAddRemove not in harddiskmanager.on_partition_list_change:
 			harddiskmanager.on_partition_list_change.append(self.onPartitionAddRemove)
+		diskActivityMonitor.onStateChanged.append(self.onDiskStateChanged)
+
+	def destroy(self):
+		if self.onPartitionAddRemove in harddiskmanager.on_partition_list_change:
+			harddiskmanager.on_partition_list_change.remove(self.onPartitionAddRemove)
+		if self.onDiskStateChanged in diskActivityMonitor.onStateChanged:
+			diskActivityMonitor.onStateChanged.remove(self.onDiskStateChanged)
+		Converter.destroy(self)
+
+	def onDiskStateChanged(self, disk):
+		# The disk activity monitor reports when a disk went to sleep or woke up.
+		if disk in [hdd[1] for hdd in self.hdd_list]:
+			self.updateHddState()
 
 	def onPartitionAddRemove(self, state, part):
-		self.timer.stop()
 		self.isHDD()
 		self.updateHddState(force=True)
 
@@ -86,16 +94,11 @@ class HddState(Converter):
 						string = Hex2strColor(self.colors[0])
 						string += _("standby ")
 				self.isActive = False
-				idle = self.standby_time
 			else:
 				if self.notDiskLetterName:
 					string = Hex2strColor(self.colors[1])
 					string += _("active ")
 				self.isActive = True
-				idle = self.idle_time
-			if self.idle_time:
-				timeout = len(self.hdd_list) > 1 and self.standby_time or idle
-				self.timer.start(timeout * 100, True)
 		else:
 			self.isActive = False
 		if string:
@@ -107,7 +110,6 @@ class HddState(Converter):
 			self.changed((self.CHANGED_ALL,))
 
 	def setStandbyTime(self, cfgElem):
-		self.timer.stop()
 		self.idle_time = int(cfgElem.value)
 		self.updateHddState(force=True)
 
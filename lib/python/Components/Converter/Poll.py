@@ -1,19 +1,110 @@
+from time import time
+from traceback import print_exc
+
 from enigma import eTimer
 
+from Components.GUIComponent import GUIComponent
+
+
+class PollScheduler:
+	"""
+	Shared timers for all Poll elements.  The elements are grouped by their poll
+	interval and each group is polled in one batch from a single timer.  The
+	timers are aligned to multiples of their interval so that groups with
+	related intervals (e.g. 500, 1000 and 5000 ms) fire in the same main loop
+	wakeup.
+	"""
+	def __init__(self):
+		self.groups = {}  # Dictionary of poll interval to (timer, list of elements).
+		self.resetStatistics()
+
+	def resetStatistics(self):
+		self.since = time()
+		self.wakeups = 0  # Number of times a group timer fired.
+		self.polls = 0  # Number of elements polled.
+		self.skipped = 0  # Number of polls skipped as all renderers of the element were hidden.
+
+	def getStatistics(self):
+		"""
+		Return the timer wakeups per second and the polls per second.  The
+		latter, including skipped polls, is the number of wakeups there would be
+		with one timer per element.
+		"""
+		duration = max(time() - self.since, 0.001)
+		return {
+			"wakeups": self.wakeups / duration,
+			"polls": self.polls / duration,
+			"skipped": self.skipped / duration,
+			"elements": sum(len(group[1]) for group in self.groups.values()),
+			"groups": len(self.groups)
+		}
+
+	def add(self, element, interval):
+		group = self.groups.get(interval)
+		if group is None:
+			timer = eTimer()
+			timer.callback.append(lambda: self.tick(interval))
+			group = self.groups[interval] = (timer, [])
+			self.startTimer(timer, interval)
+		if element not in group[1]:
+			group[1].append(element)
+
+	def remove(self, element, interval):
+		group = self.groups.get(interval)
+		if group and element in group[1]:
+			group[1].remove(element)
+			if not group[1]:
+				group[0].stop()
+				del self.groups[interval]
+
+	def startTimer(self, timer, interval):
+		timer.start(interval - int(time() * 1000) % interval, True)
+
+	def tick(self, interval):
+		group = self.groups.get(interval)
+		if group is None:
+			return
+		self.wakeups += 1
+		elements = group[1]
+		try:
+			for element in elements[:]:  # A poll can enable or disable other elements of the group.
+				if element in elements:
+					try:
+						if element.isPollHidden():
+							self.skipped += 1
+						else:
+							self.polls += 1
+							element.poll()
+					except Exception:  # An element that fails must not stop the other elements of its group.
+						print("[Poll] Error: Poll of %s failed!" % element.__class__.__name__)
+						print_exc()
+		finally:
+			if self.groups.get(interval) is group:
+				self.startTimer(group[0], interval)
+
+
+pollScheduler = PollScheduler()
+
 
 class Poll:
+	POLL_HIDDEN = False  # Set to True in elements that must be polled when their renderers are hidden, e.g. because they show or hide them.
+
 	def __init__(self):
-		self.__poll_timer = eTimer()
-		self.__poll_timer.callback.append(self.poll)
 		self.__interval = 1000
 		self.__enabled = False
+		self.__scheduled = None
+		self.__watching = False
+
+	def __schedule(self, interval):
+		if self.__scheduled is not None:
+			pollScheduler.remove(self, self.__scheduled)
+		self.__scheduled = interval
+		if interval is not None:
+			pollScheduler.add(self, interval)
 
 	def __setInterval(self, interval):
 		self.__interval = interval
-		if self.__enabled:
-			self.__poll_timer.start(self.__interval)
-		else:
-			self.__poll_timer.stop()
+		self.__schedule(self.__interval if self.__enabled else None)
 
 	def __setEnable(self, enabled):
 		self.__enabled = enabled
@@ -25,13 +116,32 @@ class Poll:
 	def poll(self):
 		self.changed((self.CHANGED_POLL,))
 
+	def isPollHidden(self):
+		# True when all the downstream elements are hidden renderers.  These are
+		# watched so the element is polled as soon as one of them is shown again.
+		downstreamElements = getattr(self, "downstream_elements", None)  # Not all Poll elements are converters, e.g. CpuUsageMonitor.
+		if self.POLL_HIDDEN or not downstreamElements:
+			return False
+		for element in downstreamElements:
+			if not isinstance(element, GUIComponent) or element.visible:
+				return False
+		if not self.__watching:
+			self.__watching = True
+			for element in downstreamElements:
+				element.onVisibilityChange.append(self.__visibilityChanged)
+		return True
+
+	def __visibilityChanged(self, visible):
+		if visible and self.__scheduled is not None:
+			self.poll()
+
 	def doSuspend(self, suspended):
 		if self.__enabled:
 			if suspended:
-				self.__poll_timer.stop()
+				self.__schedule(None)
 			else:
 				self.poll()
 				self.poll_enabled = True
 
 	def destroy(self):
-		self.__poll_timer.callback.remove(self.poll)
+		self.__schedule(None)
@@ -1,6 +1,6 @@
 from time import localtime, time, strftime
 
-from enigma import eListbox, eListboxPythonMultiContent, eServiceReference, gFont, eRect, eSize, RT_HALIGN_LEFT, RT_VALIGN_CENTER, BT_SCALE, BT_KEEP_ASPECT_RATIO, BT_ALIGN_CENTER
+from enigma import eListbox, eListboxPythonMultiContent, eServiceReference, eTimer, gFont, eRect, eSize, RT_HALIGN_LEFT, RT_VALIGN_CENTER, BT_SCALE, BT_KEEP_ASPECT_RATIO, BT_ALIGN_CENTER
 
 from skin import parseColor, parseFont, parseScale, applySkinFactor
 from Components.EpgListBase import EPGListBase
@@ -12,6 +12,7 @@ from RecordTimer import RecordTimer
 from Tools.Alternatives import CompareWithAlternatives
 from Tools.Directories import resolveFilename, SCOPE_CURRENT_SKIN
 from Tools.LoadPixmap import LoadPixmap
+from Tools.PixmapLoader import pixmapLoader
 from Tools.TextBoundary import getTextBoundarySize
 
 MAX_TIMELINES = 6
@@ -33,6 +34,11 @@ class EPGListGrid(EPGListBase):
 		self.selectionRect = None
 		self.eventRect = None
 		self.serviceRect = None
+		self.filteredTimerList = {}
+		self.timerMatches = {}
+		self.timerSnapshot = None
+		self.piconInvalidateTimer = eTimer()
+		self.piconInvalidateTimer.callback.append(self.l.invalidate)
 
 		self.nowEvPix = None
 		self.nowSelEvPix = None
@@ -296,10 +302,27 @@ class EPGListGrid(EPGListBase):
 	def preWidgetRemove(self, instance):
 		instance.selectionChanged.get().remove(self.serviceChanged)
 		instance.setContent(None)
+		pixmapLoader.cancel(self.piconLoaded)
+		self.piconInvalidateTimer.stop()
 
 	def serviceChanged(self):
 		self.selectEventFromTime()
 		self.refreshSelection()
+		self.prefetchPicons()
+
+	def prefetchPicons(self):
+		# Load the picons of the current, next and previous page in the background.
+		if self.showPicon and self.list and self.itemHeight:
+			rows = max(self.listHeight // self.itemHeight, 1)
+			index = self.l.getCurrentSelectionIndex()
+			count = len(self.list)
+			services = [self.list[(index + offset) % count][0] for offset in list(range(-rows, 2 * rows)) + list(range(-2 * rows, -rows))]
+			pixmapLoader.prefetch([getPiconName(service) for service in services])
+
+	def piconLoaded(self, path, pixmap):
+		# Redraw the rows showing the placeholder once for all the picons loaded in this main loop iteration.
+		if pixmap is not None and not self.piconInvalidateTimer.isActive():
+			self.piconInvalidateTimer.start(0, True)
 
 	def selectEventFromTime(self):
 		self.selectedService = self.l.getCurrentSelection()
@@ -393,15 +416,12 @@ class EPGListGrid(EPGListBase):
 		for titleItem in self.serviceTitleMode:
 			if titleItem == "picon":
 				if picon is None:
-					# Go find picon and cache its location.
-					picon = getPiconName(service)
-					curIdx = self.l.getCurrentSelectionIndex()
-					self.list[curIdx] = (service, serviceName, events, picon, channel)
+					picon = getPiconName(service)  # The picon locator caches the picon names.
 				piconWidth = self.piconSize.width()
 				piconHeight = self.piconSize.height()
 				displayPicon = None
 				if picon != "":
-					displayPicon = LoadPixmap(picon)
+					displayPicon = pixmapLoader.getPixmap(picon, self.piconLoaded)  # Shows the service name as placeholder until it is loaded.
 				if displayPicon is not None:
 					res.append(MultiContentEntryPixmapAlphaBlend(
 						pos=(colX, r1.top() + self.serviceBorderWidth),
@@ -522,20 +542,14 @@ class EPGListGrid(EPGListBase):
 			end = start + self.timeEpochSecs
 
 			now = time()
+			timerMatches = self.getTimerMatches(service, events)
 			for ev in events:  # (eventId, eventTitle, beginTime, duration)
 				stime = ev[2]
 				duration = ev[3]
 
 				xpos, ewidth = self.calcEventPosAndWidthHelper(stime, duration, start, end, width)
-				serviceref = "1" + service[4:] if service[:4] in config.recording.setstreamto1.value else service  # converts 4097, 5001, 5002 to 1
-				serviceTimers = self.filteredTimerList.get(':'.join(serviceref.split(':')[:11]))
-				if serviceTimers is not None:
-					# Code below: "+ (20 if config.recording.margin_before.value == 0 else 0)"
-					# When recording-start-margin is zero allow recordings that start up to 20 seconds
-					# after the program boundary to still produce matchType in (2, 3). This allows
-					# correct display of "epg/RecordEvent.png" when multiple recodings are programmed to
-					# start at the same instant.
-					timer, matchType = RecordTimer.isInTimerOnService(serviceTimers, stime + (20 if config.recording.margin_before.value == 0 else 0), duration)
+				if timerMatches is not None:
+					timer, matchType = timerMatches[(stime, duration)]
 					timerIcon, autoTimerIcon = self.getPixmapsForTimer(timer, matchType, selected)
 					if matchType not in (2, 3):
 						timer = None
@@ -821,12 +835,23 @@ class EPGListGrid(EPGListBase):
 		if eventList and len(eventList) > 0:
 			appendService()
 
+		for service in self.list:
+			if service[2]:
+				self.getTimerMatches(service[0], service[2])
 		self.l.setList(self.list)
 		self.recalcEventSize()
+		self.prefetchPicons()
 
 	def snapshotTimers(self, startTime, endTime):
 		# take a snapshot of the timers relevant to the span of the grid and index them by service
 		# We scan the entire timerlist as pending timers and in progress timers are sorted differently
+		# The snapshot and the timer matches of the events are kept until a timer or the span changes.
+		recordTimer = self.session.nav.RecordTimer
+		snapshot = (recordTimer.getGeneration(), startTime, endTime, config.recording.margin_before.value, config.recording.margin_after.value, config.recording.setstreamto1.value)
+		if snapshot == self.timerSnapshot:
+			return
+		self.timerSnapshot = snapshot
+		self.timerMatches = {}
 		self.filteredTimerList = {}
 		for timer in self.session.nav.RecordTimer.timer_list:
 			# repeat timers represent all their future repetitions, so always include them
@@ -839,6 +864,28 @@ class EPGListGrid(EPGListBase):
 				else:
 					srefl.append(timer)
 
+	def getTimerMatches(self, service, events):
+		# Returns the (timer, matchType) of the events of the service by (begin time, duration),
+		# or None if there are no timers on the service.
+		serviceref = "1" + service[4:] if service[:4] in config.recording.setstreamto1.value else service  # converts 4097, 5001, 5002 to 1
+		serviceref = ':'.join(serviceref.split(':')[:11])
+		serviceTimers = self.filteredTimerList.get(serviceref)
+		if serviceTimers is None:
+			return None
+		matches = self.timerMatches.get(serviceref)
+		if matches is None:
+			matches = self.timerMatches[serviceref] = {}
+		# When recording-start-margin is zero allow recordings that start up to 20 seconds
+		# after the program boundary to still produce matchType in (2, 3). This allows
+		# correct display of "epg/RecordEvent.png" when multiple recodings are programmed to
+		# start at the same instant.
+		offset = 20 if config.recording.margin_before.value == 0 else 0
+		for ev in events:
+			span = (ev[2], ev[3])
+			if span not in matches:
+				matches[span] = RecordTimer.isInTimerOnService(serviceTimers, ev[2] + offset, ev[3])
+		return matches
+
 	def getChannelNumber(self, service):
 		if service.ref and "0:0:0:0:0:0:0:0:0" not in service.ref.toString():
 			return service.ref.getChannelNum() or None
@@ -1,12 +1,14 @@
 import errno
 from os import listdir, major, path as ospath, rmdir, sep as ossep, stat, statvfs, system as ossystem, unlink  # minor
 from fcntl import ioctl
+from select import POLLPRI, poll
 from time import sleep, time
 
 from enigma import eTimer
 from Components.SystemInfo import SystemInfo
 import Components.Task
 from Tools.CList import CList
+from Tools.Directories import clearResolveLists
 
 # DEBUG: REMINDER: This comment needs to be expanded for the benefit of readers.
 # Removable if 1 --> With motor
@@ -80,37 +82,163 @@ def runCommand(command):
 	return exitStatus
 
 
+class MountTable:
+	"""
+	The parsed /proc/mounts.  It is only read again when the kernel reports a
+	change of the mounts with POLLPRI on /proc/self/mounts, or after a hotplug
+	event.  The real file system types of fuseblk mounts are looked up with
+	blkid once per device.
+	"""
+	def __init__(self):
+		self.mounts = None
+		self.mountPoints = []  # The mount points, longest first.
+		self.fuseblkTypes = {}  # Dictionary of device to file system type.
+		self.poller = None
+		try:
+			self.fd = open("/proc/self/mounts", "r")
+			self.poller = poll()
+			self.poller.register(self.fd, POLLPRI)
+		except (IOError, OSError) as err:
+			print("[Harddisk][MountTable] Error: Unable to watch '/proc/self/mounts', the mounts are read every time!", err)
+
+	def invalidate(self, devicesChanged=False):
+		self.mounts = None
+		if devicesChanged:
+			self.fuseblkTypes.clear()
+
+	def getMounts(self):
+		if self.poller is None or self.poller.poll(0):  # Polling also clears the change for the next poll.
+			self.mounts = None
+		if self.mounts is None:
+			self.read()
+		return self.mounts
+
+	def getMountPoints(self):
+		self.getMounts()
+		return self.mountPoints
+
+	def read(self):
+		try:
+			with open("/proc/mounts", "r") as fd:
+				lines = fd.readlines()
+		except (IOError, OSError) as err:
+			print("[Harddisk][getProcMounts] Error: Failed to open '/proc/mounts':", err)
+			self.mounts = []
+			self.mountPoints = []
+			return
+		result = [line.strip().split(" ") for line in lines]
+		for item in result:
+			item[1] = item[1].replace("\\040", " ")  # Spaces are encoded as \040 in mounts.
+			# Also, map any fuseblk fstype to the real file-system behind it...
+			# Use blkid to get the info we need....
+			#
+			if item[2] == 'fuseblk':
+				fstype = self.fuseblkTypes.get(item[0])
+				if fstype is None:
+					import subprocess
+					res = subprocess.run(['blkid', '-sTYPE', '-ovalue', item[0]], capture_output=True)
+					if res.returncode == 0:
+						# print("[Harddisk][getProcMounts] fuseblk", res.stdout)
+						fstype = self.fuseblkTypes[item[0]] = res.stdout.strip().decode()
+				if fstype:
+					item[2] = fstype
+		# print("[Harddisk][getProcMounts] ProcMounts", result)
+		self.mounts = result
+		self.mountPoints = sorted(set(item[1] for item in result if len(item) > 2), key=len, reverse=True)
+
+
+mountTable = MountTable()
+
+
 def getProcMounts():
-	try:
-		with open("/proc/mounts", "r") as fd:
-			lines = fd.readlines()
-	except (IOError, OSError) as err:
-		print("[Harddisk][getProcMounts] Error: Failed to open '/proc/mounts':", err)
-		return []
-	result = [line.strip().split(" ") for line in lines]
-	for item in result:
-		item[1] = item[1].replace("\\040", " ")  # Spaces are encoded as \040 in mounts.
-		# Also, map any fuseblk fstype to the real file-system behind it...
-		# Use blkid to get the info we need....
-		#
-		if item[2] == 'fuseblk':
-			import subprocess
-			res = subprocess.run(['blkid', '-sTYPE', '-ovalue', item[0]], capture_output=True)
-			if res.returncode == 0:
-				# print("[Harddisk][getProcMounts] fuseblk", res.stdout)
-				item[2] = res.stdout.strip().decode()
-	# print("[Harddisk][getProcMounts] ProcMounts", result)
-	return result
+	return [item[:] for item in mountTable.getMounts()]  # Copies, so callers can not change the cached mounts.
 
 
 def findMountPoint(path):
 	'Example: findMountPoint("/media/hdd/some/file") returns "/media/hdd"'
 	path = ospath.abspath(path)
+	for mountPoint in mountTable.getMountPoints():  # The longest mount point that is a prefix of the path.
+		if path == mountPoint or path.startswith(mountPoint if mountPoint.endswith("/") else mountPoint + "/"):
+			return mountPoint
 	while not ospath.ismount(path):
 		path = ospath.dirname(path)
 	return path
 
 
+class DiskActivityMonitor:
+	"""
+	Shared monitor of the activity of the disks with an idle time.  One timer
+	reads the statistics of all the disks from /proc/diskstats in one pass.
+	While a disk is awake it is checked 10 times per idle time, and less often
+	the longer no access is seen, but always when its idle time expires.  Disks
+	that sleep are only checked every SLEEP_INTERVAL seconds to notice that
+	they woke up.  The read and write throughput of the disks is kept for the
+	UI and converters.
+	"""
+	MIN_INTERVAL = 1  # Minimum number of seconds between two checks.
+	SLEEP_INTERVAL = 60  # Number of seconds between checks while all disks sleep.
+
+	def __init__(self):
+		self.disks = []
+		self.timer = eTimer()
+		self.timer.callback.append(self.poll)
+		self.lastPoll = 0
+		self.onStateChanged = CList()  # Called with the disk when it went to sleep or woke up.
+
+	def add(self, disk):
+		if disk not in self.disks:
+			self.disks.append(disk)
+		self.schedule()
+
+	def remove(self, disk):
+		if disk in self.disks:
+			self.disks.remove(disk)
+		self.schedule()
+
+	def readDiskStats(self):
+		# Dictionary of device to (read I/Os, read sectors, write I/Os, write sectors).
+		stats = {}
+		try:
+			with open("/proc/diskstats", "r") as fd:
+				for line in fd:
+					fields = line.split()
+					if len(fields) > 9:
+						stats[fields[2]] = (int(fields[3]), int(fields[5]), int(fields[7]), int(fields[9]))
+		except (IOError, OSError) as err:
+			print("[Harddisk][DiskActivityMonitor] Error: Failed to read '/proc/diskstats'!", err)
+		return stats
+
+	def poll(self):
+		# Update the statistics of all the disks, e.g. before showing their throughput.
+		now = time()
+		stats = self.readDiskStats()
+		changed = [disk for disk in self.disks if disk.updateActivity(now, stats.get(disk.device))]
+		self.lastPoll = now
+		for disk in changed:
+			self.onStateChanged(disk)
+		self.schedule(now)
+
+	def schedule(self, now=None):
+		if now is None:
+			now = time()
+		interval = None
+		for disk in self.disks:
+			if disk.max_idle_time:
+				if disk.is_sleeping:
+					check = self.SLEEP_INTERVAL
+				else:
+					quiet = now - disk.last_access
+					check = min(max(disk.max_idle_time / 10.0, quiet / 4.0), disk.last_access + disk.max_idle_time - now)
+				interval = check if interval is None else min(interval, check)
+		if interval is None:
+			self.timer.stop()
+		else:
+			self.timer.start(int(max(interval, self.MIN_INTERVAL) * 1000), True)
+
+
+diskActivityMonitor = DiskActivityMonitor()
+
+
 def internalHDDNotSleeping():
 	if harddiskmanager.HDDCount():
 		for hdd in harddiskmanager.HDDList():
@@ -150,7 +278,9 @@ class Harddisk:
 		self.idle_running = False
 		self.last_access = time()
 		self.last_stat = 0
-		self.timer = None
+		self.last_update = None
+		self.read_sectors = self.write_sectors = 0
+		self.read_rate = self.write_rate = 0  # Bytes per second between the last two checks.
 		self.is_sleeping = False
 		self.dev_path = ""
 		self.disk_path = ""
@@ -188,9 +318,7 @@ class Harddisk:
 			return "%s%s" % (self.dev_path, n)
 
 	def stop(self):
-		if self.timer:
-			self.timer.stop()
-			self.timer.callback.remove(self.runIdle)
+		diskActivityMonitor.remove(self)
 
 	def bus(self):
 		if self.internal:
@@ -487,25 +615,40 @@ class Harddisk:
 			exitCode = runCommand("sdparm --set=SCT=0 %s" % self.disk_path)
 			if exitCode:
 				runCommand("hdparm -S0 %s" % self.disk_path)
-		self.timer = eTimer()
-		self.timer.callback.append(self.runIdle)
 		self.idle_running = True
-		self.setIdleTime(self.max_idle_time)  # Kick the idle polling loop.
+		diskActivityMonitor.add(self)
 
 	def runIdle(self):
+		diskActivityMonitor.poll()
+
+	def updateActivity(self, now, stats):
+		# Called by the disk activity monitor with (read I/Os, read sectors, write
+		# I/Os, write sectors), returns True if the disk went to sleep or woke up.
+		if stats is None:
+			readIOs, writeIOs = self.readStats()
+			stats = (readIOs, 0, writeIOs, 0)
+		if self.last_update is not None and now > self.last_update:
+			self.read_rate = max(stats[1] - self.read_sectors, 0) * 512 / (now - self.last_update)
+			self.write_rate = max(stats[3] - self.write_sectors, 0) * 512 / (now - self.last_update)
+		self.last_update = now
+		self.read_sectors = stats[1]
+		self.write_sectors = stats[3]
 		if not self.max_idle_time:
-			return
-		now = time()
-		idle_time = now - self.last_access
-		stats = sum(self.readStats())
-		if stats != self.last_stat and stats >= 0:  # There has been disk access.
-			self.last_stat = stats
+			return False
+		wasSleeping = self.is_sleeping
+		accesses = stats[0] + stats[2]
+		if accesses != self.last_stat and accesses >= 0:  # There has been disk access.
+			self.last_stat = accesses
 			self.last_access = now
-			idle_time = 0
 			self.is_sleeping = False
-		if idle_time >= self.max_idle_time and not self.is_sleeping:
+		elif now - self.last_access >= self.max_idle_time and not self.is_sleeping:
 			self.setSleep()
 			self.is_sleeping = True
+		return self.is_sleeping != wasSleeping
+
+	def getThroughput(self):
+		# Returns the read and write throughput in bytes per second, as of the last check of the disk activity monitor.
+		return self.read_rate, self.write_rate
 
 	def setSleep(self):
 		if self.internal:
@@ -518,10 +661,7 @@ class Harddisk:
 	def setIdleTime(self, idle):
 		self.max_idle_time = idle
 		if self.idle_running:
-			if not idle:
-				self.timer.stop()
-			else:
-				self.timer.start(idle * 100, False)  # Poll 10 times per period.
+			diskActivityMonitor.schedule()
 
 	def isSleeping(self):
 		return self.is_sleeping
@@ -782,6 +922,8 @@ class HarddiskManager:
 	#
 	def addHotplugPartition(self, device, physDevice=None):
 		print("[Harddisk] Evaluating hotplug connected device...")
+		mountTable.invalidate(devicesChanged=True)
+		clearResolveLists()  # Skin and font directories may be on the device.
 		print("[Harddisk] DEBUG: device = '%s', physDevice = '%s'" % (device, physDevice))
 		HDDin = error = removable = isCdrom = blacklisted = False
 		mediumFound = True
@@ -836,6 +978,8 @@ class HarddiskManager:
 
 	def removeHotplugPartition(self, device):
 		print("[Harddisk] Evaluating hotplug disconnected device...")
+		mountTable.invalidate(devicesChanged=True)
+		clearResolveLists()  # Skin and font directories may be on the device.
 		hddDev, part = self.splitDeviceName(device)  # Separate the device from the partition.
 		for partition in self.partitions:
 			if partition.device is None:
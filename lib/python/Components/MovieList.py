@@ -1,7 +1,9 @@
-from os import path, stat
+from os import makedirs, path, replace, scandir, stat
+from pickle import dump, load
 import struct
 import random
 from time import localtime, strftime
+from zlib import crc32
 from chardet import detect
 
 from enigma import eListboxPythonMultiContent, eListbox, gFont, iServiceInformation, eSize, RT_HALIGN_LEFT, RT_HALIGN_RIGHT, RT_VALIGN_CENTER, BT_SCALE, BT_KEEP_ASPECT_RATIO, BT_HALIGN_CENTER, BT_ALIGN_CENTER, BT_VALIGN_CENTER, eServiceReference, eServiceCenter, eTimer
@@ -11,7 +13,7 @@ from Components.GUIComponent import GUIComponent
 from Components.MultiContent import MultiContentEntryText, MultiContentEntryPixmapAlphaBlend, MultiContentEntryProgress
 from Components.Renderer.Picon import getPiconName
 from Screens.LocationBox import defaultInhibitDirs
-from Tools.Directories import SCOPE_CURRENT_SKIN, resolveFilename
+from Tools.Directories import SCOPE_CONFIG, SCOPE_CURRENT_SKIN, resolveFilename
 from Tools.FuzzyDate import FuzzyTime
 from Tools.LoadPixmap import LoadPixmap
 from Tools.Trashcan import getTrashFolder, isTrashFolder
@@ -103,17 +105,164 @@ class StubInfo:
 
 justStubInfo = StubInfo()
 
+MOVIE_INDEX_VERSION = 1
+
+
+class MovieIndex:
+	"""
+	Metadata of the files in one recording directory, kept in memory and in
+	/etc/enigma2/movieindex/.  The name, tags, begin time, length and file size
+	of a file are reused while the mtime and size of the file and the mtime of
+	its .meta file are unchanged, the last play position while its .cuts file
+	is unchanged.
+	"""
+	def __init__(self, directory):
+		self.directory = directory
+		self.fileName = path.join(resolveFilename(SCOPE_CONFIG, "movieindex"), "%08x.pkl" % crc32(directory.encode("UTF-8", "surrogateescape")))
+		self.entries = {}  # File name to [key, name, tags, begin, length, file size, cuts key, last play position].
+		self.files = {}  # File name to DirEntry of the last scan.
+		self.changed = False
+		self.saveTimer = eTimer()
+		self.saveTimer.callback.append(self.save)
+		try:
+			with open(self.fileName, "rb") as fd:
+				index = load(fd)
+			if index["version"] == MOVIE_INDEX_VERSION and index["directory"] == directory:
+				self.entries = index["entries"]
+		except (IOError, OSError):
+			pass
+		except Exception as err:
+			print("[MovieList] Error: Unable to read movie index '%s'!  (%s)" % (self.fileName, str(err)))
+
+	def scan(self):
+		files = {}
+		try:
+			for entry in scandir(self.directory):
+				files[entry.name] = entry
+		except (IOError, OSError) as err:
+			print("[MovieList] Error: Unable to scan '%s'!  (%s)" % (self.directory, str(err)))
+		self.files = files
+		for name in [x for x in self.entries if x not in files]:  # Forget the files that are gone.
+			del self.entries[name]
+			self.changed = True
+
+	def stat(self, name):
+		entry = self.files.get(name)
+		if entry is not None:
+			try:
+				return entry.stat()
+			except (IOError, OSError):
+				pass
+		return None
+
+	def getInfo(self, serviceref, serviceHandler):
+		"""Return an IndexedInfo for a file of the directory or None if the file was not found by the last scan."""
+		name = path.basename(serviceref.getPath())
+		fileStat = self.stat(name)
+		if fileStat is None:
+			return None
+		metaStat = self.stat("%s.meta" % name)
+		key = (fileStat.st_mtime, fileStat.st_size, metaStat and metaStat.st_mtime)
+		entry = self.entries.get(name)
+		info = None
+		if entry is None or entry[0] != key:
+			info = serviceHandler.info(serviceref) or justStubInfo
+			getInfoObject = getattr(info, "getInfoObject", info.getInfo)
+			entry = self.entries[name] = [key, info.getName(serviceref), info.getInfoString(serviceref, iServiceInformation.sTags), info.getInfo(serviceref, iServiceInformation.sTimeCreate), None, getInfoObject(serviceref, iServiceInformation.sFileSize), None, None]
+			self.setChanged()
+		return IndexedInfo(self, serviceref, entry, info)
+
+	def setChanged(self):
+		self.changed = True
+		if not self.saveTimer.isActive():
+			self.saveTimer.start(10000, True)
+
+	def save(self):
+		self.saveTimer.stop()
+		if self.changed:
+			self.changed = False
+			try:
+				makedirs(path.dirname(self.fileName), exist_ok=True)
+				with open("%s.tmp" % self.fileName, "wb") as fd:
+					dump({"version": MOVIE_INDEX_VERSION, "directory": self.directory, "entries": self.entries}, fd)
+				replace("%s.tmp" % self.fileName, self.fileName)
+			except (IOError, OSError) as err:
+				print("[MovieList] Error: Unable to write movie index '%s'!  (%s)" % (self.fileName, str(err)))
+
+
+movieIndexes = {}
+
+
+def getMovieIndex(directory):
+	directory = path.normpath(directory)
+	index = movieIndexes.get(directory)
+	if index is None:
+		index = movieIndexes[directory] = MovieIndex(directory)
+	return index
+
+
+class IndexedInfo:
+	"""
+	iStaticServiceInformation answering the common queries of the movie list
+	from the movie index.  Everything else is passed on to the service
+	information, which is only created when needed.
+	"""
+	def __init__(self, index, serviceref, entry, info=None):
+		self.index = index
+		self.serviceref = serviceref
+		self.entry = entry
+		self.info = info
+
+	def getServiceInfo(self):
+		if self.info is None:
+			self.info = eServiceCenter.getInstance().info(self.serviceref) or justStubInfo
+		return self.info
+
+	def __getattr__(self, name):
+		return getattr(self.getServiceInfo(), name)
+
+	def getName(self, serviceref):
+		return self.entry[1]
+
+	def getLength(self, serviceref):
+		if self.entry[4] is None:
+			self.entry[4] = self.getServiceInfo().getLength(serviceref)
+			self.index.setChanged()
+		return self.entry[4]
+
+	def getInfo(self, serviceref, w):
+		if w == iServiceInformation.sTimeCreate:
+			return self.entry[3]
+		return self.getServiceInfo().getInfo(serviceref, w)
+
+	def getInfoString(self, serviceref, w):
+		if w == iServiceInformation.sTags:
+			return self.entry[2]
+		return self.getServiceInfo().getInfoString(serviceref, w)
+
+	def getInfoObject(self, serviceref, w):
+		if w == iServiceInformation.sFileSize:
+			return self.entry[5]
+		return self.getServiceInfo().getInfoObject(serviceref, w)
+
+	def getCutsLastPosition(self, cutsFileName):
+		cutsStat = stat(cutsFileName)  # Raises an error for a missing file like reading it would.
+		key = (cutsStat.st_mtime, cutsStat.st_size)
+		if self.entry[6] != key:
+			self.entry[7] = getCutsLastPosition(cutsFileName)
+			self.entry[6] = key
+			self.index.setChanged()
+		return self.entry[7]
+
 
 def lastPlayPosFromCache(ref):
 	from Screens.InfoBarGenerics import resumePointCache
 	return resumePointCache.get(ref.toString(), None)
 
 
-def moviePlayState(cutsFileName, ref, length):
-	"""Returns None, 0..100 for percentage"""
-	try:
-		# read the cuts file first
-		f = open(cutsFileName, 'rb')
+def getCutsLastPosition(cutsFileName):
+	"""Return the last play position of a .cuts file, None if it has none."""
+	with open(cutsFileName, 'rb') as f:
 		lastPosition = None
 		while True:
 			data = f.read(cutsParser.size)
@@ -122,7 +271,14 @@ def moviePlayState(cutsFileName, ref, length):
 			cut, cutType = cutsParser.unpack(data)
 			if cutType == 3:  # undocumented, but 3 appears to be the stop
 				lastPosition = cut
-		f.close()
+	return lastPosition
+
+
+def moviePlayState(cutsFileName, ref, length, readLastPosition=getCutsLastPosition):
+	"""Returns None, 0..100 for percentage"""
+	try:
+		# read the cuts file first
+		lastPosition = readLastPosition(cutsFileName)
 		# See what we have in RAM (it might help)
 		last = lastPlayPosFromCache(ref)
 		if last:
@@ -209,6 +365,8 @@ class MovieList(GUIComponent):
 	UsingTrashSort = False
 	InTrashFolder = False
 
+	LOAD_CHUNK = 50  # Number of entries handled per main loop iteration by a progressive load.
+
 	def __init__(self, root, sort_type=None, descr_state=None, allowCollections=False):
 		GUIComponent.__init__(self)
 		self.list = []
@@ -238,6 +396,12 @@ class MovieList(GUIComponent):
 		if config.usage.time.wide.value:
 			self.dateWidth = int(self.dateWidth * 1.15)
 		self.reloadDelayTimer = None
+		self.loader = None
+		self.loadTimer = eTimer()
+		self.loadTimer.callback.append(self.loadNext)
+		self.onLoaded = None
+		self.pageShown = False
+		self.removedWhileLoading = []
 		self.l = eListboxPythonMultiContent()  # noqa: E741
 		self.tags = set()
 		self.markList = []
@@ -499,7 +663,7 @@ class MovieList(GUIComponent):
 			elif (self.playInBackground or self.playInForeground) and serviceref == (self.playInBackground or self.playInForeground):
 				data.icon = self.iconMoviePlay
 			else:
-				data.part = moviePlayState(pathName + '.cuts', serviceref, data.len)
+				data.part = moviePlayState(pathName + '.cuts', serviceref, data.len, getattr(info, "getCutsLastPosition", getCutsLastPosition))
 				if switch == 'i':
 					if data.part > 0:
 						data.icon = self.iconPart[data.part // 25]
@@ -627,18 +791,72 @@ class MovieList(GUIComponent):
 		self.setFontsize()
 
 	def preWidgetRemove(self, instance):
+		self.stopLoading()
 		instance.setContent(None)
 		instance.selectionChanged.get().remove(self.selectionChanged)
 
-	def reload(self, root=None, filter_tags=None, collection=None):
+	def reload(self, root=None, filter_tags=None, collection=None, onLoaded=None):
+		# If onLoaded is given the list is loaded progressively.  The first
+		# entries are shown as soon as they are read, the rest of the directory
+		# is loaded in the background and onLoaded is called when the list is
+		# complete.
 		if self.reloadDelayTimer is not None:
 			self.reloadDelayTimer.stop()
 			self.reloadDelayTimer = None
-		if root is not None:
+		self.stopLoading()
+		if root is None:
+			root = self.root
+		self.l.setBuildFunc(self.buildMovieListEntry)  # don't move that to __init__ as this will create memory leak when calling MovieList from WebIf
+		if onLoaded is None:
 			self.load(root, filter_tags, collection)
+			self.refreshDisplay()
 		else:
-			self.load(self.root, filter_tags, collection)
-		self.l.setBuildFunc(self.buildMovieListEntry)  # don't move that to __init__ as this will create memory leak when calling MovieList from WebIf
+			self.loader = self.loadSteps(root, filter_tags, collection)
+			self.onLoaded = onLoaded
+			self.pageShown = False
+			self.loadNext()
+
+	def isLoading(self):
+		return self.loader is not None
+
+	def stopLoading(self):
+		if self.loader is not None:
+			self.loadTimer.stop()
+			self.loader.close()
+			self.loader = None
+			self.onLoaded = None
+			del self.removedWhileLoading[:]
+
+	def loadNext(self):
+		try:
+			state = next(self.loader)
+		except StopIteration:
+			pass
+		else:
+			if state is not None and not self.pageShown:
+				self.showFirstPage(*state)
+			self.loadTimer.start(0, True)
+			return
+		# The list is complete, keep the selection of the first page.
+		current = self.getCurrent() if self.pageShown else None
+		self.loader = None
+		if self.removedWhileLoading:
+			self.list = [x for x in self.list if x[0] not in self.removedWhileLoading]
+			del self.removedWhileLoading[:]
+		self.refreshDisplay()
+		if current:
+			self.moveTo(current)
+		onLoaded = self.onLoaded
+		self.onLoaded = None
+		onLoaded()
+
+	def showFirstPage(self, movieList, numberOfDirs, firstDir, parent):
+		# Show the entries read so far, sorted like the complete list will be.
+		self.pageShown = True
+		self.current_sort = getattr(self, "temp_sort", self.sort_type)
+		self.list = self.sortList(sorted(movieList, key=self.buildGroupwiseSortkey), numberOfDirs, firstDir)
+		self.firstFileEntry = numberOfDirs
+		self.parentDirectory = self.findParentDirectory(self.list, numberOfDirs, parent)
 		self.refreshDisplay()
 
 	def refreshDisplay(self):
@@ -652,6 +870,8 @@ class MovieList(GUIComponent):
 			self.l.setList(self.list)
 
 	def removeService(self, service):
+		if self.loader is not None:
+			self.removedWhileLoading.append(service)
 		for index, item in enumerate(self.list):
 			if item[0] == service:
 				self.removeMark(item[0])
@@ -690,7 +910,20 @@ class MovieList(GUIComponent):
 	def load(self, root, filter_tags, collectionName=None):
 		# this lists our root service, then building a
 		# nice list
-		del self.list[:]
+		for state in self.loadSteps(root, filter_tags, collectionName):
+			pass
+
+	def loadSteps(self, root, filter_tags, collectionName=None):
+		"""
+		Generator doing the work of load().  It yields after every LOAD_CHUNK
+		directory entries, items of a collection grouping or auto tags so that
+		a progressive load can give control back to the main loop.  While the
+		directory is read the yielded value is (entries so far, number of
+		directories, index of the first directory, parent directory),
+		otherwise None.  self.list
+		is only replaced when the list is complete.
+		"""
+		movieList = []
 		del self.markList[:]
 		serviceHandler = eServiceCenter.getInstance()
 		numberOfDirs = 0
@@ -701,6 +934,7 @@ class MovieList(GUIComponent):
 		reflist = root and serviceHandler.list(root)
 		if reflist is None:
 			print("listing of movies failed")
+			del self.list[:]
 			return
 		realtags = set()
 		autotags = {}
@@ -715,7 +949,7 @@ class MovieList(GUIComponent):
 				data = MovieListData()
 				data.txt = ".."
 				data.directorySize = None
-				self.list.append((eServiceReference.fromDirectory(currentFolder), None, 0, data))
+				movieList.append((eServiceReference.fromDirectory(currentFolder), None, 0, data))
 				numberOfDirs += 1
 			elif parent and (parent not in defaultInhibitDirs) and not currentFolder.endswith(config.usage.default_path.value):
 				# enigma wants an extra '/' appended
@@ -725,7 +959,7 @@ class MovieList(GUIComponent):
 				data = MovieListData()
 				data.txt = ".."
 				data.directorySize = None
-				self.list.append((ref, None, 0, data))
+				movieList.append((ref, None, 0, data))
 				numberOfDirs += 1
 		firstDir = numberOfDirs
 
@@ -735,23 +969,31 @@ class MovieList(GUIComponent):
 		else:
 			MovieList.InTrashFolder = False
 		MovieList.UsingTrashSort = False
+		index = getMovieIndex(rootPath)
+		index.scan()
 		if MovieList.InTrashFolder:
 			if (config.usage.trashsort_deltime.value == "show record time"):
 				MovieList.UsingTrashSort = MovieList.TRASHSORT_SHOWRECORD
 			elif (config.usage.trashsort_deltime.value == "show delete time"):
 				MovieList.UsingTrashSort = MovieList.TRASHSORT_SHOWDELETE
 
+		count = 0
 		while True:
 			serviceref = reflist.getNext()
 			if not serviceref.valid():
 				break
+			count += 1
+			if count % self.LOAD_CHUNK == 0:
+				yield (movieList, numberOfDirs, firstDir, parent)
 			if config.ParentalControl.servicepinactive.value and config.ParentalControl.storeservicepin.value != "never":
 				from Components.ParentalControl import parentalControl
 				if not parentalControl.sessionPinCached and parentalControl.isProtected(serviceref):
 					continue
-			info = serviceHandler.info(serviceref)
+			info = None if serviceref.flags & eServiceReference.mustDescent else index.getInfo(serviceref, serviceHandler)
 			if info is None:
-				info = justStubInfo
+				info = serviceHandler.info(serviceref)
+				if info is None:
+					info = justStubInfo
 			begin = info.getInfo(serviceref, iServiceInformation.sTimeCreate)
 			begin2 = 0
 			name = info.getName(serviceref)
@@ -759,11 +1001,11 @@ class MovieList(GUIComponent):
 			if name[:2] == "._":
 				continue
 			if MovieList.UsingTrashSort:
-				f_path = serviceref.getPath()
-				if path.exists(f_path):  # Override with deltime for sorting
+				fileStat = index.stat(path.basename(serviceref.getPath().rstrip("/")))
+				if fileStat is not None:  # Override with deltime for sorting
 					if MovieList.UsingTrashSort == MovieList.TRASHSORT_SHOWRECORD:
 						begin2 = begin      # Save for later re-instatement
-					begin = stat(f_path).st_ctime
+					begin = fileStat.st_ctime
 
 			# Filter on a specific collections. Users don't care about case of the name
 			if collectionName and collectionName.lower() != name.strip().lower():
@@ -771,15 +1013,16 @@ class MovieList(GUIComponent):
 
 			if not collectionName and serviceref.flags & eServiceReference.mustDescent:
 				if not name.endswith('.AppleDouble/') and not name.endswith('.AppleDesktop/') and not name.endswith('.AppleDB/') and not name.endswith('Network Trash Folder/') and not name.endswith('Temporary Items/'):
+					dirStat = index.stat(path.basename(serviceref.getPath().rstrip("/")))
 					try:
-						begin = stat(serviceref.getPath()).st_mtime
+						begin = dirStat.st_mtime if dirStat is not None else stat(serviceref.getPath()).st_mtime
 					except (FileNotFoundError, PermissionError):  # possibly os.stat failed due to unavailable mount or a permission error over a network mount
 						begin = 0
 						import traceback
 						traceback.print_exc()
 					data = MovieListData()
 					data.txt = getItemDisplayNameText(serviceref, info)
-					self.list.append((serviceref, info, begin, data))
+					movieList.append((serviceref, info, begin, data))
 					numberOfDirs += 1
 				continue
 
@@ -809,16 +1052,18 @@ class MovieList(GUIComponent):
 			data = MovieListData()
 			data.txt = getItemDisplayNameText(serviceref, info)
 			if begin2 != 0:
-				self.list.append((serviceref, info, begin, data, begin2))
+				movieList.append((serviceref, info, begin, data, begin2))
 			else:
-				self.list.append((serviceref, info, begin, data))
+				movieList.append((serviceref, info, begin, data))
 
 		if not collectionName and collectionMode and self.allowCollections:
 			# not displaying the contents of a collection, group similar named
 			# recordings into collections ignoring case
 			groupedFiles = {}
 			items = []
-			for item in self.list:
+			for count, item in enumerate(movieList):
+				if count % self.LOAD_CHUNK == self.LOAD_CHUNK - 1:
+					yield None
 				if item[0].flags & eServiceReference.mustDescent:
 					items.append(item)
 				else:
@@ -853,11 +1098,9 @@ class MovieList(GUIComponent):
 					serviceref = eServiceReference(eServiceReference.idFile, eServiceReference.isGroup, data.txt)
 					# For the age of the collection, we use the record time of the newest item in the group
 					items.append((serviceref, serviceref.info(), groupedItems[-1][2], data))
-			self.list = items
+			movieList = items
 
-		self.firstFileEntry = numberOfDirs
-		self.parentDirectory = 0
-		self.list.sort(key=self.buildGroupwiseSortkey)
+		movieList.sort(key=self.buildGroupwiseSortkey)
 
 		# Have we had a temporary sort method override set in MovieSelectiom.py?
 		# If so use it, remove it (it's a one-off) and set the current method so
@@ -870,44 +1113,58 @@ class MovieList(GUIComponent):
 		except:
 			self.current_sort = self.sort_type
 
+		movieList = self.sortList(movieList, numberOfDirs, firstDir)
+		for state in self.buildTags(autotags, realtags):
+			yield None
+		self.list = movieList
+		self.firstFileEntry = numberOfDirs
+		self.parentDirectory = self.findParentDirectory(movieList, numberOfDirs, parent)
+		self.root = root
+
+	def sortList(self, movieList, numberOfDirs, firstDir):
+		# Return a new list sorted by the current sort method.
 		if MovieList.UsingTrashSort:      # Same as SORT_RECORDED, but must come first...
-			self.list = sorted(self.list[:numberOfDirs], key=self.buildBeginTimeSortKey) + sorted(self.list[numberOfDirs:], key=self.buildBeginTimeSortKey)
+			movieList = sorted(movieList[:numberOfDirs], key=self.buildBeginTimeSortKey) + sorted(movieList[numberOfDirs:], key=self.buildBeginTimeSortKey)
 			# Having sorted on *deletion* times, re-instate any record times for
 			# *display* if that option is set.
-			# self.list is a list of tuples, so we can't just assign to elements...
+			# movieList is a list of tuples, so we can't just assign to elements...
 			#
 			if config.usage.trashsort_deltime.value == "show record time":
-				for i in range(len(self.list)):
-					if len(self.list[i]) == 5:
-						x = self.list[i]
-						self.list[i] = (x[0], x[1], x[4], x[3])
+				for i in range(len(movieList)):
+					if len(movieList[i]) == 5:
+						x = movieList[i]
+						movieList[i] = (x[0], x[1], x[4], x[3])
 		elif self.current_sort == MovieList.SORT_ALPHANUMERIC:
-			self.list = sorted(self.list[:numberOfDirs], key=self.buildAlphaNumericSortKey) + sorted(self.list[numberOfDirs:], key=self.buildAlphaNumericSortKey)
+			movieList = sorted(movieList[:numberOfDirs], key=self.buildAlphaNumericSortKey) + sorted(movieList[numberOfDirs:], key=self.buildAlphaNumericSortKey)
 		elif self.current_sort == MovieList.SORT_ALPHANUMERIC_REVERSE:
-			self.list = (self.list[:firstDir] + sorted(self.list[firstDir:numberOfDirs], key=self.buildAlphaNumericSortKey, reverse=True) +
-				sorted(self.list[numberOfDirs:], key=self.buildAlphaNumericSortKey, reverse=True))
+			movieList = (movieList[:firstDir] + sorted(movieList[firstDir:numberOfDirs], key=self.buildAlphaNumericSortKey, reverse=True) +
+				sorted(movieList[numberOfDirs:], key=self.buildAlphaNumericSortKey, reverse=True))
 		elif self.current_sort == MovieList.SORT_ALPHANUMERIC_FLAT:
-			self.list.sort(key=self.buildAlphaNumericFlatSortKey)
+			movieList = sorted(movieList, key=self.buildAlphaNumericFlatSortKey)
 		elif self.current_sort == MovieList.SORT_ALPHANUMERIC_FLAT_REVERSE:
-			self.list = self.list[:firstDir] + sorted(self.list[firstDir:], key=self.buildAlphaNumericFlatSortKey, reverse=True)
+			movieList = movieList[:firstDir] + sorted(movieList[firstDir:], key=self.buildAlphaNumericFlatSortKey, reverse=True)
 		elif self.current_sort == MovieList.SORT_RECORDED:
-			self.list = sorted(self.list[:numberOfDirs], key=self.buildBeginTimeSortKey) + sorted(self.list[numberOfDirs:], key=self.buildBeginTimeSortKey)
+			movieList = sorted(movieList[:numberOfDirs], key=self.buildBeginTimeSortKey) + sorted(movieList[numberOfDirs:], key=self.buildBeginTimeSortKey)
 		elif self.current_sort == MovieList.SORT_RECORDED_REVERSE:
-			self.list = self.list[:firstDir] + sorted(self.list[firstDir:numberOfDirs], key=self.buildBeginTimeSortKey, reverse=True) + sorted(self.list[numberOfDirs:], key=self.buildBeginTimeSortKey, reverse=True)
+			movieList = movieList[:firstDir] + sorted(movieList[firstDir:numberOfDirs], key=self.buildBeginTimeSortKey, reverse=True) + sorted(movieList[numberOfDirs:], key=self.buildBeginTimeSortKey, reverse=True)
 		elif self.current_sort == MovieList.SHUFFLE:
-			dirlist = self.list[:numberOfDirs]
-			shufflelist = self.list[numberOfDirs:]
+			dirlist = movieList[:numberOfDirs]
+			shufflelist = movieList[numberOfDirs:]
 			random.shuffle(shufflelist)
-			self.list = dirlist + shufflelist
+			movieList = dirlist + shufflelist
 		elif self.current_sort == MovieList.SORT_ALPHA_DATE_OLDEST_FIRST:
-			self.list = sorted(self.list[:numberOfDirs], key=self.buildAlphaDateSortKey) + sorted(self.list[numberOfDirs:], key=self.buildAlphaDateSortKey)
+			movieList = sorted(movieList[:numberOfDirs], key=self.buildAlphaDateSortKey) + sorted(movieList[numberOfDirs:], key=self.buildAlphaDateSortKey)
 		elif self.current_sort == MovieList.SORT_ALPHAREV_DATE_NEWEST_FIRST:
-			self.list = self.list[:firstDir] + sorted(self.list[firstDir:numberOfDirs], key=self.buildAlphaDateSortKey, reverse=True) + sorted(self.list[numberOfDirs:], key=self.buildAlphaDateSortKey, reverse=True)
+			movieList = movieList[:firstDir] + sorted(movieList[firstDir:numberOfDirs], key=self.buildAlphaDateSortKey, reverse=True) + sorted(movieList[numberOfDirs:], key=self.buildAlphaDateSortKey, reverse=True)
 		elif self.current_sort == MovieList.SORT_LONGEST:
-			self.list = sorted(self.list[:numberOfDirs], key=self.buildAlphaNumericSortKey) + sorted(self.list[numberOfDirs:], key=self.buildLengthSortKey, reverse=True)
+			movieList = sorted(movieList[:numberOfDirs], key=self.buildAlphaNumericSortKey) + sorted(movieList[numberOfDirs:], key=self.buildLengthSortKey, reverse=True)
 		elif self.current_sort == MovieList.SORT_SHORTEST:
-			self.list = sorted(self.list[:numberOfDirs], key=self.buildAlphaNumericSortKey) + sorted(self.list[numberOfDirs:], key=self.buildLengthSortKey)
+			movieList = sorted(movieList[:numberOfDirs], key=self.buildAlphaNumericSortKey) + sorted(movieList[numberOfDirs:], key=self.buildLengthSortKey)
+
+		return movieList
 
+	def findParentDirectory(self, movieList, numberOfDirs, parent):
+		# Return the index of the directory we came from, which is the one to select.
 		if self.root and numberOfDirs > 0:
 			rootPath = path.normpath(self.root.getPath())
 			if not rootPath.endswith('/'):
@@ -915,30 +1172,33 @@ class MovieList(GUIComponent):
 			if rootPath != parent:
 				# with new sort types directories may be in between files, so scan whole
 				# list for parentDirectory index. Usually it is the first one anyway
-				for index, item in enumerate(self.list):
+				for index, item in enumerate(movieList):
 					if item[0].flags & eServiceReference.mustDescent:
 						itempath = path.normpath(item[0].getPath())
 						if not itempath.endswith('/'):
 							itempath += '/'
 						if itempath == rootPath:
-							self.parentDirectory = index
-							break
-		self.root = root
-		# finally, store a list of all tags which were found. these can be presented
+							return index
+		return 0
+
+	def buildTags(self, autotags, realtags):
+		# Store a list of all tags which were found. these can be presented
 		# to the user to filter the list
 		# ML: Only use the tags that occur more than once in the list OR that were
 		# really in the tag set of some file.
 
 		# reverse the dictionary to see which unique movie each tag now references
 		rautotags = {}
-		for tag, movies in autotags.items():
+		for count, (tag, movies) in enumerate(autotags.items()):
+			if count % self.LOAD_CHUNK == self.LOAD_CHUNK - 1:
+				yield None
 			if (len(movies) > 1):
 				movies = tuple(movies)  # a tuple can be hashed, but a list not
 				item = rautotags.get(movies, [])
 				if not item:
 					rautotags[movies] = item
 				item.append(tag)
-		self.tags = {}
+		allTags = {}
 		for movies, tags in rautotags.items():
 			movie = movies[0]
 			# format the tag lists so that they are in 'original' order
@@ -961,14 +1221,15 @@ class MovieList(GUIComponent):
 						break
 			# Adding the longest common sentence to the tag list
 			if match:
-				self.tags[match] = set(tags)
+				allTags[match] = set(tags)
 			else:
 				match = ' '.join(tags)
 				if (len(match) > 2) or (match in realtags):  # Omit small words, only for auto tags
-					self.tags[match] = set(tags)
+					allTags[match] = set(tags)
 		# Adding the realtags to the tag list
 		for tag in realtags:
-			self.tags[tag] = set([tag])
+			allTags[tag] = set([tag])
+		self.tags = allTags
 
 	def getSortPrimaryGroup(self, x):
 		if x[0].flags & eServiceReference.mustDescent:
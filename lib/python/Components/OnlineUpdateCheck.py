@@ -242,6 +242,7 @@ class OnlineUpdateCheckPoller:
 
 	def createCheckJob(self):
 		job = Components.Task.Job(_("OnlineVersionCheck"))
+		job.setResources(Components.Task.RESOURCE_NETWORK)
 		task = Components.Task.PythonTask(job, _("Checking for Updates..."))
 		task.work = self.JobStart
 		task.weighting = 1
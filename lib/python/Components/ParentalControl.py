@@ -1,6 +1,7 @@
 import time
 
 from enigma import eTimer, eServiceCenter, iServiceInformation, eServiceReference, eDVBDB
+from Components.ChannelNumbers import channelNumbers
 from Components.config import config, ConfigSubsection, ConfigSelection, ConfigPIN, ConfigYesNo, ConfigSubList, ConfigInteger
 from Components.ServiceList import refreshServiceList
 from Screens.InputBox import PinInput
@@ -15,6 +16,8 @@ TYPE_SERVICE = "SERVICE"
 TYPE_BOUQUETSERVICE = "BOUQUETSERVICE"
 TYPE_BOUQUET = "BOUQUET"
 LIST_BLACKLIST = "blacklist"
+PATH_CACHE_SIZE = 5000  # Number of memoized verdicts of recordings, the cache is cleared when it grows beyond this.
+RATING_CACHE_TIME = 60  # Seconds an event rating of a service is reused, at most until the end of the event.
 
 
 def InitParentalControl():
@@ -65,6 +68,15 @@ class ParentalControl:
 		self.sessionPinTimer = eTimer()
 		self.sessionPinTimer.callback.append(self.resetSessionPin)
 		self.getConfigValues()
+		# The protection map is built from the blacklist when it is needed, with the
+		# services of the protected bouquets as they are now.  The memoized verdicts
+		# of the recordings depend on it and are dropped with it.
+		self.protectedServices = None  # Set of the compare strings of the protected services and bouquets.
+		self.protectedBouquets = False  # True if the map contains services of protected bouquets.
+		self.bouquetGeneration = None
+		self.pathVerdicts = {}  # Compare string of a recording: verdict.
+		self.eventRatings = {}  # Compare string of a service: (valid until, age).
+		config.ParentalControl.age.addNotifier(self.invalidate, initial_call=False)
 
 	def serviceMethodWrapper(self, service, method, *args):
 		# This method is used to call all functions that need a service as Parameter:
@@ -89,22 +101,67 @@ class ParentalControl:
 		# If true: read the configuration
 		if self.storeServicePin != config.ParentalControl.storeservicepin.value:
 			self.getConfigValues()
+		protectedServices = self.getProtectedServices()
 		service = ref.toCompareString()
 		path = ref.getPath()
-		info = eServiceCenter.getInstance().info(ref)
-		age = 0
 		if path.startswith("/"):
-			if service.startswith("1:"):
-				refstr = info and info.getInfoString(ref, iServiceInformation.sServiceref)
-				service = refstr and eServiceReference(refstr).toCompareString()
-			if [x for x in path[1:].split("/") if x.startswith(".") and not x == ".Trash"]:
-				age = 18
-		elif int(config.ParentalControl.age.value):
-			event = info and info.getEvent(ref)
-			rating = event and event.getParentalData()
-			age = rating and rating.getRating()
-			age = age and age <= 15 and age + 3 or 0
-		return (age and age >= int(config.ParentalControl.age.value)) or service and service in self.blacklist
+			verdict = self.pathVerdicts.get(service)
+			if verdict is None:
+				verdict = self.pathVerdicts[service] = self.isRecordingProtected(ref, service, path, protectedServices)
+				if len(self.pathVerdicts) > PATH_CACHE_SIZE:
+					self.pathVerdicts = {service: verdict}
+			return verdict
+		if service in protectedServices:
+			return True
+		ageLimit = int(config.ParentalControl.age.value)
+		return bool(ageLimit) and self.getEventAge(ref, service) >= ageLimit
+
+	def isRecordingProtected(self, ref, service, path, protectedServices):
+		if [x for x in path[1:].split("/") if x.startswith(".") and not x == ".Trash"]:
+			return True  # Recordings in hidden directories are rated 18, which no age setting allows.
+		if service.startswith("1:"):
+			info = eServiceCenter.getInstance().info(ref)
+			refstr = info and info.getInfoString(ref, iServiceInformation.sServiceref)
+			service = refstr and eServiceReference(refstr).toCompareString()
+		return bool(service) and service in protectedServices
+
+	def getEventAge(self, ref, service):
+		now = time.time()
+		entry = self.eventRatings.get(service)
+		if entry and entry[0] > now:
+			return entry[1]
+		validUntil = now + RATING_CACHE_TIME
+		info = eServiceCenter.getInstance().info(ref)
+		event = info and info.getEvent(ref)
+		if event:
+			validUntil = min(validUntil, event.getBeginTime() + event.getDuration())
+		rating = event and event.getParentalData()
+		age = rating and rating.getRating()
+		age = age and age <= 15 and age + 3 or 0
+		self.eventRatings[service] = (validUntil, age)
+		return age
+
+	def getProtectedServices(self):
+		# The services of the protected bouquets are looked up again when the bouquets have changed.
+		if self.protectedBouquets:
+			channelNumbers.checkSignature()
+			if self.bouquetGeneration != channelNumbers.generation:
+				self.protectedServices = None
+		if self.protectedServices is None:
+			self.bouquetGeneration = channelNumbers.generation
+			protectedServices = set(self.blacklist)
+			bouquets = [x for x in self.blacklist if TYPE_BOUQUET in self.blacklist[x]]
+			for bouquet in bouquets:
+				protectedServices.update(str(x[0]) for x in self.readServicesFromBouquet(bouquet, "C") or [])
+			self.protectedServices = protectedServices
+			self.protectedBouquets = bool(bouquets)
+			self.pathVerdicts = {}
+		return self.protectedServices
+
+	def invalidate(self, *args):  # Also used as a notifier of config elements.
+		self.protectedServices = None
+		self.pathVerdicts = {}
+		self.eventRatings = {}
 
 	def isServicePlayable(self, ref, callback, session=None):
 		self.session = session
@@ -129,12 +186,14 @@ class ParentalControl:
 	def protectService(self, service):
 		if service not in self.blacklist:
 			self.serviceMethodWrapper(service, self.addServiceToList, self.blacklist)
+			self.invalidate()
 			if config.ParentalControl.hideBlacklist.value and not self.sessionPinCached:
 				eDVBDB.getInstance().addFlag(eServiceReference(service), 2)
 
 	def unProtectService(self, service):
 		if service in self.blacklist:
 			self.serviceMethodWrapper(service, self.removeServiceFromList, self.blacklist)
+			self.invalidate()
 
 	def getProtectionLevel(self, service):
 		return service not in self.blacklist and -1 or 0
@@ -257,6 +316,7 @@ class ParentalControl:
 
 	def open(self):
 		self.blacklist = self.openListFromFile(LIST_BLACKLIST)
+		self.invalidate()
 		self.hideBlacklist()
 		if not self.filesOpened:
 			# Reset PIN cache on standby: Use StandbyCounter- Config- Callback
@@ -1,12 +1,52 @@
-from os import listdir, path, unlink
+from os import listdir, path, replace, stat, unlink
+from pickle import HIGHEST_PROTOCOL, dump, load
 from shutil import rmtree
 from bisect import insort
-from Tools.Directories import fileExists, resolveFilename, SCOPE_PLUGINS
+from Tools.Directories import fileExists, resolveFilename, SCOPE_CONFIG, SCOPE_PLUGINS
 from Tools.Import import my_import
-from Tools.Profile import profile
+from Tools.Profile import profile, profileSpan
 from Plugins.Plugin import PluginDescriptor
 import keymapparser
 
+MANIFEST_VERSION = 1
+# Plugins with descriptors for these are imported at startup, as they are called during the startup anyway.
+STARTUP_WHERE = (PluginDescriptor.WHERE_AUTOSTART, PluginDescriptor.WHERE_SESSIONSTART, PluginDescriptor.WHERE_WIZARD, PluginDescriptor.WHERE_NETWORKCONFIG_READ)
+# Plugins that core code probes with isPluginInstalled() and then uses the settings of, which the plugin creates when it is imported.
+EAGER_PLUGINS = ("AutoResolution", "IMDb", "NetworkWizard", "OBH", "ServiceApp", "tmdb", "WirelessLan")
+PRELOAD_DELAY = 60  # Seconds after the startup before the plugins that were not imported yet are imported in the background.
+
+
+class LazyPluginDescriptor(PluginDescriptor):
+	"""
+	Stand-in for a descriptor of a plugin that was not imported at startup,
+	made from the plugin manifest.  The plugin is imported when the function
+	of the descriptor is first needed, the descriptor then forwards to the
+	matching descriptor of the plugin.
+	"""
+	def __init__(self, component, key, entry):
+		PluginDescriptor.__init__(self, name=entry["name"], where=entry["where"], description=entry["description"], icon=entry["icon"], needsRestart=entry["needsRestart"], internal=entry["internal"], weight=entry["weight"])
+		self.component = component
+		self.key = key
+		self.descriptor = None
+
+	def getFunction(self):
+		if self.descriptor is None:
+			self.component.loadPlugin(self.key)
+		return self.descriptor.fnc if self.descriptor else None
+
+	def setFunction(self, fnc):
+		pass  # The function is the one of the descriptor of the plugin.
+
+	fnc = property(getFunction, setFunction)
+
+	def __eq__(self, other):
+		if self.descriptor is None:  # Comparing must not import the plugin.
+			return self is other
+		return PluginDescriptor.__eq__(self, other)
+
+	def __ne__(self, other):
+		return not self.__eq__(other)
+
 
 class PluginComponent:
 	firstRun = True
@@ -16,6 +56,12 @@ class PluginComponent:
 		self.plugins = {}
 		self.pluginList = []
 		self.installedPluginList = []
+		self.lazyPlugins = {}  # Plugin key ("category/name"): the lazy descriptors of a plugin that is not imported yet.
+		self.manifestFile = resolveFilename(SCOPE_CONFIG, "pluginmanifest.pkl")
+		self.manifest = {}
+		self.preloadTimer = None
+		self.changeTimer = None
+		self.pendingChanges = []  # (descriptors to remove, descriptors to add) of plugins imported on demand.
 		self.setPluginPrefix("Plugins.")
 		self.resetWarnings()
 
@@ -43,6 +89,11 @@ class PluginComponent:
 
 	def readPluginList(self, directory):
 		"""enumerates plugins"""
+		# At startup, the plugins of the manifest that are not needed for the startup are only imported when first used.
+		manifest = self.loadManifest() if self.firstRun else {}
+		self.manifest = {}
+		self.lazyPlugins = {}
+		self.pendingChanges = []  # The lists are rebuilt anyway.
 		new_plugins = []
 		for c in listdir(directory):
 			directory_category = path.join(directory, c)
@@ -53,35 +104,19 @@ class PluginComponent:
 					continue
 				pluginPath = path.join(directory_category, pluginname)
 				if path.isdir(pluginPath):
-					profile('plugin ' + pluginname)
-					try:
-						plugin = my_import('.'.join(["Plugins", c, pluginname, "plugin"]))
-						plugins = plugin.Plugins(path=pluginPath)
-					except Exception as exc:
-						if pluginname != "WebInterface":  # "WebInterface" is a fake plugin created by OpenWebIf. Do not print warnings about this.
-							print("[PluginComponent] Plugin ", c + "/" + pluginname, "failed to load:", exc)
-						# suppress errors due to missing plugin.py* files (badly removed plugin)
-						for fn in ('plugin.py', 'plugin.pyc', 'plugin.pyo'):
-							if path.exists(path.join(pluginPath, fn)):
-								self.warnings.append((c + "/" + pluginname, str(exc)))
-								from traceback import print_exc
-								print_exc()
-								break
-						else:  # executes if no "break" is encountered in the "for" loop
-							if pluginname != "WebInterface":  # "WebInterface" is a fake plugin created by OpenWebIf. Do not process this.
-								print("[PluginComponent] Plugin probably removed, but not cleanly in", pluginPath)
-								print("[PluginComponent] trying to remove:", pluginPath)
-								# rmtree will produce an error if path is a symlink, so...
-								if path.islink(pluginPath):
-									rmtree(path.realpath(pluginPath))
-									unlink(pluginPath)
-								else:
-									rmtree(pluginPath)
-						continue
-
-					# allow single entry not to be a list
-					if not isinstance(plugins, list):
-						plugins = [plugins]
+					key = "%s/%s" % (c, pluginname)
+					signature = self.getPluginSignature(pluginPath)
+					entry = manifest.get(key)
+					if entry and entry["signature"] == signature and entry["lazy"] and pluginname not in EAGER_PLUGINS:
+						plugins = self.lazyPlugins[key] = [LazyPluginDescriptor(self, key, descriptor) for descriptor in entry["descriptors"]]
+						self.manifest[key] = entry
+					else:
+						profile("plugin %s" % pluginname, step=False)
+						with profileSpan("plugin %s" % key):
+							plugins = self.importPlugin(c, pluginname, pluginPath)
+						if plugins is None:
+							continue
+						self.manifest[key] = self.describePlugin(signature, plugins)
 
 					for p in plugins:
 						p.path = pluginPath
@@ -95,6 +130,8 @@ class PluginComponent:
 						except Exception as exc:
 							print("[PluginComponent] keymap for plugin %s/%s failed to load: " % (c, pluginname), exc)
 							self.warnings.append((c + "/" + pluginname, str(exc)))
+		if self.manifest != manifest:
+			self.saveManifest()
 
 		# build a diff between the old list of plugins and the new one
 		# internally, the "fnc" argument will be compared with __eq__
@@ -123,6 +160,172 @@ class PluginComponent:
 		if self.firstRun:
 			self.firstRun = False
 			self.installedPluginList = self.pluginList
+			self.startPreload()
+
+	def importPlugin(self, c, pluginname, pluginPath):
+		try:
+			plugin = my_import('.'.join(["Plugins", c, pluginname, "plugin"]))
+			plugins = plugin.Plugins(path=pluginPath)
+		except Exception as exc:
+			if pluginname != "WebInterface":  # "WebInterface" is a fake plugin created by OpenWebIf. Do not print warnings about this.
+				print("[PluginComponent] Plugin ", c + "/" + pluginname, "failed to load:", exc)
+			# suppress errors due to missing plugin.py* files (badly removed plugin)
+			for fn in ('plugin.py', 'plugin.pyc', 'plugin.pyo'):
+				if path.exists(path.join(pluginPath, fn)):
+					self.warnings.append((c + "/" + pluginname, str(exc)))
+					from traceback import print_exc
+					print_exc()
+					break
+			else:  # executes if no "break" is encountered in the "for" loop
+				if pluginname != "WebInterface":  # "WebInterface" is a fake plugin created by OpenWebIf. Do not process this.
+					print("[PluginComponent] Plugin probably removed, but not cleanly in", pluginPath)
+					print("[PluginComponent] trying to remove:", pluginPath)
+					# rmtree will produce an error if path is a symlink, so...
+					if path.islink(pluginPath):
+						rmtree(path.realpath(pluginPath))
+						unlink(pluginPath)
+					else:
+						rmtree(pluginPath)
+			return None
+
+		# allow single entry not to be a list
+		if not isinstance(plugins, list):
+			plugins = [plugins]
+		return plugins
+
+	def getPluginSignature(self, pluginPath):
+		# The plugin directory and its plugin module, the directory changes when files are replaced by a package update.
+		signature = []
+		for fileName in (pluginPath, path.join(pluginPath, "plugin.py"), path.join(pluginPath, "plugin.pyc")):
+			try:
+				status = stat(fileName)
+				signature.append((status.st_mtime_ns, status.st_size))
+			except OSError:
+				signature.append(None)
+		return signature
+
+	def describePlugin(self, signature, plugins):
+		descriptors = []
+		lazy = True
+		for p in plugins:
+			descriptors.append({
+				"name": p.name,
+				"where": p.where,
+				"description": p.description,
+				"icon": p.iconstr,
+				"weight": p.weight,
+				"needsRestart": p.needsRestart,
+				"internal": p.internal
+			})
+			# Plugins that are used during the startup, have a wakeup function, or a descriptor that is not a plain function can not be imported on demand.
+			if p.wakeupfnc is not None or p._icon is not None or not callable(p.fnc) or [x for x in p.where if x in STARTUP_WHERE]:
+				lazy = False
+		return {"signature": signature, "lazy": lazy, "descriptors": descriptors}
+
+	def loadManifest(self):
+		manifest = {}
+		if fileExists(self.manifestFile):
+			try:
+				with open(self.manifestFile, "rb") as fd:
+					version, language, manifest = load(fd)
+				if version != MANIFEST_VERSION or language != self.getLanguage():  # The names and descriptions are translated.
+					manifest = {}
+			except Exception as err:
+				print("[PluginComponent] Failed to load the plugin manifest: %s" % str(err))
+				manifest = {}
+		return manifest
+
+	def saveManifest(self):
+		try:
+			with open("%s.tmp" % self.manifestFile, "wb") as fd:
+				dump((MANIFEST_VERSION, self.getLanguage(), self.manifest), fd, HIGHEST_PROTOCOL)
+			replace("%s.tmp" % self.manifestFile, self.manifestFile)
+		except Exception as err:  # E.g. a descriptor with a name or description that can not be pickled.
+			print("[PluginComponent] Failed to save the plugin manifest: %s" % str(err))
+
+	def getLanguage(self):
+		from Components.config import config
+		return config.osd.language.value if hasattr(config, "osd") else None
+
+	def loadPlugin(self, key):
+		# Import a plugin that was not imported at startup and make its lazy descriptors forward to its own ones.
+		lazyPlugins = self.lazyPlugins.pop(key, None)
+		if not lazyPlugins:
+			return
+		if not self.lazyPlugins and self.preloadTimer:
+			self.preloadTimer.stop()
+		c, pluginname = key.split("/", 1)
+		pluginPath = lazyPlugins[0].path
+		print("[PluginComponent] Importing plugin %s on demand." % key)
+		with profileSpan("plugin %s" % key):
+			plugins = self.importPlugin(c, pluginname, pluginPath)
+		if plugins is None:
+			# The caller gets a function that reports the error, the entries of the plugin are removed and the next startup imports it eagerly.
+			for lazy in lazyPlugins:
+				lazy.descriptor = self.getFailedDescriptor(key, lazy)
+			self.scheduleChange(lazyPlugins, [])
+			if self.manifest.pop(key, None) is not None:
+				self.saveManifest()
+			return
+		for p in plugins:
+			p.path = pluginPath
+			p.updateIcon(pluginPath)
+		for lazy in lazyPlugins:
+			lazy.descriptor = next((p for p in plugins if p.name == lazy.name and p.where == lazy.where), None)
+		if [(p.name, p.where) for p in plugins] != [(lazy.name, lazy.where) for lazy in lazyPlugins]:
+			# The descriptors changed since the manifest was written, e.g. because they depend on settings, so use the ones of the plugin.
+			self.scheduleChange(lazyPlugins, plugins)
+		self.manifest[key] = self.describePlugin(self.manifest[key]["signature"], plugins) if key in self.manifest else self.describePlugin(self.getPluginSignature(pluginPath), plugins)
+		self.saveManifest()
+
+	def getFailedDescriptor(self, key, lazy):
+		error = next((warning[1] for warning in reversed(self.warnings) if warning[0] == key), None)
+
+		def importFailed(*args, **kwargs):
+			if PluginDescriptor.WHERE_MENU in lazy.where:
+				return []  # No menu entries.
+			from Screens.MessageBox import MessageBox
+			from Tools.Notifications import AddPopup
+			text = _("The plugin '%s' could not be loaded!") % lazy.name
+			AddPopup("%s\n%s" % (text, error) if error else text, MessageBox.TYPE_ERROR, timeout=10, id="PluginImportFailed")
+
+		return PluginDescriptor(name=lazy.name, where=lazy.where, description=lazy.description, fnc=importFailed)
+
+	def scheduleChange(self, removed, added):
+		# The lists are changed on the next main loop iteration, as the caller that imported the plugin may be iterating over them.
+		self.pendingChanges.append((removed, added))
+		if self.changeTimer is None:
+			from enigma import eTimer
+			self.changeTimer = eTimer()
+			self.changeTimer.callback.append(self.applyChanges)
+		self.changeTimer.start(0, True)
+
+	def applyChanges(self):
+		while self.pendingChanges:
+			removed, added = self.pendingChanges.pop(0)
+			for p in removed:
+				if p in self.pluginList:
+					self.removePlugin(p)
+			for p in added:
+				self.pluginList.append(p)
+				for x in p.where:
+					insort(self.plugins.setdefault(x, []), p)
+					if x == PluginDescriptor.WHERE_AUTOSTART:
+						p(reason=0)
+
+	def startPreload(self):
+		# Import the remaining plugins in the background once the startup is over, one per main loop iteration.
+		if self.lazyPlugins:
+			from enigma import eTimer
+			self.preloadTimer = eTimer()
+			self.preloadTimer.callback.append(self.preloadNext)
+			self.preloadTimer.start(PRELOAD_DELAY * 1000, True)
+
+	def preloadNext(self):
+		if self.lazyPlugins:
+			self.loadPlugin(next(iter(self.lazyPlugins)))
+		if self.lazyPlugins:
+			self.preloadTimer.start(0, True)
 
 	def getPlugins(self, where):
 		"""Get list of plugins in a specific category"""
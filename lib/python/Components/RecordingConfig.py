@@ -21,6 +21,8 @@ def InitRecordingConfig():
 	config.recording.keep_timers = ConfigSelectionNumber(min=1, max=120, stepwidth=1, default=7, wraparound=True)
 	choicelist = [(0, _("Keep logs"))] + [(i, str(i)) for i in range(1, 14)]
 	config.recording.keep_finished_timer_logs = ConfigSelection(default=0, choices=choicelist)
+	choicelist = [(0, _("Immediately"))] + [(i, ngettext("%d second", "%d seconds", i) % i) for i in (1, 2, 5, 10, 15, 30, 60)]
+	config.recording.timers_save_delay = ConfigSelection(default=5, choices=choicelist)
 	config.recording.filename_composition = ConfigSelection(default="standard", choices=[
 		("standard", _("Date first")),
 		("event", _("Event name first")),
@@ -1,5 +1,7 @@
-from os import listdir, path as ospath
+from collections import OrderedDict
+from os import listdir, path as ospath, stat
 import re
+from time import time
 
 from enigma import ePixmap, eServiceReference
 
@@ -10,11 +12,17 @@ from Tools.Directories import pathExists, SCOPE_CURRENT_SKIN, resolveFilename, s
 
 
 class PiconLocator:
+	CACHE_SIZE = 1000  # Number of service references with their picon name kept in memory.
+	REFRESH_INTERVAL = 10  # Minimum number of seconds between checks of the search paths for added or removed picons.
+
 	def __init__(self, piconDirectories=["picon"]):
 		harddiskmanager.on_partition_list_change.append(self.__onPartitionChange)
 		self.piconDirectories = piconDirectories
 		self.activePiconPath = None
 		self.searchPaths = []
+		self.piconFiles = {}  # Dictionary of search path to (mtime, set of picon file names).
+		self.piconCache = OrderedDict()  # Service reference to picon name, least recently used first.
+		self.lastRefresh = time()
 		for mp in ("/usr/share/enigma2/", "/"):
 			self.__onMountpointAdded(mp)
 		for part in harddiskmanager.getMountedPartitions():
@@ -25,11 +33,12 @@ class PiconLocator:
 			try:
 				path = ospath.join(mountpoint, piconDirectory) + "/"
 				if ospath.isdir(path) and path not in self.searchPaths:
-					for fn in listdir(path):
-						if fn.endswith(".png") or fn.endswith(".svg"):
-							print("[PiconLocator] adding path:", path)
-							self.searchPaths.append(path)
-							break
+					if self.__readPiconFiles(path):
+						print("[PiconLocator] adding path:", path)
+						self.searchPaths.append(path)
+						self.piconCache.clear()
+					else:
+						del self.piconFiles[path]
 			except:
 				pass
 
@@ -41,6 +50,11 @@ class PiconLocator:
 				print("[PiconLocator] removed path:", path)
 			except:
 				pass
+			else:
+				self.piconFiles.pop(path, None)
+				if self.activePiconPath == path:
+					self.activePiconPath = None
+				self.piconCache.clear()
 
 	def __onPartitionChange(self, why, part):
 		if why == "add":
@@ -48,19 +62,38 @@ class PiconLocator:
 		elif why == "remove":
 			self.__onMountpointRemoved(part.mountpoint)
 
+	def __readPiconFiles(self, path):
+		# Index the picon file names of a search path, return True if it holds any picons.
+		mtime = stat(path).st_mtime
+		files = set(fn for fn in listdir(path) if fn.endswith(".png") or fn.endswith(".svg"))
+		self.piconFiles[path] = (mtime, files)
+		return bool(files)
+
+	def refresh(self):
+		# Re-read the search paths that have changed since they were indexed.
+		self.lastRefresh = time()
+		for path in self.searchPaths:
+			try:
+				if stat(path).st_mtime != self.piconFiles[path][0]:
+					print("[PiconLocator] updating path:", path)
+					self.__readPiconFiles(path)
+					self.piconCache.clear()
+			except (IOError, OSError, KeyError):
+				pass
+
 	def findPicon(self, service):
 		if self.activePiconPath is not None:
+			files = self.piconFiles[self.activePiconPath][1]
 			for ext in (".png", ".svg"):
-				pngname = self.activePiconPath + service + ext
-				if pathExists(pngname):
-					return pngname
+				if service + ext in files:
+					return self.activePiconPath + service + ext
 		else:
 			for path in self.searchPaths:
+				files = self.piconFiles[path][1]
 				for ext in (".png", ".svg"):
-					pngname = path + service + ext
-					if pathExists(pngname):
+					if service + ext in files:
 						self.activePiconPath = path
-						return pngname
+						return path + service + ext
 		return ""
 
 	def addSearchPath(self, value):
@@ -68,9 +101,26 @@ class PiconLocator:
 			if not value.endswith("/"):
 				value += "/"
 			if not value.startswith("/media/net") and not value.startswith("/media/autofs") and value not in self.searchPaths:
+				try:
+					self.__readPiconFiles(value)
+				except (IOError, OSError):
+					self.piconFiles[value] = (None, set())  # Not readable yet, e.g. while mounting, refresh() reads it later.
 				self.searchPaths.append(value)
+				self.piconCache.clear()
 
 	def getPiconName(self, serviceRef):
+		if time() - self.lastRefresh > self.REFRESH_INTERVAL:
+			self.refresh()
+		pngname = self.piconCache.get(serviceRef)
+		if pngname is None:
+			pngname = self.piconCache[serviceRef] = self.findPiconName(serviceRef)
+			if len(self.piconCache) > self.CACHE_SIZE:
+				self.piconCache.popitem(last=False)
+		else:
+			self.piconCache.move_to_end(serviceRef)
+		return pngname
+
+	def findPiconName(self, serviceRef):
 		# remove the path and name fields, and replace ":" by "_"
 		fields = GetWithAlternative(serviceRef).split(":", 10)[:10]
 		if not fields or len(fields) < 10:
@@ -143,7 +193,7 @@ class Picon(Renderer):
 		if self.instance:
 			if what[0] in (self.CHANGED_DEFAULT, self.CHANGED_ALL, self.CHANGED_SPECIFIC):
 				pngname = piconLocator.getPiconName(self.source.text)
-				if not pathExists(pngname):  # no picon for service found
+				if not pngname:  # no picon for service found
 					pngname = self.defaultpngname
 				if self.pngname != pngname:
 					if pngname:
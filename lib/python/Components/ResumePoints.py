@@ -0,0 +1,161 @@
+from os import remove, replace, stat
+from os.path import exists, realpath
+from pickle import HIGHEST_PROTOCOL, UnpicklingError, dump, load
+from time import time
+
+from enigma import eTimer
+
+from Components.Harddisk import findMountPoint
+from Tools.Directories import SCOPE_CONFIG, resolveFilename
+
+MAX_RESUME_POINTS = 1000  # The least recently used resume points beyond this number are pruned.
+PRUNE_DELAY = 60  # Seconds after a change before stale resume points are pruned.
+PRUNE_CHUNK = 25  # Number of resume points checked per main loop iteration while pruning.
+MEDIA_PATHS = ("/media/", "/mnt/", "/autofs/")  # Mount points of removable and network media.
+
+
+class ResumePoints:
+	"""
+	Resume points of played media, a dictionary of service reference strings to
+	[last used time, position, length] lists.  The dictionary is stored as a
+	pickle snapshot plus a journal of the changes since.  Setting or deleting a
+	resume point appends one record to the journal, the snapshot is only
+	rewritten when the journal has grown larger than the dictionary and on
+	shutdown.  Resume points of files that no longer exist on a mounted file
+	system and the least recently used ones beyond MAX_RESUME_POINTS are pruned
+	in the background.
+	"""
+	def __init__(self):
+		self.snapshotFile = resolveFilename(SCOPE_CONFIG, "resumepoints.pkl")
+		self.journalFile = resolveFilename(SCOPE_CONFIG, "resumepoints.journal")
+		self.points = {}
+		self.journalRecords = 0
+		self.fileStats = None
+		self.pruneKeys = None
+		self.pruneTimer = eTimer()
+		self.pruneTimer.callback.append(self.pruneStep)
+		self.load()
+
+	def getFileStats(self):
+		stats = []
+		for fileName in (self.snapshotFile, self.journalFile):
+			try:
+				status = stat(fileName)
+				stats.append((status.st_mtime, status.st_size))
+			except OSError:
+				stats.append(None)
+		return stats
+
+	def load(self):
+		points = {}
+		if exists(self.snapshotFile):
+			try:
+				with open(self.snapshotFile, "rb") as fd:
+					points = load(fd)
+			except Exception as err:
+				print("[ResumePoints] Failed to load resume points: %s" % str(err))
+		records = 0
+		try:
+			with open(self.journalFile, "rb") as fd:
+				while True:
+					try:
+						key, entry = load(fd)
+					except EOFError:
+						break
+					except (UnpicklingError, ValueError, TypeError) as err:  # A record that was not completely written.
+						print("[ResumePoints] Journal is truncated after %d records: %s" % (records, str(err)))
+						break
+					if entry is None:
+						points.pop(key, None)
+					else:
+						points[key] = entry
+					records += 1
+		except OSError:
+			pass
+		self.points = points
+		self.journalRecords = records
+		self.fileStats = self.getFileStats()
+		self.pruneKeys = None
+		if records:
+			self.compact()
+
+	def reloadIfChanged(self):
+		# The dictionary in memory is up to date unless the files were replaced, e.g. by restoring a backup.
+		if self.getFileStats() != self.fileStats:
+			print("[ResumePoints] Resume point files were changed, reloading.")
+			self.load()
+
+	def compact(self):
+		try:
+			with open("%s.tmp" % self.snapshotFile, "wb") as fd:
+				dump(self.points, fd, HIGHEST_PROTOCOL)
+			replace("%s.tmp" % self.snapshotFile, self.snapshotFile)
+			if exists(self.journalFile):
+				remove(self.journalFile)
+			self.journalRecords = 0
+		except OSError as err:
+			print("[ResumePoints] Failed to write resume points: %s" % str(err))
+		self.fileStats = self.getFileStats()
+
+	def append(self, key, entry):
+		try:
+			with open(self.journalFile, "ab") as fd:
+				dump((key, entry), fd, HIGHEST_PROTOCOL)
+			self.journalRecords += 1
+		except OSError as err:
+			print("[ResumePoints] Failed to write resume point: %s" % str(err))
+		if self.journalRecords > len(self.points) + 100:
+			self.compact()
+		else:
+			self.fileStats = self.getFileStats()
+
+	def set(self, key, position, length):
+		entry = self.points[key] = [int(time()), position, length]
+		self.append(key, entry)
+		self.schedulePrune()
+
+	def delete(self, key):
+		if self.points.pop(key, None) is not None:
+			self.append(key, None)
+
+	def get(self, key):
+		entry = self.points.get(key)
+		if entry is not None:
+			entry[0] = int(time())  # Update the LRU time stamp, it is saved with the next change.
+		return entry
+
+	def save(self):
+		self.pruneTimer.stop()
+		self.pruneKeys = None
+		self.compact()
+
+	def schedulePrune(self):
+		if self.pruneKeys is None:
+			self.pruneTimer.start(PRUNE_DELAY * 1000, True)
+
+	def pruneStep(self):
+		if self.pruneKeys is None:  # Start a pass.
+			self.pruneKeys = list(self.points.keys())
+		keys = self.pruneKeys[-PRUNE_CHUNK:]
+		del self.pruneKeys[-PRUNE_CHUNK:]
+		for key in keys:
+			path = key.split(":")[-1]
+			if key in self.points and path.startswith("/"):  # Only files can be stale, not streams.
+				path = realpath(path)
+				if findMountPoint(path) == "/" and path.startswith(MEDIA_PATHS):
+					continue  # Keep the resume points of files on media that are not mounted.
+				if not exists(path):
+					self.delete(key)
+		if self.pruneKeys:
+			self.pruneTimer.start(0, True)
+			return
+		self.pruneKeys = None
+		excess = len(self.points) - MAX_RESUME_POINTS
+		if excess > 0:
+			for key in sorted(self.points, key=lambda key: self.points[key][0])[:excess]:
+				del self.points[key]
+			print("[ResumePoints] Removed %d least recently used resume points." % excess)
+			self.compact()
+
+
+resumePoints = ResumePoints()
@@ -4,6 +4,16 @@ from os import access, environ, path as ospath, pathsep, statvfs, X_OK, W_OK
 
 from Tools.CList import CList
 
+# Resources that jobs can declare with Job.setResources().  Storage is declared
+# with the mount point of the file system, see getMountResource().
+RESOURCE_CPU = "cpu"  # CPU heavy work, e.g. loading or saving the EPG cache.
+RESOURCE_NETWORK = "network"  # Downloads and network file systems.
+
+
+def getMountResource(path):
+	from Components.Harddisk import findMountPoint  # Imported here as Components.Harddisk imports this module.
+	return findMountPoint(ospath.realpath(path))
+
 
 class Job:
 	NOT_STARTED, IN_PROGRESS, FINISHED, FAILED = range(4)
@@ -23,6 +33,22 @@ class Job:
 		self.state_changed = CList()
 		self.status = self.NOT_STARTED
 		self.onSuccess = None
+		self.resources = None  # The job runs alone unless it declares its resources.
+
+	def setResources(self, *resources):
+		# Jobs with disjoint resources can run concurrently.  Copying to a network
+		# file system also uses the network.
+		resources = set(resources)
+		for resource in list(resources):
+			if resource.startswith(("/media/net", "/media/autofs")):
+				resources.add(RESOURCE_NETWORK)
+		self.resources = frozenset(resources)
+
+	def getLaneName(self):
+		if self.resources is None:
+			return ""
+		names = {RESOURCE_CPU: _("CPU"), RESOURCE_NETWORK: _("Network")}
+		return ", ".join(sorted(names.get(resource, resource) for resource in self.resources))
 
 	# description is a dict
 	def fromDescription(self, description):
@@ -352,19 +378,27 @@ class ConditionTask(Task):
 		if res:
 			self.finish()
 
-# The jobmanager will execute multiple jobs, each after another.
+# The jobmanager will execute multiple jobs.  Jobs that declared disjoint
+# resources run concurrently in their own lanes, up to the number set in
+# config.usage.concurrent_jobs, other jobs run each after another.
 # later, it will also support suspending jobs (and continuing them after reboot etc)
 # It also supports a notification when some error occurred, and possibly a retry.
 
 
 class JobManager:
 	def __init__(self):
-		self.active_jobs = []
+		self.active_jobs = []  # The jobs that are waiting to be started.
+		self.running_jobs = []
 		self.failed_jobs = []
 		self.job_classes = []
 		self.in_background = False
 		self.visible = False
-		self.active_job = None
+		self.kicking = False
+		self.kickAgain = False
+
+	@property
+	def active_job(self):
+		return self.running_jobs[0] if self.running_jobs else None
 
 	# Set onSuccess to popupTaskView to get a visible notification.
 	# onFail defaults to notifyFailed which tells the user that it went south.
@@ -377,18 +411,44 @@ class JobManager:
 		self.active_jobs.append(job)
 		self.kick()
 
+	def getConcurrentJobs(self):
+		try:
+			from Components.config import config
+			return int(config.usage.concurrent_jobs.value)
+		except AttributeError:  # Before the usage configuration is initialized.
+			return 1
+
+	def conflicts(self, resources, otherResources):
+		return resources is None or otherResources is None or not resources.isdisjoint(otherResources)
+
 	def kick(self):
-		if self.active_job is None:
-			if self.active_jobs:
-				self.active_job = self.active_jobs.pop(0)
-				self.active_job.start(self.jobDone)
+		if self.kicking:  # A job was started or finished while starting jobs.
+			self.kickAgain = True
+			return
+		self.kicking = True
+		try:
+			self.kickAgain = True
+			while self.kickAgain:
+				self.kickAgain = False
+				limit = self.getConcurrentJobs()
+				claimed = [job.resources for job in self.running_jobs]
+				for job in self.active_jobs[:]:
+					if len(self.running_jobs) >= limit:
+						break
+					if not any(self.conflicts(job.resources, resources) for resources in claimed):
+						self.active_jobs.remove(job)
+						self.running_jobs.append(job)
+						job.start(self.jobDone)
+					claimed.append(job.resources)  # Waiting jobs keep their place in the queue of their resources.
+		finally:
+			self.kicking = False
 
 	def notifyFailed(self, job, task, problems):
 		from Tools import Notifications
 		from Screens.MessageBox import MessageBox
 		if problems[0].RECOVERABLE:
 			print("[Task] recoverable task failure\n", job.name + "\n" + _("Error") + ': %s' % (problems[0].getErrorMessage(task)))
-			Notifications.AddNotificationWithCallback(self.errorCB, MessageBox, _("Error: %s\nRetry?") % (problems[0].getErrorMessage(task)))
+			Notifications.AddNotificationWithCallback(lambda answer: self.errorCB(answer, job), MessageBox, _("Error: %s\nRetry?") % (problems[0].getErrorMessage(task)))
 			return True
 		else:
 			print("[Task] unrecoverable task failure\n", job.name + "\n" + _("Error") + ': %s' % (problems[0].getErrorMessage(task)))
@@ -399,9 +459,10 @@ class JobManager:
 		print("[Task] job", job, "completed with", problems, "in", task)
 		if problems:
 			if not job.onFail(job, task, problems):
-				self.errorCB(False)
+				self.errorCB(False, job)
 		else:
-			self.active_job = None
+			if job in self.running_jobs:
+				self.running_jobs.remove(job)
 			if job.onSuccess:
 				job.onSuccess(job)
 			self.kick()
@@ -414,22 +475,28 @@ class JobManager:
 			self.visible = True
 			Notifications.AddNotification(JobView, job)
 
-	def errorCB(self, answer):
+	def errorCB(self, answer, job=None):
+		# A failed job keeps its resources until it is retried or given up.
+		if job is None:
+			job = self.active_job
 		if answer:
 			print("[Task] retrying job")
-			self.active_job.retry()
+			job.retry()
 		else:
 			print("[Task] not retrying job.")
-			self.failed_jobs.append(self.active_job)
-			self.active_job = None
+			self.failed_jobs.append(job)
+			if job in self.running_jobs:
+				self.running_jobs.remove(job)
 			self.kick()
 
-	def getPendingJobs(self):
-		list = []
-		if self.active_job:
-			list.append(self.active_job)
-		list += self.active_jobs
-		return list
+	def getPendingJobs(self, resource=None):
+		# The running jobs followed by the waiting jobs, optionally only those of
+		# the lane of one resource.  Jobs without resources are in every lane.
+		jobs = self.running_jobs + self.active_jobs
+		if resource is not None:
+			jobs = [job for job in jobs if job.resources is None or resource in job.resources]
+		return jobs
+
 
 # some examples:
 # class PartitionExistsPostcondition:
@@ -6,6 +6,43 @@ import RecordTimer
 from Tools.CIHelper import cihelper
 from Components.config import config
 
+# Tuner types of the services used by timers. These only change with the
+# service list, so they are kept across checks instead of being looked up again
+# for every begin event of every check.
+tunerTypeCache = {}
+
+
+def getServiceTunerType(ref):  # helper function to get a service type of a service reference
+	refstr = ref.toString()
+	tunerType = tunerTypeCache.get(refstr)
+	if tunerType is None:
+		serviceInfo = eServiceCenter.getInstance().info(ref)
+		serviceInfo = serviceInfo and serviceInfo.getInfoObject(ref, iServiceInformation.sTransponderData)
+		tunerType = -1 if serviceInfo is None else serviceInfo.get("tuner_type", -1)
+		if tunerType != -1:  # don't remember services which are not (yet) known
+			tunerTypeCache[refstr] = tunerType
+	return tunerType
+
+
+def getGroupTunerTypes(ref):  # tuner types of all alternative services of a service group
+	refstr = ref.toString()
+	tunerTypes = tunerTypeCache.get(refstr)
+	if tunerTypes is None:
+		tunerTypes = []
+		serviceList = eServiceCenter.getInstance().list(ref)  # get all alternative services
+		if serviceList:
+			for ref in serviceList.getContent("R"):  # iterate over all group service references
+				type = getServiceTunerType(ref)
+				if type not in tunerTypes:  # just add single time
+					tunerTypes.append(type)
+		if tunerTypes and -1 not in tunerTypes:
+			tunerTypeCache[refstr] = tunerTypes
+	return tunerTypes[:]
+
+
+def clearTunerTypeCache():
+	tunerTypeCache.clear()
+
 
 class TimerSanityCheck:
 	def __init__(self, timerlist, newtimer=None):
@@ -54,6 +91,29 @@ class TimerSanityCheck:
 						return True
 		return False
 
+	# Split the chronological event list into groups of overlapping timers
+	# (separated by periods with no timers running) and only return the events
+	# of the groups which contain an occurrence of the new timer (index -1).
+	@staticmethod
+	def getOverlapComponents(eventlist):
+		result = []
+		component = []
+		involved = False
+		cnt = 0
+		for event in eventlist:
+			component.append(event)
+			cnt += event[1]
+			if event[2] == -1:
+				involved = True
+			if cnt == 0:
+				if involved:
+					result.extend(component)
+				component = []
+				involved = False
+		if involved:
+			result.extend(component)
+		return result
+
 	def checkTimerlist(self, ext_timer=None):
 		# with special service for external plugins
 		# Entries in eventlist
@@ -62,13 +122,13 @@ class TimerSanityCheck:
 		# index -1 for the new Timer, 0..n index of the existing timers
 		# count of running timers
 
-		serviceHandler = eServiceCenter.getInstance()
 		# create a list with all start and end times
 		# split it into recurring and singleshot timers
 
 		##################################################################################
 		# process the new timer
 		self.rep_eventlist = []
+		self.rep_timerlist = []
 		self.nrep_eventlist = []
 		if ext_timer and isinstance(ext_timer, RecordTimer.RecordTimerEntry):
 			self.newtimer = ext_timer
@@ -80,7 +140,7 @@ class TimerSanityCheck:
 		#         before the timer to be added starts
 		#       o any timers which run after the first period of no timers running
 		#         after the timer to be added ends
-		#      Code to handle this needs to be added (it is *NOT* here yet!)
+		#      These are dropped by getOverlapComponents() before the tuners are simulated.
 		#
 		if (self.newtimer is not None) and (self.newtimer.end < time()):  # does not conflict
 			return True
@@ -98,6 +158,7 @@ class TimerSanityCheck:
 		rflags = self.newtimer.repeated
 		rflags = ((rflags & 0x7F) >> 3) | ((rflags & 0x07) << 4)
 		if rflags:
+			self.rep_timerlist.append((self.newtimer, -1))
 			begin = self.newtimer.begin % 86400  # map to first day
 			if (self.localtimediff > 0) and ((begin + self.localtimediff) > 86400):
 				rflags = ((rflags >> 1) & 0x3F) | ((rflags << 6) & 0x40)
@@ -120,6 +181,7 @@ class TimerSanityCheck:
 				if timer.disabled or not timer.conflict_detection or not timer.service_ref or '%3a//' in timer.service_ref.ref.toString() or timer.state == TimerEntry.StateEnded:
 					continue
 				if timer.repeated:
+					self.rep_timerlist.append((timer, idx))
 					rflags = timer.repeated
 					rflags = ((rflags & 0x7F) >> 3) | ((rflags & 0x07) << 4)
 					begin = timer.begin % 86400  # map all to first day
@@ -146,25 +208,11 @@ class TimerSanityCheck:
 			weeks = (interval_end - offset_0) / 604800
 			if (interval_end - offset_0) % 604800:
 				weeks += 1
-			for cnt in range(int(weeks)):
-				for event in self.rep_eventlist:
-					if event[1] == -1:  # -1 is the identifier of the changed timer
-						event_begin = self.newtimer.begin
-						event_end = self.newtimer.end
-					else:
-						event_begin = self.check_timerlist[event[1]].begin
-						event_end = self.check_timerlist[event[1]].end
-					new_event_begin = event[0] + offset_0 + (cnt * 604800)
-					# summertime correction
-					new_lth = localtime(new_event_begin).tm_hour
-					new_event_begin += 3600 * (localtime(event_begin).tm_hour - new_lth)
-					new_event_end = new_event_begin + (event_end - event_begin)
-					if event[1] == -1:
-						if new_event_begin >= self.newtimer.begin:  # is the soap already running?
-							self.nrep_eventlist.extend([(new_event_begin, self.bflag, event[1]), (new_event_end, self.eflag, event[1])])
-					else:
-						if new_event_begin >= self.check_timerlist[event[1]].begin:  # is the soap already running?
-							self.nrep_eventlist.extend([(new_event_begin, self.bflag, event[1]), (new_event_end, self.eflag, event[1])])
+			# the occurrences (in local time, so summertime is taken care of) of the repeated timers within these weeks
+			for timer, idx in self.rep_timerlist:
+				for new_event_begin, new_event_end in timer.getRepeatedOccurrences().getBetween(offset_0, offset_0 + int(weeks) * 604800):
+					if new_event_begin >= timer.begin:  # is the soap already running?
+						self.nrep_eventlist.extend([(new_event_begin, self.bflag, idx), (new_event_end, self.eflag, idx)])
 		else:
 			offset_0 = 345600  # the Epoch begins on Thursday
 			for cnt in (0, 1):  # test two weeks to take care of Sunday-Monday transitions
@@ -183,6 +231,10 @@ class TimerSanityCheck:
 		# order list chronological
 		self.nrep_eventlist.sort()
 
+		################################################################################
+		# only keep the events overlapping (directly or through other timers) with the new timer
+		self.nrep_eventlist = self.getOverlapComponents(self.nrep_eventlist)
+
 		##################################################################################
 		# detect overlapping timers and overlapping times
 		fakeRecList = []
@@ -233,21 +285,10 @@ class TimerSanityCheck:
 							tunerType.append(feinfo.getFrontendData().get("tuner_type", -1))
 						feinfo = None
 				else:  # tune failed.. so we must go another way to get service type (DVB-S, DVB-T, DVB-C)
-
-					def getServiceType(ref):  # helper function to get a service type of a service reference
-						serviceInfo = serviceHandler.info(ref)
-						serviceInfo = serviceInfo and serviceInfo.getInfoObject(ref, iServiceInformation.sTransponderData)
-						return -1 if serviceInfo is None else serviceInfo.get("tuner_type", -1)
-
 					if ref and ref.flags & eServiceReference.isGroup:  # service group ?
-						serviceList = serviceHandler.list(ref)  # get all alternative services
-						if serviceList:
-							for ref in serviceList.getContent("R"):  # iterate over all group service references
-								type = getServiceType(ref)
-								if type not in tunerType:  # just add single time
-									tunerType.append(type)
+						tunerType = getGroupTunerTypes(ref)
 					elif ref:
-						tunerType.append(getServiceType(ref))
+						tunerType.append(getServiceTunerType(ref))
 
 				if event[2] == -1:  # new timer
 					newTimerTunerType = tunerType
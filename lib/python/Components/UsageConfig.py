@@ -6,6 +6,7 @@ from boxbranding import getBrandOEM, getDisplayType
 
 from enigma import eDVBDB, eEPGCache, setTunerTypePriorityOrder, setPreferredTuner, setSpinnerOnOff, setEnableTtCachingOnOff, eEnv, Misc_Options, eBackgroundFileEraser, eServiceEvent, RT_HALIGN_LEFT, RT_HALIGN_RIGHT, RT_HALIGN_CENTER, RT_VALIGN_CENTER, RT_WRAP
 
+from Components.ChannelNumbers import channelNumbers
 from Components.Harddisk import harddiskmanager
 from Components.config import config, ConfigBoolean, ConfigClock, ConfigDictionarySet, ConfigDirectory, ConfigInteger, ConfigIP, ConfigLocations, ConfigNumber, ConfigPassword, ConfigSelection, ConfigSelectionNumber, ConfigSet, ConfigSlider, ConfigSubsection, ConfigText, ConfigYesNo, NoSave
 from Tools.camcontrol import CamControl
@@ -51,8 +52,10 @@ def InitUsageConfig():
 
 	def alternativeNumberModeChange(configElement):
 		eDVBDB.getInstance().setNumberingMode(configElement.value)
+		channelNumbers.invalidate()
 		refreshServiceList()
 	config.usage.alternative_number_mode.addNotifier(alternativeNumberModeChange)
+	config.usage.multibouquet.addNotifier(channelNumbers.invalidate, initial_call=False)
 
 	config.usage.servicelist_twolines = ConfigSelection(default="0", choices=[("0", _("None")), ("1", _("two lines")), ("2", _("two lines and next event"))])
 	config.usage.servicelist_twolines.addNotifier(refreshServiceList)
@@ -295,6 +298,12 @@ def InitUsageConfig():
 	config.usage.task_warning = ConfigYesNo(default=True)
 
 	config.usage.jobtaskextensions = ConfigYesNo(default=True)
+	config.usage.concurrent_jobs = ConfigSelectionNumber(min=1, max=4, stepwidth=1, default=2)
+
+	def concurrentJobsChanged(configElement):
+		from Components.Task import job_manager
+		job_manager.kick()
+	config.usage.concurrent_jobs.addNotifier(concurrentJobsChanged, initial_call=False)
 	config.misc.disable_background_scan = ConfigYesNo(default=False)
 	config.misc.use_ci_assignment = ConfigYesNo(default=False)
 
@@ -961,6 +970,17 @@ def InitUsageConfig():
 			os.mkdir(config.crash.debug_path.value, 0o755)
 	config.crash.debug_path.addNotifier(updatedebug_path, immediate_feedback=False)
 	config.crash.coredump = ConfigYesNo(default=False)
+	config.crash.mainloop_statistics = ConfigYesNo(default=False)
+	config.crash.mainloop_slow_callback = ConfigSelection(default=100, choices=[(x, _("%d ms") % x) for x in (20, 50, 100, 200, 500, 1000)])
+
+	def updateMainloopStatistics(configElement):
+		try:
+			from e2reactor import callbackStatistics
+		except ImportError:  # Twisted is not available.
+			return
+		callbackStatistics.setEnabled(config.crash.mainloop_statistics.value, config.crash.mainloop_slow_callback.value)
+	config.crash.mainloop_statistics.addNotifier(updateMainloopStatistics)
+	config.crash.mainloop_slow_callback.addNotifier(updateMainloopStatistics)
 
 	config.usage.timerlist_showpicons = ConfigYesNo(default=True)
 	config.usage.timerlist_finished_timer_position = ConfigSelection(default="end", choices=[("beginning", _("at beginning")), ("end", _("at end")), ("hide", _("hide"))])
@@ -2179,25 +2179,62 @@ class ConfigSubsection:
 class Config(ConfigSubsection):
 	def __init__(self):
 		ConfigSubsection.__init__(self)
+		self.__dict__["pickle_cache"] = {}
 
+	# The serialized text of every subsection is cached together with a
+	# snapshot of the saved values it was made from, so only subsections
+	# whose saved values changed since the last pickle are sorted and
+	# serialized again.
 	def pickle_this(self, prefix, topickle, result):
+		cached = self.pickle_cache.get(prefix)
+		if cached is not None and cached[0] == topickle:
+			result.append(cached[1])
+			return cached[0]
+		snapshot = {}
+		text = []
 		for (key, val) in sorted(topickle.items(), key=lambda x: int(x[0]) if x[0].isdigit() else x[0].lower()):
 			name = '.'.join((prefix, key))
 			if isinstance(val, dict):
-				self.pickle_this(name, val, result)
-			elif isinstance(val, tuple):
-				result += [name, '=', str(val[0]), '\n']
+				snapshot[key] = self.pickle_this(name, val, text)
 			else:
-				result += [name, '=', str(val), '\n']
+				snapshot[key] = val
+				text += [name, '=', str(val[0] if isinstance(val, tuple) else val), '\n']
+		text = ''.join(text)
+		self.pickle_cache[prefix] = (snapshot, text)
+		result.append(text)
+		return snapshot
 
 	def pickle(self):
 		result = []
 		self.pickle_this("config", self.saved_value, result)
 		return ''.join(result)
 
+	# Returns the config element for a name like "config.x.y" from the
+	# config tree (without eval'ing the name), or None if it does not exist.
+	def getElement(self, name):
+		names = name.split('.')
+		if names[0] != "config":
+			return None
+		element = self
+		for n in names[1:]:
+			if isinstance(element, ConfigSubsection):
+				element = element.content.items.get(n)
+			elif isinstance(element, ConfigSubList):
+				element = element[int(n)] if n.isdigit() and int(n) < len(element) else None
+			elif isinstance(element, ConfigSubDict):
+				element = element[n] if n in element else next((v for (k, v) in element.items() if str(k) == n), None)
+			else:
+				return None
+			if element is None:
+				return None
+		return element if isinstance(element, ConfigElement) else None
+
 	def unpickle(self, lines, base_file=True):
 		tree = {}
 		configbase = tree.setdefault("config", {})
+		# settings files are sorted, so consecutive lines mostly share their subsection
+		lastPrefix = None
+		base = None
 		for element in lines:
 			if not element or element[0] == '#':
 				continue
@@ -2208,22 +2245,20 @@ class Config(ConfigSubsection):
 			(name, val) = result
 			val = val.strip()
 
-			names = name.split('.')
-			base = configbase
+			(prefix, dot, key) = name.rpartition('.')
+			if prefix != lastPrefix:
+				lastPrefix = prefix
+				base = configbase
+				for n in prefix.split('.')[1:]:
+					base = base.setdefault(n, {})
 
-			for n in names[1:-1]:
-				base = base.setdefault(n, {})
-
-			base[names[-1]] = val
+			base[key] = val
 
 			if not base_file:  # not the initial config file..
 				# update config.x.y.value when exist
-				try:
-					configEntry = eval(name)
-					if configEntry is not None:
-						configEntry.value = val
-				except (SyntaxError, KeyError):
-					pass
+				configEntry = self.getElement(name)
+				if configEntry is not None:
+					configEntry.value = val
 
 		# we inherit from ConfigSubsection, so ...
 		# object.__setattr__(self, "saved_value", tree["config"])
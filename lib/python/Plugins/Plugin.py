@@ -149,10 +149,10 @@ class PluginDescriptor():
 			return False
 
 	def __gt__(self, other):
-		return other < self
+		return other.__lt__(self)  # Not "other < self", that calls __gt__ again for subclasses like the lazy descriptors.
 
 	def __ge__(self, other):
-		return not self < other
+		return not self.__lt__(other)
 
 	def __le__(self, other):
-		return not other < self
+		return not other.__lt__(self)
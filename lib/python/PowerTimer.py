@@ -408,6 +408,7 @@ def createTimer(xml):
 
 class PowerTimer(Timer):
 	def __init__(self):
+		self.xmlCache = {}
 		Timer.__init__(self)
 
 		self.Filename = Directories.resolveFilename(Directories.SCOPE_CONFIG, "pm_timers.xml")
@@ -479,7 +480,39 @@ class PowerTimer(Timer):
 				AddPopup(_("Timer overlap in pm_timers.xml detected!\nPlease recheck it!"), type=MessageBox.TYPE_ERROR, timeout=0, id="TimerLoadFailed")
 				checkit = False  # at moment it is enough when the message is displayed one time
 
-	def saveTimer(self):
+	def getSaveDelay(self):
+		return config.recording.timers_save_delay.value * 1000
+
+	def writeTimer(self):
+		# XML fragments of unchanged entries are reused from the previous write
+		xmlCache = self.xmlCache
+		self.xmlCache = {}
+		list = ['<?xml version="1.0" ?>\n<timers>\n']
+		for timer in self.timer_list + self.processed_timers:
+			if timer.dontSave:
+				continue
+			signature = (
+				timer.timerType, int(timer.begin), int(timer.end), int(timer.repeated), timer.afterEvent, int(timer.disabled),
+				timer.autosleepinstandbyonly, timer.autosleepdelay, timer.autosleeprepeat,
+				len(timer.log_entries), timer.log_entries and timer.log_entries[0], timer.log_entries and timer.log_entries[-1])
+			cached = xmlCache.get(timer)
+			if cached is None or cached[0] != signature:
+				cached = (signature, self.timerToXML(timer))
+			self.xmlCache[timer] = cached
+			list.append(cached[1])
+
+		list.append('</timers>\n')
+
+		file = open(self.Filename + ".writing", "w")
+		file.writelines(list)
+		file.flush()
+
+		fsync(file.fileno())
+		file.close()
+		rename(self.Filename + ".writing", self.Filename)
+
+	@staticmethod
+	def timerToXML(timer):
 		timerTypes = {
 			TIMERTYPE.WAKEUP: "wakeup",
 			TIMERTYPE.WAKEUPTOSTANDBY: "wakeuptostandby",
@@ -497,47 +530,35 @@ class PowerTimer(Timer):
 			AFTEREVENT.DEEPSTANDBY: "deepstandby"
 		}
 
-		list = ['<?xml version="1.0" ?>\n<timers>\n']
-		for timer in self.timer_list + self.processed_timers:
-			if timer.dontSave:
-				continue
-			list.append(
-				'<timer'
-				' timertype="%s"'
-				' begin="%d"'
-				' end="%d"'
-				' repeated="%d"'
-				' afterevent="%s"'
-				' disabled="%d"'
-				' autosleepinstandbyonly="%s"'
-				' autosleepdelay="%s"'
-				' autosleeprepeat="%s"' % (
-				timerTypes[timer.timerType],  # noqa: E122
-				int(timer.begin),  # noqa: E122
-				int(timer.end),  # noqa: E122
-				int(timer.repeated),  # noqa: E122
-				afterEvents[timer.afterEvent],  # noqa: E122
-				int(timer.disabled),  # noqa: E122
-				timer.autosleepinstandbyonly,  # noqa: E122
-				timer.autosleepdelay,  # noqa: E122
-				timer.autosleeprepeat))  # noqa: E122
-
-			if len(timer.log_entries) == 0:
-				list.append('/>\n')
-			else:
-				for log_time, code, msg in timer.log_entries:
-					list.append('>\n<log code="%d" time="%d">%s</log' % (code, log_time, stringToXML(msg)))
-				list.append('>\n</timer>\n')
-
-		list.append('</timers>\n')
-
-		file = open(self.Filename + ".writing", "w")
-		file.writelines(list)
-		file.flush()
-
-		fsync(file.fileno())
-		file.close()
-		rename(self.Filename + ".writing", self.Filename)
+		list = []
+		list.append(
+			'<timer'
+			' timertype="%s"'
+			' begin="%d"'
+			' end="%d"'
+			' repeated="%d"'
+			' afterevent="%s"'
+			' disabled="%d"'
+			' autosleepinstandbyonly="%s"'
+			' autosleepdelay="%s"'
+			' autosleeprepeat="%s"' % (
+			timerTypes[timer.timerType],  # noqa: E122
+			int(timer.begin),  # noqa: E122
+			int(timer.end),  # noqa: E122
+			int(timer.repeated),  # noqa: E122
+			afterEvents[timer.afterEvent],  # noqa: E122
+			int(timer.disabled),  # noqa: E122
+			timer.autosleepinstandbyonly,  # noqa: E122
+			timer.autosleepdelay,  # noqa: E122
+			timer.autosleeprepeat))  # noqa: E122
+
+		if len(timer.log_entries) == 0:
+			list.append('/>\n')
+		else:
+			for log_time, code, msg in timer.log_entries:
+				list.append('>\n<log code="%d" time="%d">%s</log' % (code, log_time, stringToXML(msg)))
+			list.append('>\n</timer>\n')
+		return "".join(list)
 
 	def getNextZapTime(self):
 		now = time()
@@ -616,3 +637,4 @@ class PowerTimer(Timer):
 
 	def shutdown(self):
 		self.saveTimer()
+		self.flushTimer()
@@ -1,6 +1,6 @@
 from os import access, fsync, makedirs, remove, rename, path as ospath, statvfs, W_OK
 from timer import Timer, TimerEntry
-from bisect import insort
+from bisect import bisect_left, insort
 from sys import maxsize
 from time import localtime, strftime, ctime, time
 
@@ -1000,8 +1000,101 @@ def createTimer(xml):
 	return entry
 
 
+# Index of the timers in timer_list grouped by service, so that the EPG lists
+# only have to look at the timers of the service they are drawing.
+# Services are keyed by the compare string without type and flags (the same
+# part isInTimer() always compared on). Non repeated timers are kept sorted by
+# begin, repeated timers represent all their future repetitions and are kept
+# in a separate bucket.
+#
+class ServiceTimerIndex:
+	def __init__(self):
+		self.generation = 0  # Incremented whenever a timer is added, removed or changed.
+		self.clear()
+
+	def clear(self):
+		self.generation += 1
+		self.services = {}  # key: [begins, timers, repeated timers, max duration]
+		self.indexed = {}  # timer: (key, begin, repeated)
+		self.keyCache = {}  # service reference string: key
+		self.compareKeyCache = {}
+
+	@staticmethod
+	def timerKey(entry):
+		return entry.service_ref.toCompareString().split(":", 2)[2]
+
+	def serviceKey(self, service):
+		if isinstance(service, str):
+			cache = self.keyCache
+			key = cache.get(service)
+			if key is not None:
+				return key
+			key = ":".join(service.split(":")[2:11])
+		else:
+			cache = self.compareKeyCache
+			service = service.toCompareString()
+			key = cache.get(service)
+			if key is not None:
+				return key
+			key = service.split(":", 2)[2]
+		if len(cache) > 4096:
+			cache.clear()
+		cache[service] = key
+		return key
+
+	def add(self, entry):
+		self.remove(entry)
+		self.generation += 1
+		key = self.timerKey(entry)
+		bucket = self.services.get(key)
+		if bucket is None:
+			self.services[key] = bucket = [[], [], [], 0]
+		if entry.repeated:
+			bucket[2].append(entry)
+		else:
+			pos = bisect_left(bucket[0], entry.begin)
+			bucket[0].insert(pos, entry.begin)
+			bucket[1].insert(pos, entry)
+			if entry.end - entry.begin > bucket[3]:
+				bucket[3] = entry.end - entry.begin
+		self.indexed[entry] = (key, entry.begin, entry.repeated)
+
+	def remove(self, entry):
+		item = self.indexed.pop(entry, None)
+		if item is None:
+			return
+		self.generation += 1
+		key, begin, repeated = item
+		bucket = self.services[key]
+		if repeated:
+			bucket[2].remove(entry)
+		else:
+			pos = bisect_left(bucket[0], begin)
+			while bucket[1][pos] is not entry:
+				pos += 1
+			del bucket[0][pos]
+			del bucket[1][pos]
+		if not bucket[1] and not bucket[2]:
+			del self.services[key]
+
+	# Returns the timers on the service (key) which overlap startAt..endAt,
+	# ordered by begin.
+	def getTimers(self, key, startAt, endAt):
+		bucket = self.services.get(key)
+		if bucket is None:
+			return []
+		begins, timers, repeated, maxDuration = bucket
+		found = [timer for timer in timers[bisect_left(begins, startAt - maxDuration):bisect_left(begins, endAt)] if startAt <= timer.end]
+		if repeated:
+			found.extend([timer for timer in repeated if timer.begin < endAt])
+			found.sort(key=lambda timer: timer.begin)
+		return found
+
+
 class RecordTimer(Timer):
 	def __init__(self):
+		self.serviceIndex = ServiceTimerIndex()
+		self.xmlCache = {}
 		Timer.__init__(self)
 
 		self.onTimerAdded = []
@@ -1015,8 +1108,17 @@ class RecordTimer(Timer):
 		except IOError:
 			print("[RecordTimer] unable to load timers from file!")
 
+	def addTimerEntry(self, entry, noRecalc=0, dosave=True):
+		Timer.addTimerEntry(self, entry, noRecalc, dosave)
+		# timers in timer_list are the ones which have not ended yet
+		if entry.state < RecordTimerEntry.StateEnded:
+			self.serviceIndex.add(entry)
+		else:
+			self.serviceIndex.remove(entry)
+
 	def timeChanged(self, entry, dosave=True):
 		Timer.timeChanged(self, entry, dosave)
+		self.serviceIndex.generation += 1
 		for f in self.onTimerChanged:
 			f(entry)
 
@@ -1045,9 +1147,11 @@ class RecordTimer(Timer):
 			self.timer_list.remove(w)
 		except:
 			print("[RecordTimer] Remove list failed")
+		self.serviceIndex.remove(w)
 		if w.state < RecordTimerEntry.StateEnded:  # did this timer reached the last state?
 			# no, sort it into active list
 			insort(self.timer_list, w)
+			self.serviceIndex.add(w)
 		else:
 			# yes. Process repeated, and re-add.
 			if w.repeated:
@@ -1107,71 +1211,33 @@ class RecordTimer(Timer):
 			from Screens.MessageBox import MessageBox
 			AddPopup(_("Timer overlap in timers.xml detected!\nPlease recheck it!") + timer_text, type=MessageBox.TYPE_ERROR, timeout=0, id="TimerLoadFailed")
 
-	def saveTimer(self):
-		afterEvents = {
-			AFTEREVENT.NONE: "nothing",
-			AFTEREVENT.STANDBY: "standby",
-			AFTEREVENT.DEEPSTANDBY: "deepstandby",
-			AFTEREVENT.AUTO: "auto"
-		}
+	def getSaveDelay(self):
+		return config.recording.timers_save_delay.value * 1000
 
+	@staticmethod
+	def getTimerSignature(entry):
+		# everything written for an entry, to decide if its cached XML is still valid
+		return (
+			int(entry.begin), int(entry.end), entry.service_ref.toString(), int(entry.repeated), int(entry.rename_repeat),
+			entry.name, entry.description, entry.afterEvent, int(entry.justplay), int(entry.always_zap), int(entry.pipzap),
+			int(entry.conflict_detection), int(entry.descramble), int(entry.record_ecm), int(entry.isAutoTimer), entry.eit,
+			entry.dirname, tuple(entry.tags), entry.disabled, entry.autoTimerId, entry.ice_timer_id, frozenset(entry.flags),
+			len(entry.log_entries), entry.log_entries and entry.log_entries[0], entry.log_entries and entry.log_entries[-1])
+
+	def writeTimer(self):
+		# XML fragments of unchanged entries are reused from the previous write
+		xmlCache = self.xmlCache
+		self.xmlCache = {}
 		list = ['<?xml version="1.0" ?>\n<timers>\n']
 		for entry in self.timer_list + self.processed_timers:
 			if entry.dontSave:
 				continue
-			list.append(
-				'<timer'
-				' begin="%d"'
-				' end="%d"'
-				' serviceref="%s"'
-				' repeated="%d"'
-				' rename_repeat="%d"'
-				' name="%s"'
-				' description="%s"'
-				' afterevent="%s"'
-				' justplay="%d"'
-				' always_zap="%d"'
-				' pipzap="%d"'
-				' conflict_detection="%d"'
-				' descramble="%d"'
-				' record_ecm="%d"'
-				' isAutoTimer="%d"' % (
-					int(entry.begin),
-					int(entry.end),
-					stringToXML(str(entry.service_ref)),
-					int(entry.repeated),
-					int(entry.rename_repeat),
-					stringToXML(entry.name),
-					stringToXML(entry.description),
-					afterEvents[entry.afterEvent],
-					int(entry.justplay),
-					int(entry.always_zap),
-					int(entry.pipzap),
-					int(entry.conflict_detection),
-					int(entry.descramble),
-					int(entry.record_ecm),
-					int(entry.isAutoTimer)))
-			if entry.eit is not None:
-				list.append(' eit="' + str(entry.eit) + '"')
-			if entry.dirname:
-				list.append(' location="' + stringToXML(entry.dirname) + '"')
-			if entry.tags:
-				list.append(' tags="' + stringToXML(' '.join(entry.tags)) + '"')
-			if entry.disabled:
-				list.append(' disabled="' + str(int(entry.disabled)) + '"')
-			if entry.autoTimerId:
-				list.append(' autoTimerId="' + str(entry.autoTimerId) + '"')
-			if entry.ice_timer_id is not None:
-				list.append(' ice_timer_id="' + str(entry.ice_timer_id) + '"')
-			if entry.flags:
-				list.append(' flags="' + ' '.join([stringToXML(x) for x in entry.flags]) + '"')
-
-			if len(entry.log_entries) == 0:
-				list.append('/>\n')
-			else:
-				for log_time, code, msg in entry.log_entries:
-					list.append('>\n<log code="%d" time="%d">%s</log' % (code, log_time, stringToXML(msg)))
-				list.append('>\n</timer>\n')
+			signature = self.getTimerSignature(entry)
+			cached = xmlCache.get(entry)
+			if cached is None or cached[0] != signature:
+				cached = (signature, self.timerToXML(entry))
+			self.xmlCache[entry] = cached
+			list.append(cached[1])
 
 		list.append('</timers>\n')
 
@@ -1201,6 +1267,71 @@ class RecordTimer(Timer):
 			file.close()
 			rename(self.Filename + ".writing", self.Filename)
 
+	@staticmethod
+	def timerToXML(entry):
+		afterEvents = {
+			AFTEREVENT.NONE: "nothing",
+			AFTEREVENT.STANDBY: "standby",
+			AFTEREVENT.DEEPSTANDBY: "deepstandby",
+			AFTEREVENT.AUTO: "auto"
+		}
+
+		list = []
+		list.append(
+			'<timer'
+			' begin="%d"'
+			' end="%d"'
+			' serviceref="%s"'
+			' repeated="%d"'
+			' rename_repeat="%d"'
+			' name="%s"'
+			' description="%s"'
+			' afterevent="%s"'
+			' justplay="%d"'
+			' always_zap="%d"'
+			' pipzap="%d"'
+			' conflict_detection="%d"'
+			' descramble="%d"'
+			' record_ecm="%d"'
+			' isAutoTimer="%d"' % (
+				int(entry.begin),
+				int(entry.end),
+				stringToXML(str(entry.service_ref)),
+				int(entry.repeated),
+				int(entry.rename_repeat),
+				stringToXML(entry.name),
+				stringToXML(entry.description),
+				afterEvents[entry.afterEvent],
+				int(entry.justplay),
+				int(entry.always_zap),
+				int(entry.pipzap),
+				int(entry.conflict_detection),
+				int(entry.descramble),
+				int(entry.record_ecm),
+				int(entry.isAutoTimer)))
+		if entry.eit is not None:
+			list.append(' eit="' + str(entry.eit) + '"')
+		if entry.dirname:
+			list.append(' location="' + stringToXML(entry.dirname) + '"')
+		if entry.tags:
+			list.append(' tags="' + stringToXML(' '.join(entry.tags)) + '"')
+		if entry.disabled:
+			list.append(' disabled="' + str(int(entry.disabled)) + '"')
+		if entry.autoTimerId:
+			list.append(' autoTimerId="' + str(entry.autoTimerId) + '"')
+		if entry.ice_timer_id is not None:
+			list.append(' ice_timer_id="' + str(entry.ice_timer_id) + '"')
+		if entry.flags:
+			list.append(' flags="' + ' '.join([stringToXML(x) for x in entry.flags]) + '"')
+
+		if len(entry.log_entries) == 0:
+			list.append('/>\n')
+		else:
+			for log_time, code, msg in entry.log_entries:
+				list.append('>\n<log code="%d" time="%d">%s</log' % (code, log_time, stringToXML(msg)))
+			list.append('>\n</timer>\n')
+		return "".join(list)
+
 	def getNextZapTime(self):
 		now = time()
 		for timer in self.timer_list:
@@ -1213,6 +1344,7 @@ class RecordTimer(Timer):
 		isStillRecording = False
 		now = time()
 		for timer in self.timer_list:
+			timer.getNextActivation()  # refreshes isStillRecording
 			if timer.isStillRecording:
 				isStillRecording = True
 				break
@@ -1325,8 +1457,9 @@ class RecordTimer(Timer):
 			bday = bt.tm_wday
 			begin2 = 1440 + bt.tm_hour * 60 + bt.tm_min
 			end2 = begin2 + duration // 60
-			xbt = localtime(x.begin)
-			xet = localtime(timer_end)
+			occurrences = x.getRepeatedOccurrences()
+			xbt = occurrences.localBegin
+			xet = occurrences.localEnd if timer_end == x.end else localtime(timer_end)
 			offset_day = False
 			checking_time = x.begin < begin or begin <= x.begin <= end
 			if xbt.tm_yday != xet.tm_yday:
@@ -1386,24 +1519,20 @@ class RecordTimer(Timer):
 		end = begin + duration
 		startAt = begin - config.recording.margin_before.value * 60
 		endAt = end + config.recording.margin_after.value * 60
-		if isinstance(service, str):
-			refstr = ':'.join(service.split(':')[:11])
-		else:
-			refstr = service.toCompareString()
 
-		# iterating is faster than using bisect+indexing to find the first relevant timer
-		for timer in self.timer_list:
-			# repeat timers represent all their future repetitions, so always include them
-			if (startAt <= timer.end or timer.repeated) and timer.begin < endAt:
-				check = timer.service_ref.toCompareString().split(":", 2)[2] == refstr.split(":", 2)[2]
-				if check:
-					matchType = RecordTimer.__checkTimer(timer, check_offset_time, begin, end, duration)
-					if matchType is not None:
-						returnValue = (timer, matchType)
-						if matchType in (2, 3):  # When full recording or within an event do not look further
-							break
+		for timer in self.serviceIndex.getTimers(self.serviceIndex.serviceKey(service), startAt, endAt):
+			matchType = RecordTimer.__checkTimer(timer, check_offset_time, begin, end, duration)
+			if matchType is not None:
+				returnValue = (timer, matchType)
+				if matchType in (2, 3):  # When full recording or within an event do not look further
+					break
 		return returnValue or (None, None)
 
+	# Returns a number that changes whenever a timer is added, removed or
+	# changed, for views that cache what they derive from the timers.
+	def getGeneration(self):
+		return self.serviceIndex.generation
+
 	@staticmethod
 	def isInTimerOnService(serviceTimerList, begin, duration):
 		returnValue = None
@@ -1443,6 +1572,7 @@ class RecordTimer(Timer):
 		# now the timer should be in the processed_timers list. remove it from there.
 		if entry in self.processed_timers:
 			self.processed_timers.remove(entry)
+		self.serviceIndex.remove(entry)
 
 		# Trigger onTimerRemoved callbacks
 		for f in self.onTimerRemoved:
@@ -1452,6 +1582,7 @@ class RecordTimer(Timer):
 
 	def shutdown(self):
 		self.saveTimer()
+		self.flushTimer()
 
 	def cleanup(self):
 		removed_timers = [entry for entry in self.processed_timers if not entry.disabled]
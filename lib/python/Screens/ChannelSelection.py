@@ -8,6 +8,7 @@ from enigma import eActionMap, eServiceReference, eEPGCache, eServiceCenter, eRC
 from Tools.Profile import profile
 from Components.ActionMap import ActionMap, HelpableActionMap, HelpableNumberActionMap
 from Components.Button import Button
+from Components.ChannelNumbers import channelNumbers
 from Components.ChoiceList import ChoiceList, ChoiceEntryComponent
 from Components.config import config, configfile, ConfigSubsection, ConfigText, ConfigYesNo
 from Components.Input import Input
@@ -24,6 +25,7 @@ from Components.Sources.RdsDecoder import RdsDecoder
 from Components.Sources.ServiceEvent import ServiceEvent
 from Components.Sources.StaticText import StaticText
 from Components.SystemInfo import SystemInfo
+from Components.TimerSanityCheck import clearTunerTypeCache
 from Plugins.Plugin import PluginDescriptor
 from RecordTimer import AFTEREVENT
 from Screens.Screen import Screen
@@ -457,6 +459,8 @@ class ChannelContextMenu(Screen):
 	def reloadServices(self):
 		eDVBDB.getInstance().reloadBouquets()
 		eDVBDB.getInstance().reloadServicelist()
+		clearTunerTypeCache()
+		channelNumbers.invalidate()
 		self.session.openWithCallback(self.close, MessageBox, _("The service list is reloaded."), MessageBox.TYPE_INFO, timeout=5)
 
 	def okbuttonClick(self):
@@ -921,6 +925,7 @@ class ChannelSelectionEdit:
 			root = self.getRoot()
 		list = root and serviceHandler.list(root)
 		if list is not None:
+			channelNumbers.invalidate()  # The list is about to be edited, which renumbers the services.
 			return list.startEdit()
 		return None
 
@@ -1163,6 +1168,7 @@ class ChannelSelectionEdit:
 				if self.bouquet_mark_edit == EDIT_ALTERNATIVES and not new_marked and self.__marked:
 					self.mutableList.addService(eServiceReference(self.__marked[0]))
 				self.mutableList.flushChanges()
+				channelNumbers.invalidate()
 		self.__marked = []
 		self.clearMarks()
 		self.bouquet_mark_edit = OFF
@@ -1244,6 +1250,7 @@ class ChannelSelectionEdit:
 				self.toggleMoveMarked()  # unmark current entry
 			self.movemode = False
 			self.mutableList.flushChanges()  # FIXME add check if changes was made
+			channelNumbers.invalidate()
 			self.mutableList = None
 			self.saved_title = None
 			self.buildTitleString()
@@ -1404,17 +1411,7 @@ class ChannelSelectionBase(Screen, HelpableScreen):
 			return 0
 		offset = 0
 		if 'userbouquet.' in bouquet.toCompareString():
-			serviceHandler = eServiceCenter.getInstance()
-			servicelist = serviceHandler.list(bouquet)
-			if servicelist is not None:
-				while True:
-					serviceIterator = servicelist.getNext()
-					if not serviceIterator.valid():  # check if end of list
-						break
-					number = serviceIterator.getChannelNum()
-					if number > 0:
-						offset = number - 1
-						break
+			offset = channelNumbers.getOffset(bouquet)
 		return offset
 
 	def recallBouquetMode(self):
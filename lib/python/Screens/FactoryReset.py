@@ -93,7 +93,7 @@ class FactoryReset(Setup, ProtectedScreen):
 				self.keymaps.append(file)
 			elif file in ("automounts.xml",):
 				self.networks.append(file)
-			elif file in ("resumepoints.pkl",):
+			elif file in ("resumepoints.journal", "resumepoints.pkl"):
 				self.resumePoints.append(file)
 			elif file in ("settings",):
 				self.settings.append(file)
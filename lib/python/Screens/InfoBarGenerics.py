@@ -1,10 +1,12 @@
 # -*- coding: utf-8 -*-
 from Components.ActionMap import ActionMap, HelpableActionMap, HelpableNumberActionMap, NumberActionMap
-from Components.Harddisk import harddiskmanager, findMountPoint
+from Components.ChannelNumbers import channelNumbers
+from Components.Harddisk import harddiskmanager
 from Components.Input import Input
 from Components.Label import Label
 from Components.MovieList import AUDIO_EXTENSIONS
 from Components.PluginComponent import plugins
+from Components.ResumePoints import resumePoints
 from Components.ServiceEventTracker import ServiceEventTracker
 from Components.Sources.ServiceEvent import ServiceEvent
 from Components.Sources.Boolean import Boolean
@@ -67,7 +69,6 @@ from sys import maxsize
 import itertools
 import datetime
 import socket
-import pickle
 from gettext import dgettext
 
 # hack alert!
@@ -85,7 +86,6 @@ def isMoviePlayerInfoBar(self):
 
 
 def setResumePoint(session):
-	global resumePointCache, resumePointCacheLast
 	service = session.nav.getCurrentService()
 	ref = session.nav.getCurrentlyPlayingServiceOrGroup()
 	if (service is not None) and (ref is not None):  # and (ref.type != 1):
@@ -94,73 +94,43 @@ def setResumePoint(session):
 		if seek:
 			pos = seek.getPlayPosition()
 			if not pos[0]:
-				key = ref.toString()
-				lru = int(time())
 				sl = seek.getLength()
 				if sl:
 					sl = sl[1]
 				else:
 					sl = None
-				resumePointCache[key] = [lru, pos[1], sl]
-				for k, v in list(resumePointCache.items()):
-					if v[0] < lru:
-						candidate = k
-						filepath = os.path.realpath(candidate.split(':')[-1])
-						mountpoint = findMountPoint(filepath)
-						if os.path.ismount(mountpoint) and not os.path.exists(filepath):
-							del resumePointCache[candidate]
-				saveResumePoints()
+				resumePoints.set(ref.toString(), pos[1], sl)
 
 
 def delResumePoint(ref):
-	global resumePointCache, resumePointCacheLast
-	try:
-		del resumePointCache[ref.toString()]
-	except KeyError:
-		pass
-	saveResumePoints()
+	resumePoints.delete(ref.toString())
 
 
 def getResumePoint(session):
-	global resumePointCache
 	ref = session.nav.getCurrentlyPlayingServiceOrGroup()
 	if (ref is not None) and (ref.type != 1):
-		try:
-			entry = resumePointCache[ref.toString()]
-			entry[0] = int(time())  # update LRU timestamp
-			return entry[1]
-		except KeyError:
-			return None
+		entry = resumePoints.get(ref.toString())
+		return entry and entry[1]
 
 
 def saveResumePoints():
-	global resumePointCache, resumePointCacheLast
-	try:
-		f = open('/etc/enigma2/resumepoints.pkl', 'wb')
-		pickle.dump(resumePointCache, f, pickle.HIGHEST_PROTOCOL)
-		f.close()
-	except Exception as ex:
-		print("[InfoBarGenerics] Failed to write resumepoints:%s" % ex)
+	global resumePointCacheLast
+	resumePoints.save()
 	resumePointCacheLast = int(time())
 
 
 def loadResumePoints():
-	try:
-		file = open('/etc/enigma2/resumepoints.pkl', 'rb')
-		PickleFile = pickle.load(file)
-		file.close()
-		return PickleFile
-	except Exception as ex:
-		print("[InfoBarGenerics] Failed to load resumepoints:%s" % ex)
-		return {}
+	resumePoints.load()
+	return resumePoints.points
 
 
 def updateresumePointCache():
 	global resumePointCache
-	resumePointCache = loadResumePoints()
+	resumePoints.reloadIfChanged()
+	resumePointCache = resumePoints.points
 
 
-resumePointCache = loadResumePoints()
+resumePointCache = resumePoints.points
 resumePointCacheLast = int(time())
 
 
@@ -1348,37 +1318,25 @@ class InfoBarNumberZap:
 			self.selectAndStartService(service, bouquet)
 
 	def searchNumberHelper(self, serviceHandler, num, bouquet):
-		servicelist = serviceHandler.list(bouquet)
-		if servicelist:
-			serviceIterator = servicelist.getNext()
-			while serviceIterator.valid():
-				if num == serviceIterator.getChannelNum():
-					return serviceIterator
-				serviceIterator = servicelist.getNext()
-		return None
+		return channelNumbers.getService(bouquet, num)
 
 	def searchNumber(self, number, firstBouquetOnly=False, bouquet=None):
 		bouquet = bouquet or self.servicelist.getRoot()
 		service = None
-		serviceHandler = eServiceCenter.getInstance()
 		if not firstBouquetOnly:
-			service = self.searchNumberHelper(serviceHandler, number, bouquet)
+			service = channelNumbers.getService(bouquet, number)
 		if config.usage.multibouquet.value and not service:
-			bouquet = self.servicelist.bouquet_root
-			bouquetlist = serviceHandler.list(bouquet)
-			if bouquetlist:
-				bouquet = bouquetlist.getNext()
-				while bouquet.valid():
-					if bouquet.flags & eServiceReference.isDirectory and not bouquet.flags & eServiceReference.isInvisible:
-						service = self.searchNumberHelper(serviceHandler, number, bouquet)
-						if service:
-							playable = not (service.flags & (eServiceReference.isMarker | eServiceReference.isDirectory)) or (service.flags & eServiceReference.isNumberedMarker)
-							if not playable:
-								service = None
-							break
-						if config.usage.alternative_number_mode.value or firstBouquetOnly:
-							break
-					bouquet = bouquetlist.getNext()
+			if config.usage.alternative_number_mode.value or firstBouquetOnly:
+				bouquets = channelNumbers.getBouquets(self.servicelist.bouquet_root)
+				if bouquets:
+					bouquet = bouquets[0]
+					service = channelNumbers.getService(bouquet, number)
+			else:
+				service, bouquet = channelNumbers.getNumbers(self.servicelist.bouquet_root).get(number, (None, bouquet))
+			if service:
+				playable = not (service.flags & (eServiceReference.isMarker | eServiceReference.isDirectory)) or (service.flags & eServiceReference.isNumberedMarker)
+				if not playable:
+					service = None
 		return service, bouquet
 
 	def selectAndStartService(self, service, bouquet):
@@ -3188,6 +3146,9 @@ class InfoBarJobman:
 			return []
 
 	def getJobName(self, job):
+		lane = job.getLaneName()
+		if lane:
+			return "%s: %s [%s] (%d%%)" % (job.getStatustext(), job.name, lane, int(100 * job.progress / float(job.end)))
 		return "%s: %s (%d%%)" % (job.getStatustext(), job.name, int(100 * job.progress / float(job.end)))
 
 	def showJobView(self, job):
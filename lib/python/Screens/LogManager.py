@@ -61,6 +61,7 @@ class LogManagerPoller:
 
 	def createTrashJob(self):
 		job = Components.Task.Job(_("LogManager"))
+		job.setResources(Components.Task.getMountResource(config.crash.debug_path.value))
 		task = Components.Task.PythonTask(job, _("Checking Logs..."))
 		task.work = self.JobTrash
 		task.weighting = 1
@@ -0,0 +1,50 @@
+from Components.ActionMap import ActionMap
+from Components.Button import Button
+from Components.config import config
+from Screens.TextBox import TextBox
+
+
+class MainloopStatistics(TextBox):
+	MAX_CALLBACKS = 50
+
+	def __init__(self, session):
+		TextBox.__init__(self, session, title=_("Main loop statistics"), skin_name="MainloopStatistics")
+		self["key_green"] = Button(_("Refresh"))
+		self["key_yellow"] = Button(_("Reset"))
+		self["key_blue"] = Button()
+		self["colorActions"] = ActionMap(["ColorActions"], {
+			"red": self.close,
+			"green": self.refresh,
+			"yellow": self.reset,
+			"blue": self.toggleSort
+		}, prio=1)
+		self.sortBy = 1
+		self.onLayoutFinish.append(self.refresh)
+
+	def refresh(self):
+		try:
+			from e2reactor import callbackStatistics
+		except ImportError:
+			self[self.label].setText(_("Main loop statistics are not available without Twisted."))
+			return
+		self["key_blue"].setText({1: _("Sort by maximum"), 2: _("Sort by count"), 0: _("Sort by total")}[self.sortBy])
+		if not config.crash.mainloop_statistics.value:
+			self[self.label].setText(_("Main loop callback statistics are disabled. Enable them in the log settings."))
+			return
+		text = [_("Callbacks taking up to (ms):"), "  ".join("%s: %d" % ("%d" % bound if bound else ">%d" % callbackStatistics.BUCKETS[-1], count) for bound, count in callbackStatistics.getHistogram()), ""]
+		for name, count, total, average, maximum, histogram in callbackStatistics.getStatistics(self.sortBy)[:self.MAX_CALLBACKS]:
+			text.append(name)
+			text.append("    " + _("count %d, total %d ms, average %.1f ms, maximum %d ms") % (count, total, average, maximum))
+		self[self.label].setText("\n".join(text))
+
+	def reset(self):
+		try:
+			from e2reactor import callbackStatistics
+		except ImportError:
+			return
+		callbackStatistics.reset()
+		self.refresh()
+
+	def toggleSort(self):
+		self.sortBy = {1: 2, 2: 0, 0: 1}[self.sortBy]
+		self.refresh()
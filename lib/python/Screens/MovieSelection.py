@@ -201,6 +201,8 @@ def moveServiceFiles(serviceref, dest, name=None, allowCopy=True):
 		if name is None:
 			name = os.path.split(moveList[-1][0])[1]
 		Tools.CopyFiles.moveFiles(moveList, name)
+		if Tools.Trashcan.isTrashFolder(dest):
+			Tools.Trashcan.trashIndex.add(os.path.realpath(dest), [item[1] for item in moveList])
 	except Exception as e:
 		print("[MovieSelection] Failed move:", e)
 		# rethrow exception
@@ -1712,14 +1714,35 @@ class MovieSelection(Screen, HelpableScreen, SelectionEventInfo, InfoBarBase, Pr
 		if config.usage.movielist_trashcan.value and os.access(config.movielist.last_videodir.value, os.W_OK):
 			Tools.Trashcan.createTrashFolder(config.movielist.last_videodir.value)
 		self.loadLocalSettings()
-		self["list"].reload(self.current_ref, self.selected_tags, self.collectionName)
+		# The list is loaded progressively, reloadFinished() is called when it is complete.
+		self.reload_progressive = False
+		self["list"].reload(self.current_ref, self.selected_tags, self.collectionName, onLoaded=self.reloadFinished)
+		if self["list"].isLoading():
+			self.reload_progressive = True
+			self.updateTitle()
+			self.displayMovieOffStatus()
+			self.displaySortStatus()
+			self.reload_found = self.moveToReloadSelection(False)
+			self.reload_current = self.getCurrent()
+			self["waitingtext"].visible = False
+
+	def moveToReloadSelection(self, final=True):
+		if self.reload_sel and self["list"].moveTo(self.reload_sel):
+			return True
+		if self.reload_home and final:
+			self["list"].moveToFirstMovie()
+		return False
+
+	def reloadFinished(self):
 		self.updateTags()
-		self.updateTitle()
-		self.displayMovieOffStatus()
-		self.displaySortStatus()
-		if not (self.reload_sel and self["list"].moveTo(self.reload_sel)):
-			if self.reload_home:
-				self["list"].moveToFirstMovie()
+		if not self.reload_progressive:  # The list was complete at once.
+			self.updateTitle()
+			self.displayMovieOffStatus()
+			self.displaySortStatus()
+			self.moveToReloadSelection()
+		elif not self.reload_found and self.getCurrent() == self.reload_current:
+			# The selection was not on the first page and was not changed while the list was loading.
+			self.moveToReloadSelection()
 		self["freeDiskSpace"].update()
 		self["waitingtext"].visible = False
 		self.createPlaylist()
@@ -112,7 +112,8 @@ class JobView(InfoBarNotifications, ConfigListScreen, Screen):
 		self["job_progress"].value = j.progress
 		self["summary_job_progress"].value = j.progress
 		# print "JobView::state_changed:", j.end, j.progress
-		self["job_status"].text = j.getStatustext()
+		lane = j.getLaneName()
+		self["job_status"].text = "%s (%s)" % (j.getStatustext(), lane) if lane else j.getStatustext()
 		if j.status == j.IN_PROGRESS:
 			self["job_task"].text = j.tasks[j.current_task].name
 			self["summary_job_task"].text = j.tasks[j.current_task].name
@@ -1,8 +1,15 @@
-from Components.Task import PythonTask, Task, Job, job_manager as JobManager, Condition
-from Tools.Directories import fileExists
-from enigma import eTimer
-from os import path
-from shutil import rmtree, copy2, move
+from concurrent.futures import ThreadPoolExecutor
+from errno import EXDEV
+from os import O_CREAT, O_RDONLY, O_WRONLY, SEEK_END, SEEK_SET, close, copy_file_range, fstat, ftruncate, listdir, lseek, lstat, makedirs, open as osopen, path, readlink, remove, rename, replace, rmdir, sendfile, stat, symlink
+from shutil import copystat, rmtree
+from threading import Lock
+from time import time
+
+from Components.Task import FailedPostcondition, PythonTask, Task, Job, job_manager as JobManager, Condition, RESOURCE_NETWORK, getMountResource
+
+COPY_CHUNK = 8 * 1024 * 1024  # Bytes copied by the kernel between progress updates and checks for cancel.
+SMALL_FILE_SIZE = 16 * 1024 * 1024  # Files up to this size, e.g. the .ap, .sc, .cuts, .meta and .eit files of recordings, are copied in a thread pool.
+SMALL_FILE_THREADS = 4
 
 
 class DeleteFolderTask(PythonTask):
@@ -20,50 +27,183 @@ class DeleteFolderTask(PythonTask):
 			raise errors[0]
 
 
-class CopyFileJob(Job):
-	def __init__(self, srcfile, destfile, name):
-		Job.__init__(self, _("Copying files"))
-		cmdline = 'cp -Rf "%s" "%s"' % (srcfile, destfile)
-		AddFileProcessTask(self, cmdline, srcfile, destfile, name)
+class TransferAborted(Exception):
+	pass
 
 
-class MoveFileJob(Job):
-	def __init__(self, srcfile, destfile, name):
-		Job.__init__(self, _("Moving files"))
-		cmdline = 'mv -f "%s" "%s"' % (srcfile, destfile)
-		AddFileProcessTask(self, cmdline, srcfile, destfile, name)
+class FileTransferTask(PythonTask):
+	"""
+	Copy or move a list of (source, destination) files and directories in the
+	kernel with copy_file_range() (sendfile() where that is not supported),
+	small files concurrently in a thread pool.  Files are written as
+	"<destination>.part" and renamed when complete, so a retry of a cancelled
+	or failed transfer skips the files that were completed and continues the
+	partial one where it stopped.  Only the partial files that were written by
+	this task from an unchanged source are continued, others are overwritten.  Moved files are removed when copied,
+	sources on the file system of their destination are renamed instead.
+	"""
+	def __init__(self, job, name, fileList, move=False):
+		PythonTask.__init__(self, job, name)
+		self.fileList = fileList
+		self.move = move
+		self.title = name
+		self.totalBytes = 0
+		self.doneBytes = 0
+		self.startTime = None
+		self.startBytes = 0
+		self.copyFileRange = True
+		self.lock = Lock()
+		self.partFiles = {}  # Partial file: (size, mtime, inode) of the source it was written from.
+
+	def _run(self):
+		PythonTask._run(self)
+		self.timer.start(500)  # The progress is updated twice a second instead of every 5 ms.
 
+	def work(self):
+		self.totalBytes = 0
+		self.doneBytes = 0
+		small = []
+		large = []
+		dirs = []
+		for src, dst in self.fileList:
+			if self.move and self.rename(src, dst):
+				continue
+			self.collect(src, dst, small, large, dirs)
+		self.startTime = time()
+		self.startBytes = self.doneBytes
+		if small:
+			with ThreadPoolExecutor(max_workers=SMALL_FILE_THREADS) as executor:
+				for result in [executor.submit(self.copyFile, src, dst, size) for src, dst, size in small]:
+					result.result()  # Raise the exception of a failed copy.
+		for src, dst, size in large:
+			self.copyFile(src, dst, size)
+		for src, dst in reversed(dirs):  # Copy the times of the directories after their contents, from the inside out.
+			copystat(src, dst)
+			if self.move:
+				rmdir(src)
+
+	def rename(self, src, dst):
+		try:
+			if stat(src).st_dev != stat(path.dirname(dst) or ".").st_dev:
+				return False
+			rename(src, dst)
+			return True
+		except OSError as err:
+			if err.errno == EXDEV:
+				return False
+			raise
+
+	def collect(self, src, dst, small, large, dirs):
+		if self.move and not path.lexists(src) and path.lexists(dst):  # Moved before the transfer was cancelled or failed.
+			return
+		status = lstat(src)
+		if path.islink(src):
+			if not path.lexists(dst):
+				symlink(readlink(src), dst)
+			if self.move:
+				remove(src)
+		elif path.isdir(src):
+			makedirs(dst, exist_ok=True)
+			dirs.append((src, dst))
+			for name in sorted(listdir(src)):
+				self.collect(path.join(src, name), path.join(dst, name), small, large, dirs)
+		else:
+			self.totalBytes += status.st_size
+			if path.exists(dst) and not path.exists("%s.part" % dst) and stat(dst).st_size == status.st_size and stat(dst).st_mtime == status.st_mtime:
+				self.doneBytes += status.st_size  # Completed before the transfer was cancelled or failed.
+				if self.move:
+					remove(src)
+			else:
+				(small if status.st_size <= SMALL_FILE_SIZE else large).append((src, dst, status.st_size))
 
-class AddFileProcessTask(Task):
-	def __init__(self, job, cmdline, srcfile, destfile, name):
-		Task.__init__(self, job, name)
-		self.setCmdline(cmdline)
-		self.srcfile = srcfile
-		self.destfile = destfile
+	def copyFile(self, src, dst, size):
+		if self.aborted:
+			raise TransferAborted()
+		part = "%s.part" % dst
+		fdSrc = osopen(src, O_RDONLY)
+		try:
+			status = fstat(fdSrc)
+			source = (status.st_size, status.st_mtime_ns, status.st_ino)
+			fdDst = osopen(part, O_WRONLY | O_CREAT, 0o644)
+			try:
+				offset = lseek(fdDst, 0, SEEK_END)
+				if offset > size or self.partFiles.get(part) != source:  # Not a part of this source, e.g. left over from another transfer.
+					ftruncate(fdDst, 0)
+					offset = lseek(fdDst, 0, SEEK_SET)
+				self.partFiles[part] = source
+				self.addBytes(offset)
+				while offset < size:
+					if self.aborted:
+						raise TransferAborted()
+					count = self.copyChunk(fdSrc, fdDst, offset, min(COPY_CHUNK, size - offset))
+					if not count:  # The source was truncated.
+						break
+					offset += count
+					self.addBytes(count)
+			finally:
+				close(fdDst)
+		finally:
+			close(fdSrc)
+		copystat(src, part)
+		replace(part, dst)
+		if self.move:
+			remove(src)
+
+	def addBytes(self, count):
+		with self.lock:  # The small files are copied in several threads.
+			self.doneBytes += count
+
+	def copyChunk(self, fdSrc, fdDst, offset, count):
+		if self.copyFileRange:
+			try:
+				return copy_file_range(fdSrc, fdDst, count, offset)
+			except OSError:  # Not supported between these file systems or by the kernel.
+				self.copyFileRange = False
+		return sendfile(fdDst, fdSrc, offset, count)
+
+	def onTimer(self):
+		if self.totalBytes:
+			self.setProgress(int(self.end * self.doneBytes / self.totalBytes))
+			duration = time() - self.startTime if self.startTime else 0
+			if duration > 1:
+				self.name = "%s (%s of %s MB, %.1f MB/s)" % (self.title, self.doneBytes // 1048576, self.totalBytes // 1048576, (self.doneBytes - self.startBytes) / duration / 1048576)
+
+	def onComplete(self, result):
+		self.timer.stop()
+		del self.timer
+		self.name = self.title
+		if self.aborted:
+			self.finish(aborted=True)
+			return
+		self.postconditions = [FailedPostcondition(None if result is None else result.getErrorMessage())]
+		self.finish()
 
-		self.ProgressTimer = eTimer()
-		self.ProgressTimer.callback.append(self.ProgressUpdate)
 
-	def ProgressUpdate(self):
-		if self.srcsize <= 0 or not fileExists(self.destfile, 'r'):
-			return
+class FileTransferJob(Job):
+	def __init__(self, fileList, name, move=False):
+		Job.__init__(self, _("Moving files") if move else _("Copying files"))
+		resources = set()
+		for src, dst in fileList:
+			resources.add(getMountResource(path.dirname(src)))
+			resources.add(getMountResource(path.dirname(dst)))
+		self.setResources(*resources)
+		FileTransferTask(self, name, fileList, move)
 
-		self.setProgress(int((path.getsize(self.destfile) / float(self.srcsize)) * 100))
-		self.ProgressTimer.start(5000, True)
 
-	def prepare(self):
-		if fileExists(self.srcfile, 'r'):
-			self.srcsize = path.getsize(self.srcfile)
-			self.ProgressTimer.start(5000, True)
+class CopyFileJob(FileTransferJob):
+	def __init__(self, srcfile, destfile, name):
+		FileTransferJob.__init__(self, [(srcfile, destfile)], name)
 
-	def afterRun(self):
-		self.setProgress(100)
-		self.ProgressTimer.stop()
+
+class MoveFileJob(FileTransferJob):
+	def __init__(self, srcfile, destfile, name):
+		FileTransferJob.__init__(self, [(srcfile, destfile)], name, move=True)
 
 
 class DownloadProcessTask(Job):
 	def __init__(self, url, filename, file, **kwargs):
 		Job.__init__(self, _("%s") % file)
+		self.setResources(RESOURCE_NETWORK, getMountResource(path.dirname(filename)))
 		DownloadTask(self, url, filename, **kwargs)
 
 
@@ -132,19 +272,24 @@ class DownloadTask(Task):
 
 
 def copyFiles(fileList, name):
-	for src, dst in fileList:
-		if path.isdir(src) or int(path.getsize(src)) / 1000 / 1000 > 100:
-			JobManager.AddJob(CopyFileJob(src, dst, name))
-		else:
-			copy2(src, dst)
+	JobManager.AddJob(FileTransferJob(fileList, name))
 
 
 def moveFiles(fileList, name):
+	# Moves on the same file system are renames, only the other files are
+	# copied in the background.
+	remaining = []
 	for src, dst in fileList:
-		if path.isdir(src) or int(path.getsize(src)) / 1000 / 1000 > 100:
-			JobManager.AddJob(MoveFileJob(src, dst, name))
-		else:
-			move(src, dst)
+		try:
+			if stat(src).st_dev == stat(path.dirname(dst)).st_dev:
+				rename(src, dst)
+				continue
+		except OSError as err:
+			if err.errno != EXDEV:
+				raise
+		remaining.append((src, dst))
+	if remaining:
+		JobManager.AddJob(FileTransferJob(remaining, name, move=True))
 
 
 def deleteFiles(fileList, name):
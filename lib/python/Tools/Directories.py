@@ -87,15 +87,44 @@ skinResolveList = []
 lcdskinResolveList = []
 fontsResolveList = []
 
+# The results of resolveFilename() for the scopes that search the skin, display skin and font directories, including the
+# names that were not found.  These change with the skin and the mounted file systems, so clearResolveLists() clears them.
+RESOLVE_CACHE_SCOPES = (SCOPE_GUISKIN, SCOPE_LCDSKIN, SCOPE_FONTS)
+RESOLVE_CACHE_SIZE = 5000  # Maximum number of cached results, the cache is cleared when it is full.
+resolveCache = {}
+resolveCacheStatistics = {"hits": 0, "misses": 0}
+
 
 def clearResolveLists():
 	global skinResolveList, lcdskinResolveList, fontsResolveList
 	skinResolveList = []
 	lcdskinResolveList = []
 	fontsResolveList = []
+	resolveCache.clear()
+
+
+def getResolveCacheStatistics():
+	return {"hits": resolveCacheStatistics["hits"], "misses": resolveCacheStatistics["misses"], "entries": len(resolveCache)}
 
 
 def resolveFilename(scope, base="", path_prefix=None):
+	if scope in RESOLVE_CACHE_SCOPES and base and path_prefix is None:
+		key = (scope, base)
+		path = resolveCache.get(key)
+		if path is not None:
+			resolveCacheStatistics["hits"] += 1
+			return path
+		resolveCacheStatistics["misses"] += 1
+		path = resolveFilenameUncached(scope, base)
+		if path is not None:
+			if len(resolveCache) >= RESOLVE_CACHE_SIZE:
+				resolveCache.clear()
+			resolveCache[key] = path
+		return path
+	return resolveFilenameUncached(scope, base, path_prefix, getframe(1))
+
+
+def resolveFilenameUncached(scope, base="", path_prefix=None, callingFrame=None):
 	# You can only use the ~/ if we have a prefix directory.
 	if str(base).startswith("~%s" % sep):  # You can only use the ~/ if we have a prefix directory.
 		if path_prefix:
@@ -141,7 +170,7 @@ def resolveFilename(scope, base="", path_prefix=None):
 			skin = pathDirname(config.skin.primary_skin.value)
 			path = pathJoin(path, skin)
 		elif scope in (SCOPE_PLUGIN_ABSOLUTE, SCOPE_PLUGIN_RELATIVE):
-			callingCode = pathNormpath(getframe(1).f_code.co_filename)
+			callingCode = pathNormpath((callingFrame or getframe(1)).f_code.co_filename)
 			plugins = pathNormpath(scopePlugins)
 			path = None
 			if comparePaths(plugins, callingCode):
@@ -228,7 +257,7 @@ def resolveFilename(scope, base="", path_prefix=None):
 		if pathExists(file):
 			path = file
 	elif scope in (SCOPE_PLUGIN_ABSOLUTE, SCOPE_PLUGIN_RELATIVE):
-		callingCode = pathNormpath(getframe(1).f_code.co_filename)
+		callingCode = pathNormpath((callingFrame or getframe(1)).f_code.co_filename)
 		plugins = pathNormpath(scopePlugins)
 		path = None
 		if comparePaths(plugins, callingCode):
@@ -0,0 +1,128 @@
+from collections import OrderedDict, deque
+from time import time
+
+from enigma import eTimer
+
+from Tools.LoadPixmap import LoadPixmap
+
+
+class PixmapLoader:
+	"""
+	Load pixmaps, e.g. the picons of list views, without stalling the main
+	loop on files that are not in the page cache, e.g. on a USB stick that
+	spun down.  The files are read in a worker thread, one at a time, and then
+	decoded with LoadPixmap() on the main thread, which is fast for a file
+	that was just read.  The decoded pixmaps are kept in a bounded cache, the
+	C++ cache of LoadPixmap() is used as requested by the "cached" argument.
+	"""
+	CACHE_SIZE = 300  # Number of decoded pixmaps kept in memory.
+	FAILED_SIZE = 300  # Number of failed pixmaps remembered.
+	FAILED_RETRY = 30  # Seconds before a pixmap that failed to load is tried again, e.g. from a device that was still spinning up.
+	READ_SIZE = 65536
+
+	def __init__(self):
+		self.pixmaps = OrderedDict()  # (path, cached): pixmap, least recently used first.
+		self.failed = OrderedDict()  # (path, cached): time of the failure, oldest first.
+		self.callbacks = {}  # (path, cached): list of callbacks for the requested pixmaps.
+		self.urgent = deque()  # Requests of pixmaps that are shown now.
+		self.prefetched = deque()  # Requests of pixmaps that are likely to be shown soon.
+		self.reading = None
+		self.decodeTimer = eTimer()
+		self.decodeTimer.callback.append(self.decodeNext)
+		self.decoded = deque()  # Requests of which the files were read.
+
+	def getPixmap(self, path, callback=None, cached=None):
+		"""
+		Return the pixmap if it is loaded, otherwise start loading it in the
+		background and return None.  The callback is called with the path and
+		the pixmap when it has been loaded.
+		"""
+		key = (path, cached)
+		pixmap = self.pixmaps.get(key)
+		if pixmap is not None:
+			self.pixmaps.move_to_end(key)
+			return pixmap
+		if self.isFailed(key):
+			return None
+		if callback is not None:
+			callbacks = self.callbacks.setdefault(key, [])
+			if callback not in callbacks:
+				callbacks.append(callback)
+		if key != self.reading and key not in self.urgent:
+			self.urgent.append(key)
+			self.readNext()
+		return None
+
+	def prefetch(self, paths, cached=None):
+		# Replace the previous prefetch requests, only the latest ones are still useful.
+		self.prefetched.clear()
+		for path in paths:
+			key = (path, cached)
+			if path and key not in self.pixmaps and not self.isFailed(key) and key != self.reading and key not in self.decoded and key not in self.prefetched:
+				self.prefetched.append(key)
+		self.readNext()
+
+	def isFailed(self, key):
+		failed = self.failed.get(key)
+		if failed is None:
+			return False
+		if time() - failed < self.FAILED_RETRY:
+			return True
+		del self.failed[key]
+		return False
+
+	def readNext(self):
+		if self.reading is None:
+			while self.urgent or self.prefetched:
+				key = self.urgent.popleft() if self.urgent else self.prefetched.popleft()
+				if key not in self.pixmaps and key not in self.decoded:
+					from twisted.internet import threads
+					self.reading = key
+					threads.deferToThread(self.readFile, key[0]).addBoth(self.fileRead)
+					break
+
+	def readFile(self, path):
+		# Runs in a worker thread, reads the file into the page cache.
+		with open(path, "rb") as fd:
+			while fd.read(self.READ_SIZE):
+				pass
+
+	def fileRead(self, result):
+		self.decoded.append(self.reading)
+		self.reading = None
+		self.decodeTimer.start(0, True)
+		self.readNext()
+
+	def decodeNext(self):
+		# Decode one pixmap per main loop iteration.
+		if self.decoded:
+			key = self.decoded.popleft()
+			try:
+				pixmap = LoadPixmap(key[0], cached=key[1])
+			except Exception as err:
+				print("[PixmapLoader] Error: Unable to load '%s'! (%s)" % (key[0], str(err)))
+				pixmap = None
+			if pixmap is None:
+				self.failed.pop(key, None)
+				self.failed[key] = time()
+				if len(self.failed) > self.FAILED_SIZE:
+					self.failed.popitem(last=False)
+			else:
+				self.pixmaps[key] = pixmap
+				if len(self.pixmaps) > self.CACHE_SIZE:
+					self.pixmaps.popitem(last=False)
+			for callback in self.callbacks.pop(key, []):
+				callback(key[0], pixmap)
+			if self.decoded:
+				self.decodeTimer.start(0, True)
+
+	def cancel(self, callback):
+		# Forget the callback, e.g. when the list view is closed.
+		for key in list(self.callbacks):
+			if callback in self.callbacks[key]:
+				self.callbacks[key].remove(callback)
+				if not self.callbacks[key]:
+					del self.callbacks[key]
+
+
+pixmapLoader = PixmapLoader()
@@ -1,5 +1,10 @@
 # the implementation here is a bit crappy.
 from boxbranding import getBoxType, getMachineBuild
+import builtins
+from json import dump
+from os import replace
+import sys
+from threading import get_ident
 import time
 from Tools.Directories import resolveFilename, SCOPE_CONFIG
 
@@ -32,9 +37,7 @@ except IOError:
 	print("[Profile] WARNING: couldn't open profile file!")
 
 
-def profile(id):
-	now = time.time() - profile_start
-
+def getProgressDevice():
 	# GML: Set the device and format here...probably more could be added?
 	#
 	box_type = getBoxType()
@@ -47,12 +50,170 @@ def profile(id):
 	elif box_type == "gb800seplus":
 		dev_fmt = ("/dev/mcu", "%d  \n")
 	elif box_type == "ebox5000":
-		dev_fmt = ("/proc/progress", "%d"),
+		dev_fmt = ("/proc/progress", "%d")
 	elif getMachineBuild() in ("inihdp", "inihdx"):
 		dev_fmt = ("/proc/vfd", "Loading %d%%\n")
 	else:
 		dev_fmt = ("/proc/progress", "%d \n")
-	(dev, fmt) = dev_fmt
+	return dev_fmt
+
+
+progress_device = getProgressDevice()
+progress_percentage = None
+
+
+class BootProfiler:
+	"""
+	Structured profile of the boot, written as JSON to profile.json next to the
+	flat profile file so that the boot of two images can be compared.  The
+	profile() steps, the spans of profileSpan() and the imports of modules
+	form a tree of spans with their start time, duration and the time not
+	spent in child spans.  Imports are timed by a wrapper of __import__ on the
+	main thread, imports and spans shorter than MIN_DURATION are left out of
+	the tree but their time is still accounted for in their parent.
+	"""
+	MIN_DURATION = 0.001  # Seconds.
+	TOP_IMPORTS = 100  # Number of the slowest imports listed separately.
+
+	def __init__(self, start):
+		self.start = start
+		self.root = self.newSpan("boot", 0.0, False)
+		self.stack = [self.root]
+		self.imports = {}  # Module name: [duration including the imports it did, duration of its own code].
+		self.thread = get_ident()
+		self.builtinImport = builtins.__import__
+		builtins.__import__ = self.importHook
+
+	def newSpan(self, name, start, step):
+		return {"name": name, "start": start, "duration": 0.0, "self": 0.0, "children": [], "childTime": 0.0, "step": step}
+
+	def now(self):
+		return time.time() - self.start
+
+	def begin(self, name, step=False):
+		if step:  # A step ends the previous step of its parent.
+			self.endStep()
+		span = self.newSpan(name, self.now(), step)
+		self.stack[-1]["children"].append(span)
+		self.stack.append(span)
+		return span
+
+	def end(self, span):
+		if span in self.stack:
+			now = self.now()
+			while self.stack[-1] is not span:  # Steps that are still running in the span end with it.
+				self.close(self.stack.pop(), now)
+			self.close(self.stack.pop(), now)
+
+	def endStep(self):
+		if len(self.stack) > 1 and self.stack[-1]["step"]:
+			self.close(self.stack.pop(), self.now())
+
+	def close(self, span, now):
+		span["duration"] = now - span["start"]
+		span["self"] = span["duration"] - span["childTime"]
+		parent = self.stack[-1]
+		parent["childTime"] += span["duration"]
+		if span["duration"] < self.MIN_DURATION and not span["children"] and not span["step"]:
+			parent["children"].remove(span)
+
+	def importHook(self, name, globals=None, locals=None, fromlist=(), level=0):
+		if get_ident() != self.thread or (level == 0 and name in sys.modules):
+			return self.builtinImport(name, globals, locals, fromlist, level)
+		modules = len(sys.modules)
+		span = self.begin("import %s" % name)
+		try:
+			return self.builtinImport(name, globals, locals, fromlist, level)
+		finally:
+			self.end(span)
+			if len(sys.modules) == modules:  # Nothing was loaded, e.g. a relative import of a loaded module.
+				parent = self.stack[-1]
+				parent["childTime"] -= span["duration"]
+				if span in parent["children"]:
+					parent["children"].remove(span)
+			else:
+				times = self.imports.setdefault(name, [0.0, 0.0])
+				times[0] += span["duration"]
+				times[1] += span["self"]
+
+	def finish(self):
+		if builtins.__import__ == self.importHook:
+			builtins.__import__ = self.builtinImport
+		now = self.now()
+		while len(self.stack) > 1:
+			self.close(self.stack.pop(), now)
+		self.root["duration"] = now
+		self.root["self"] = now - self.root["childTime"]
+
+	def getReport(self):
+		def export(span):
+			return {
+				"name": span["name"],
+				"start": round(span["start"], 3),
+				"duration": round(span["duration"], 3),
+				"self": round(span["self"], 3),
+				"children": [export(child) for child in span["children"]]
+			}
+
+		def findPlugins(span):
+			for child in span["children"]:
+				if child["name"].startswith("plugin ") and not child["step"]:  # The imports of plugins in PluginComponent.
+					plugins.append({"plugin": child["name"][7:], "duration": round(child["duration"], 3)})
+				findPlugins(child)
+
+		plugins = []
+		findPlugins(self.root)
+		imports = sorted(self.imports.items(), key=lambda item: item[1][1], reverse=True)[:self.TOP_IMPORTS]
+		return {
+			"version": 1,
+			"boxType": getBoxType(),
+			"machineBuild": getMachineBuild(),
+			"started": round(self.start, 3),
+			"duration": round(self.root["duration"], 3),
+			"spans": export(self.root),
+			"plugins": sorted(plugins, key=lambda plugin: plugin["duration"], reverse=True),
+			"imports": [{"module": name, "duration": round(times[0], 3), "self": round(times[1], 3)} for name, times in imports]
+		}
+
+	def save(self, fileName):
+		try:
+			with open("%s.tmp" % fileName, "w") as fd:
+				dump(self.getReport(), fd, indent=1)
+			replace("%s.tmp" % fileName, fileName)
+		except (IOError, OSError) as err:
+			print("[Profile] WARNING: couldn't write boot profile report! (%s)" % str(err))
+
+
+boot_profiler = BootProfiler(profile_start)
+
+
+class profileSpan:
+	"""
+	Context manager for a nested span of the boot profile, e.g.:
+		with profileSpan("plugin Extensions/MediaPlayer"):
+			...
+	"""
+	def __init__(self, name):
+		self.name = name
+		self.span = None
+
+	def __enter__(self):
+		if boot_profiler:
+			self.span = boot_profiler.begin(self.name)
+		return self
+
+	def __exit__(self, *args):
+		if boot_profiler and self.span:
+			boot_profiler.end(self.span)
+		return False
+
+
+def profile(id, step=True):
+	# With step=False only the progress is shown, e.g. for the plugins, that are timed with profileSpan().
+	global progress_percentage
+	now = time.time() - profile_start
+	if boot_profiler and step:
+		boot_profiler.begin(id, step=True)
 
 	if profile_file:
 		profile_file.write("%7.3f\t%s\n" % (now, id))
@@ -63,16 +224,23 @@ def profile(id):
 				perc = t * (PERCENTAGE_END - PERCENTAGE_START) // total_time + PERCENTAGE_START
 			else:
 				perc = PERCENTAGE_START
-			try:
-				f = open(dev, "w")
-				f.write(fmt % perc)
-				f.close()
-			except IOError:
-				pass
+			if perc != progress_percentage:  # Only write the progress device when the shown percentage changes.
+				progress_percentage = perc
+				(dev, fmt) = progress_device
+				try:
+					f = open(dev, "w")
+					f.write(fmt % perc)
+					f.close()
+				except IOError:
+					pass
 
 
 def profile_final():
-	global profile_file
+	global profile_file, boot_profiler
 	if profile_file is not None:
 		profile_file.close()
 		profile_file = None
+	if boot_profiler:
+		boot_profiler.finish()
+		boot_profiler.save(resolveFilename(SCOPE_CONFIG, "profile.json"))
+		boot_profiler = None
@@ -1,4 +1,7 @@
-from os import access, mkdir, path as ospath, rmdir, stat, statvfs, walk, W_OK
+from concurrent.futures import ThreadPoolExecutor
+from os import access, fsencode, listdir, lstat, mkdir, path as ospath, replace, rmdir, statvfs, walk, W_OK
+from pickle import HIGHEST_PROTOCOL, dump, load
+from threading import Lock
 import enigma
 import time
 
@@ -58,6 +61,114 @@ def get_size(start_path="."):
 	return total_size
 
 
+INDEX_FILE = ".trashindex.pkl"  # The index of the items in a trash can, kept in the trash can itself.
+KEEP_FILES = (INDEX_FILE, ".e2settings.pkl")  # Files in a trash can that are not trashed items.
+ERASE_RATE_RECORDING = 32 * 1024 * 1024  # Bytes per second erased while a recording is running.
+CLEAN_THREADS = 4  # Number of trash cans on different mounts that are cleaned at the same time.
+
+
+def getItemSize(path):
+	try:
+		if ospath.isdir(path) and not ospath.islink(path):
+			return get_size(path)
+		return lstat(path).st_size
+	except OSError:
+		return 0
+
+
+class TrashIndex:
+	"""
+	Index of the items in each trash can, a dictionary of the names of the
+	items in the top level of the trash can to [ctime, size] lists.  The items
+	are added with their size when they are moved to the trash can, items that
+	got there in another way, e.g. by a client of a network share, are added
+	when the trash can is scanned.  So a scan only lists the top level of the
+	trash can instead of walking and stat'ing every trashed file.
+	"""
+	def __init__(self):
+		self.lock = Lock()
+		self.locks = {}  # Trash folder: lock of its index, scans of different trash cans can run in parallel.
+		self.folders = {}  # Trash folder: dictionary of item names to [ctime, size].
+
+	def getLock(self, trash):
+		with self.lock:
+			return self.locks.setdefault(trash, Lock())
+
+	def getItems(self, trash):  # Call with the lock of the trash folder.
+		items = self.folders.get(trash)
+		if items is None:
+			items = {}
+			fileName = ospath.join(trash, INDEX_FILE)
+			if ospath.exists(fileName):
+				try:
+					with open(fileName, "rb") as fd:
+						items = load(fd)
+				except Exception as err:
+					print("[Trashcan] Failed to load trash index '%s': %s" % (fileName, str(err)))
+			self.folders[trash] = items
+		return items
+
+	def save(self, trash, items):  # Call with the lock of the trash folder.
+		fileName = ospath.join(trash, INDEX_FILE)
+		try:
+			with open("%s.tmp" % fileName, "wb") as fd:
+				dump(items, fd, HIGHEST_PROTOCOL)
+			replace("%s.tmp" % fileName, fileName)
+		except OSError as err:
+			print("[Trashcan] Failed to save trash index '%s': %s" % (fileName, str(err)))
+
+	def add(self, trash, paths):
+		# Called with the paths of the items in the trash can after they were moved there.
+		now = time.time()
+		sizes = [(ospath.basename(path), getItemSize(path)) for path in paths if ospath.lexists(path)]  # Items that are still being copied are added by the next scan.
+		with self.getLock(trash):
+			items = self.getItems(trash)
+			for name, size in sizes:
+				items[name] = [now, size]
+			self.save(trash, items)
+
+	def remove(self, trash, names):
+		with self.getLock(trash):
+			items = self.getItems(trash)
+			for name in names:
+				items.pop(name, None)
+			self.save(trash, items)
+
+	def scan(self, trash):
+		"""
+		Reconcile the index with the top level of the trash can and return
+		a list of (ctime, name, size) tuples of the items, oldest first.
+		"""
+		try:
+			names = set(listdir(trash))
+		except OSError:
+			return []
+		with self.getLock(trash):
+			items = self.getItems(trash)
+			changed = False
+			for name in [name for name in items if name not in names]:
+				del items[name]
+				changed = True
+			for name in names:
+				if name not in items and name not in KEEP_FILES and not name.startswith(INDEX_FILE):
+					path = ospath.join(trash, name)
+					try:
+						ctime = lstat(path).st_ctime  # Moving an item updates its ctime, so this is the time it was trashed.
+					except OSError:
+						continue
+					items[name] = [ctime, getItemSize(path)]
+					changed = True
+			if changed:
+				self.save(trash, items)
+			return sorted((entry[0], name, entry[1]) for name, entry in items.items())
+
+	def getSize(self, trash):
+		return sum(item[2] for item in self.scan(trash)) if trash else 0
+
+
+trashIndex = TrashIndex()
+
+
 class Trashcan:
 	def __init__(self, session):
 		self.session = session
@@ -105,8 +216,10 @@ def clean(ctimeLimit, reserveBytes):
 	if config.usage.movielist_trashcan.value and not isCleaning:
 		name = _("Cleaning Trashes")
 		job = Components.Task.Job(name)
+		trashFolders = getTrashFolders()
+		job.setResources(*trashFolders.keys())  # The trash cans are scanned and walked on each of these mounts, the files are erased in the background.
 		task = CleanTrashTask(job, name)
-		task.openFiles(ctimeLimit, reserveBytes)
+		task.openFiles(ctimeLimit, reserveBytes, trashFolders)
 		Components.Task.job_manager.AddJob(job)
 	elif isCleaning:
 		print("[Trashcan] Cleanup already running")
@@ -128,6 +241,8 @@ def cleanAll(path=None):
 				rmdir(ospath.join(root, name))
 			except:
 				pass
+	with trashIndex.getLock(trash):
+		trashIndex.folders.pop(trash, None)
 
 
 def init(session):
@@ -135,76 +250,100 @@ def init(session):
 	instance = Trashcan(session)
 
 
+def getTrashFolders():
+	# Return a dictionary of mount point to the set of the trash cans on it.
+	# add the default movie path
+	trashcanLocations = set([ospath.join(config.usage.default_path.value)])
+
+	# add the root and the movie directory of each mount
+	print("[Trashcan] probing folders")
+	for parts in Harddisk.getProcMounts():
+		if parts[1] == "/media/autofs":
+			continue
+		# skip network mounts unless the option to clean them is set
+		if (not config.usage.movielist_trashcan_network_clean.value and
+			(parts[1].startswith("/media/net") or parts[1].startswith("/media/autofs"))):
+			continue
+		# one trashcan in the root, one in movie subdirectory
+		trashcanLocations.add(parts[1])
+		trashcanLocations.add(ospath.join(parts[1], "movie"))
+
+	trashFolders = {}
+	for trashfolder in trashcanLocations:
+		trashfolder = ospath.join(trashfolder, ".Trash")
+		if ospath.isdir(trashfolder):
+			trashFolders.setdefault(Harddisk.findMountPoint(ospath.realpath(trashfolder)), set()).add(ospath.realpath(trashfolder))
+	return trashFolders
+
+
 class CleanTrashTask(Components.Task.PythonTask):
-	def openFiles(self, ctimeLimit, reserveBytes):
+	def openFiles(self, ctimeLimit, reserveBytes, trashFolders):
 		self.ctimeLimit = ctimeLimit
 		self.reserveBytes = reserveBytes
+		self.trashFolders = trashFolders  # The trash cans of the mounts that are the resources of the job.
 
 	def work(self):
-		# add the default movie path
-		trashcanLocations = set([ospath.join(config.usage.default_path.value)])
-
-		# add the root and the movie directory of each mount
-		print("[Trashcan] probing folders")
-		f = open("/proc/mounts", "r")
-		for line in f.readlines():
-			parts = line.strip().split()
-			if parts[1] == "/media/autofs":
-				continue
-			# skip network mounts unless the option to clean them is set
-			if (not config.usage.movielist_trashcan_network_clean.value and
-				(parts[1].startswith("/media/net") or parts[1].startswith("/media/autofs"))):
-				continue
-			# one trashcan in the root, one in movie subdirectory
-			trashcanLocations.add(parts[1])
-			trashcanLocations.add(ospath.join(parts[1], "movie"))
-		f.close()
-
-		for trashfolder in trashcanLocations:
-			trashfolder = ospath.join(trashfolder, ".Trash")
-			if ospath.isdir(trashfolder):
-				print("[Trashcan][CleanTrashTask][work] looking in trashcan", trashfolder)
-				trashsize = get_size(trashfolder)
-				diskstat = statvfs(trashfolder)
-				free = diskstat.f_bfree * diskstat.f_bsize
-				bytesToRemove = self.reserveBytes - free
-				print("[Trashcan][CleanTrashTask][work] " + str(trashfolder) + ": Size:", "{:,}".format(trashsize))
-				candidates = []
-				size = 0
-				for root, dirs, files in walk(trashfolder.encode(), topdown=False):  # handle non utf-8 files
-					for name in files:  # Don't delete any per-directory config files from .Trash
-						if (config.movielist.settings_per_directory.value and name == b".e2settings.pkl"):
-							continue
-						fn = ospath.join(root, name)
-						try:			# file may not exist, if dual delete activities.
-							st = stat(fn)
-						except FileNotFoundError:
-							print("[Trashcan][CleanTrashTask[work]  FileNotFoundError ", fn)
-							continue
-						if st.st_ctime < self.ctimeLimit or config.usage.movielist_trashcan_days.value == 0:
-							enigma.eBackgroundFileEraser.getInstance().erase(fn)
-							bytesToRemove -= st.st_size
-						else:
-							candidates.append((st.st_ctime, fn, st.st_size))
-							size += st.st_size
-					for name in dirs:		# Remove empty directories if possible
-						try:
-							rmdir(ospath.join(root, name))
-						except Exception as e:
-							print("[Trashcan][CleanTrashTask][work] unable to delete directory ", root, "/", name, "   ", e)
-							pass
-					candidates.sort()
-					# Now we have a list of ctime, candidates, size. Sorted by ctime (=deletion time)
-					for st_ctime, fn, st_size in candidates:
-						if bytesToRemove < 0:
-							break
-						try:  # file may not exist if simultaneously a network trashcan and main box emptying trash
-							enigma.eBackgroundFileEraser.getInstance().erase(fn)
-						except:
-							pass
-						bytesToRemove -= st_size
-						size -= st_size
-					print("[Trashcan][CleanTrashTask][work] " + str(trashfolder) + ": Size now:", "{:,}".format(size))
+		# Clean the trash cans on different mounts in parallel, the ones on the same mount one after the other.
+		with ThreadPoolExecutor(max_workers=CLEAN_THREADS) as executor:
+			for future in [executor.submit(self.cleanFolders, sorted(folders)) for folders in self.trashFolders.values()]:
+				future.result()
+
+	def cleanFolders(self, trashfolders):
+		for trashfolder in trashfolders:
+			if not self.aborted and ospath.isdir(trashfolder):  # The job may have waited for its resources, the mount may be gone.
+				self.cleanFolder(trashfolder)
+
+	def cleanFolder(self, trashfolder):
+		print("[Trashcan][CleanTrashTask][work] looking in trashcan", trashfolder)
+		items = trashIndex.scan(trashfolder)
+		size = sum(item[2] for item in items)
+		diskstat = statvfs(trashfolder)
+		free = diskstat.f_bfree * diskstat.f_bsize
+		bytesToRemove = self.reserveBytes - free
+		print("[Trashcan][CleanTrashTask][work] " + str(trashfolder) + ": Size:", "{:,}".format(size))
+		# The items are sorted by ctime (=deletion time), so the expired ones come first followed by the ones to make room.
+		erased = []
+		for st_ctime, name, st_size in items:
+			if self.aborted or not (st_ctime < self.ctimeLimit or config.usage.movielist_trashcan_days.value == 0 or bytesToRemove > 0):
+				break
+			self.eraseItem(ospath.join(trashfolder, name))
+			erased.append(name)
+			bytesToRemove -= st_size
+			size -= st_size
+			self.throttle(st_size)
+		if erased:
+			trashIndex.remove(trashfolder, erased)
+		print("[Trashcan][CleanTrashTask][work] " + str(trashfolder) + ": Size now:", "{:,}".format(size))
+
+	def eraseItem(self, path):
+		eraser = enigma.eBackgroundFileEraser.getInstance()
+		if ospath.isdir(path) and not ospath.islink(path):
+			for root, dirs, files in walk(fsencode(path), topdown=False):  # handle non utf-8 files
+				for name in files:
+					eraser.erase(ospath.join(root, name))
+				for name in dirs:  # Remove empty directories if possible
+					try:
+						rmdir(ospath.join(root, name))
+					except OSError as e:
+						print("[Trashcan][CleanTrashTask][work] unable to delete directory ", root, "/", name, "   ", e)
+			try:
+				rmdir(fsencode(path))
+			except OSError:
+				pass  # The files are still being erased, the directory is removed by a later cleanup.
+		else:
+			try:  # file may not exist if simultaneously a network trashcan and main box emptying trash
+				eraser.erase(path)
+			except Exception:
+				pass
+
+	def throttle(self, size):
+		# Erasing a large recording causes a burst of I/O, so spread the erasing out while recordings are running.
+		from RecordTimer import n_recordings
+		if n_recordings > 0:
+			delay = float(size) / ERASE_RATE_RECORDING
+			while delay > 0 and not self.aborted:
+				time.sleep(min(delay, 0.5))
+				delay -= 0.5
 
 
 class TrashInfo(VariableText, GUIComponent):
@@ -221,7 +360,7 @@ class TrashInfo(VariableText, GUIComponent):
 
 	def update(self, path):
 		try:
-			total_size = get_size(getTrashFolder(path))
+			total_size = trashIndex.getSize(getTrashFolder(path))
 		except OSError:
 			return -1
 
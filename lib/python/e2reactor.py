@@ -12,6 +12,8 @@ Maintainer: U{Felix Domke<mailto:tmbinc@elitedvb.net>}
 import select
 import errno
 import sys
+from bisect import bisect_left
+from time import monotonic, time
 
 # Twisted imports
 from twisted.python import log, failure
@@ -29,6 +31,107 @@ selectables = {}
 POLL_DISCONNECTED = (select.POLLHUP | select.POLLERR | select.POLLNVAL)
 
 
+class CallbackStatistics:
+	"""
+	Optional instrumentation of the main loop.  Records the wall time of each
+	callback run by the main loop in a histogram per callback and logs the
+	callbacks that block the main loop for longer than a threshold.  Measured
+	are the Python callbacks called by the enigma poll (eTimer, socket notifier,
+	console and other C++ signal callbacks) and the Twisted readers, writers and
+	delayed calls.
+	"""
+	BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)  # Upper bounds of the histogram buckets in ms, the last bucket is open ended.
+
+	def __init__(self):
+		self.enabled = False
+		self.threshold = 100  # ms
+		self.starts = {}
+		self.pollCode = None
+		self.reset()
+
+	def reset(self):
+		self.since = time()
+		self.callbacks = {}  # Dictionary of callback name to [count, total time, maximum time, histogram].
+		self.histogram = [0] * (len(self.BUCKETS) + 1)
+
+	def setEnabled(self, enabled, threshold=None):
+		if threshold is not None:
+			self.threshold = threshold
+		if enabled != self.enabled:
+			print("[e2reactor] Main loop callback statistics %s." % ("enabled" if enabled else "disabled"))
+			self.enabled = enabled
+			self.starts.clear()
+			self.pollCode = E2SharedPoll.poll.__code__
+			if enabled:
+				self.reset()
+			sys.setprofile(self.profile if enabled else None)
+
+	def record(self, name, duration):
+		duration *= 1000
+		bucket = bisect_left(self.BUCKETS, duration)
+		self.histogram[bucket] += 1
+		entry = self.callbacks.get(name)
+		if entry is None:
+			entry = self.callbacks[name] = [0, 0.0, 0.0, [0] * (len(self.BUCKETS) + 1)]
+		entry[0] += 1
+		entry[1] += duration
+		if duration > entry[2]:
+			entry[2] = duration
+		entry[3][bucket] += 1
+		if duration >= self.threshold:
+			print("[e2reactor] Slow callback '%s' blocked the main loop for %d ms." % (name, duration))
+
+	def profile(self, frame, event, arg):
+		# Only Python functions called directly by the enigma poll are timed.
+		back = frame.f_back
+		if back is not None and back.f_code is self.pollCode:
+			if event == "call":
+				self.starts[frame] = monotonic()
+			elif event == "return":
+				start = self.starts.pop(frame, None)
+				if start is not None:
+					self.record(self.getFrameName(frame), monotonic() - start)
+
+	def getFrameName(self, frame):
+		code = frame.f_code
+		name = code.co_name
+		if code.co_argcount and code.co_varnames[0] == "self":
+			name = "%s.%s" % (frame.f_locals["self"].__class__.__name__, name)
+		return "%s (%s:%d)" % (name, code.co_filename, code.co_firstlineno)
+
+	def getCallableName(self, function):
+		code = getattr(function, "__code__", None)
+		if code is None:
+			return repr(function)
+		instance = getattr(function, "__self__", None)
+		name = "%s.%s" % (instance.__class__.__name__, function.__name__) if instance is not None else function.__name__
+		return "%s (%s:%d)" % (name, code.co_filename, code.co_firstlineno)
+
+	def wrap(self, function):
+		def timedCall(*args, **kwargs):
+			start = monotonic()
+			try:
+				return function(*args, **kwargs)
+			finally:
+				self.record(self.getCallableName(function), monotonic() - start)
+		return timedCall
+
+	def getStatistics(self, sortBy=1):
+		"""
+		Return the callbacks as a list of (name, count, total ms, average ms,
+		maximum ms, histogram) tuples sorted descending by the given field of
+		the entries (0 = count, 1 = total time, 2 = maximum time).
+		"""
+		return [(name, entry[0], entry[1], entry[1] / entry[0], entry[2], entry[3][:]) for name, entry in sorted(self.callbacks.items(), key=lambda item: item[1][sortBy], reverse=True)]
+
+	def getHistogram(self):
+		"""Return a list of (upper bound in ms or None, count) tuples for all callbacks."""
+		return list(zip(self.BUCKETS + (None,), self.histogram))
+
+
+callbackStatistics = CallbackStatistics()
+
+
 class E2SharedPoll:
 	def __init__(self):
 		self.dict = {}
@@ -163,7 +266,12 @@ class PollReactor(posixbase.PosixReactorBase):
 				# Handles the infrequent case where one selectable's
 				# handler disconnects another.
 				continue
-			log.callWithLogger(selectable, _drdw, selectable, fd, event, POLLIN, POLLOUT, log)
+			if callbackStatistics.enabled:
+				start = monotonic()
+				log.callWithLogger(selectable, _drdw, selectable, fd, event, POLLIN, POLLOUT, log)
+				callbackStatistics.record("%s.%s" % (selectable.__class__.__name__, "doRead" if event & POLLIN else "doWrite"), monotonic() - start)
+			else:
+				log.callWithLogger(selectable, _drdw, selectable, fd, event, POLLIN, POLLOUT, log)
 
 	doIteration = doPoll
 
@@ -200,9 +308,11 @@ class PollReactor(posixbase.PosixReactorBase):
 		if why:
 			self._disconnectSelectable(selectable, why, inRead)
 
-	def callLater(self, *args, **kwargs):
+	def callLater(self, delay, callable, *args, **kwargs):
 		poller.eApp.interruptPoll()
-		return posixbase.PosixReactorBase.callLater(self, *args, **kwargs)
+		if callbackStatistics.enabled:
+			callable = callbackStatistics.wrap(callable)
+		return posixbase.PosixReactorBase.callLater(self, delay, callable, *args, **kwargs)
 
 
 def install():
@@ -212,4 +322,4 @@ def install():
 	main.installReactor(p)
 
 
-__all__ = ["PollReactor", "install"]
+__all__ = ["PollReactor", "install", "callbackStatistics"]
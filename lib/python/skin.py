@@ -1,7 +1,10 @@
 from xml.etree.cElementTree import Element, ElementTree, fromstring
 
 from enigma import addFont, eLabel, ePixmap, ePoint, eRect, eSize, eWindow, eWindowStyleManager, eWindowStyleSkinned, getDesktop, gFont, getFontFaces, gMainDC, gRGB, BT_ALPHATEST, BT_ALPHABLEND, BT_HALIGN_CENTER, BT_HALIGN_LEFT, BT_HALIGN_RIGHT, BT_KEEP_ASPECT_RATIO, BT_SCALE, BT_VALIGN_BOTTOM, BT_VALIGN_CENTER, BT_VALIGN_TOP
+from os import replace, stat
 from os.path import basename, dirname, isfile
+from pickle import dump as pickleDump, load as pickleLoad
+from xml.parsers.expat import ParserCreate
 
 from Components.config import ConfigSubsection, ConfigText, config
 from Components.Sources.Source import ObsoleteSource
@@ -17,11 +20,54 @@ DEFAULT_DISPLAY_SKIN = "skin_default/skin_display.xml"
 USER_SKIN = "skin_user.xml"
 USER_SKIN_TEMPLATE = "skin_user_%s.xml"
 SUBTITLE_SKIN = "skin_subtitles.xml"
+SKIN_CACHE = "skin.cache"
+SKIN_CACHE_VERSION = 1
 
 GUI_SKIN_ID = 0  # Main frame-buffer.
 DISPLAY_SKIN_ID = 1  # Front panel / display / LCD.
 
-domScreens = {}  # Dictionary of skin based screens.
+
+class LazyScreen:
+	"""
+	Placeholder for a screen element taken from the skin cache.  The screen is
+	only read from the skin file and parsed when it is first used.
+	"""
+	def __init__(self, filename, start, end):
+		self.filename = filename
+		self.start = start
+		self.end = end
+
+	def parse(self):
+		try:
+			with open(self.filename, "rb") as fd:
+				fd.seek(self.start)
+				return fromstring(fd.read(self.end - self.start))
+		except Exception as err:
+			print("[Skin] Error: Unable to read screen at offset %d from '%s'!  (%s)" % (self.start, self.filename, str(err)))
+		return None
+
+
+class ScreenDict(dict):
+	"""
+	Dictionary of skin based screens.  Screens added as LazyScreen placeholders
+	are parsed and replaced by their element on first access.
+	"""
+	def __getitem__(self, name):
+		element, path = dict.__getitem__(self, name)
+		if isinstance(element, LazyScreen):
+			element = element.parse()
+			dict.__setitem__(self, name, (element, path))
+		return (element, path)
+
+	def get(self, name, default=None):
+		return self[name] if name in self else default
+
+
+domScreens = ScreenDict()  # Dictionary of skin based screens.
+screenWidgets = {}  # Dictionary of the widgets and named panels of each skin based screen.
+skinCache = None  # Dictionary of the skin cache records indexed by skin file name, loaded on first use.
+skinCacheFiles = set()  # Skin files used since the last skin (re)load.
+skinCacheChanged = False
 colors = {}  # Dictionary of skin color names.
 BodyFont = ("Regular", 20, 25, 18)  # font which is used when a font alias definition is missing from the "fonts" dict.
 fonts = {}  # Dictionary of predefined and skin defined font aliases.
@@ -68,6 +114,8 @@ def InitSkins(booting=True):
 	# Reset skin dictionaries. We can reload skins without a restart
 	# Make sure we keep the original dictionaries as many modules now import skin globals explicitly
 	domScreens.clear()
+	screenWidgets.clear()
+	skinCacheFiles.clear()
 	colors.clear()
 	fonts.clear()
 	fonts.update({
@@ -121,6 +169,7 @@ def InitSkins(booting=True):
 			loadedUser = loadSkin(name, scope=SCOPE_CURRENT_SKIN, desktop=desktop, screenID=GUI_SKIN_ID)
 	if not loadedUser:
 		loadSkin(USER_SKIN, scope=SCOPE_CURRENT_SKIN, desktop=desktop, screenID=GUI_SKIN_ID)
+	saveSkinCache()
 
 	# done loading the skin data, set the screen resolution. Once.
 	gMainDC.getInstance().setResolution(xres, yres)
@@ -148,21 +197,14 @@ def loadSkin(filename, scope=SCOPE_SKIN, desktop=getDesktop(GUI_SKIN_ID), screen
 	filename = resolveFilename(scope, filename)
 	if isfile(filename):
 		print("[Skin] Loading skin file '%s'." % filename)
-		domSkin = fileReadXML(filename)
-		if domSkin:
+		domSkin, screens = readSkinFile(filename)
+		if domSkin is not None:
 			print("[Skin] DEBUG: Extracting non screen blocks from '%s'.  (scope='%s')" % (filename, {SCOPE_CONFIG: "SCOPE_CONFIG", SCOPE_CURRENT_LCDSKIN: "SCOPE_CURRENT_LCDSKIN", SCOPE_CURRENT_SKIN: "SCOPE_CURRENT_SKIN", SCOPE_FONTS: "SCOPE_FONTS", SCOPE_SKIN: "SCOPE_SKIN", SCOPE_SKIN_IMAGE: "SCOPE_SKIN_IMAGE"}.get(scope, scope)))
 			# For loadSingleSkinData colors, bordersets etc. are applied one after
 			# the other in order of ascending priority.
 			loadSingleSkinData(desktop, screenID, domSkin, filename, scope=scope)
 			for element in domSkin:
-				if element.tag == "screen":  # Process all screen elements.
-					name = element.attrib.get("name", None)
-					if name:  # Without a name, it's useless!
-						scrnID = element.attrib.get("id", None)
-						if scrnID is None or scrnID == screenID:  # If there is a screen ID is it for this display.
-							# print("[Skin] DEBUG: Extracting screen '%s' from '%s'.  (scope='%s')" % (name, filename, scope))
-							domScreens[name] = (element, "%s/" % dirname(filename))
-				elif element.tag == "windowstyle":  # Process the windowstyle element.
+				if element.tag == "windowstyle":  # Process the windowstyle element.
 					scrnID = element.attrib.get("id", None)
 					if scrnID is not None:  # Without an scrnID, it is useless!
 						scrnID = int(scrnID)
@@ -170,13 +212,127 @@ def loadSkin(filename, scope=SCOPE_SKIN, desktop=getDesktop(GUI_SKIN_ID), screen
 						domStyle = ElementTree(Element("skin"))
 						domStyle.getroot().append(element)
 						windowStyles[scrnID] = (desktop, screenID, domStyle.getroot(), filename, scope)
-				# Element is not a screen or windowstyle element so no need for it any longer.
+				# Element is not a windowstyle element so no need for it any longer.
+			for name, scrnID, element, widgets in screens:  # Process all screen elements.
+				if scrnID is None or scrnID == screenID:  # If there is a screen ID is it for this display.
+					# print("[Skin] DEBUG: Extracting screen '%s' from '%s'.  (scope='%s')" % (name, filename, scope))
+					domScreens[name] = (element, "%s/" % dirname(filename))
+					screenWidgets[name] = widgets
 			reloadWindowStyles()  # Reload the window style to ensure all skin changes are taken into account.
 			print("[Skin] Loading skin file '%s' complete." % filename)
 			return True
 	return False
 
 
+def readSkinFile(filename):
+	"""
+	Return the skin element without its screens and a list of (name, id,
+	element, widgets) tuples for the named screens of a skin file.  The skin
+	cache keeps the byte range and the widgets of every screen so that, while
+	the file is unchanged (same mtime and size), only the non screen blocks
+	need to be parsed and the screens are parsed lazily when first used.
+	"""
+	global skinCache, skinCacheChanged
+	if skinCache is None:
+		skinCache = {}
+		cacheFile = resolveFilename(SCOPE_CONFIG, SKIN_CACHE)
+		if isfile(cacheFile):
+			try:
+				with open(cacheFile, "rb") as fd:
+					cache = pickleLoad(fd)
+				if cache.get("version") == SKIN_CACHE_VERSION:
+					skinCache = cache["files"]
+			except Exception as err:
+				print("[Skin] Error: Unable to read skin cache '%s'!  (%s)" % (cacheFile, str(err)))
+	skinCacheFiles.add(filename)
+	try:
+		status = stat(filename)
+		record = skinCache.get(filename)
+		if record and record["mtime"] == status.st_mtime and record["size"] == status.st_size:
+			return fromstring(record["skeleton"]), [(name, scrnID, LazyScreen(filename, start, end), widgets) for name, scrnID, start, end, widgets in record["screens"]]
+		with open(filename, "rb") as fd:
+			data = fd.read()
+		domSkin = fromstring(data)
+		offsets = getElementOffsets(data)
+	except Exception as err:
+		print("[Skin] Error: Unable to read skin file '%s'!  (%s)" % (filename, str(err)))
+		return None, None
+	screens = []
+	cached = []
+	skeleton = []
+	position = 0
+	for element, (start, end) in zip(list(domSkin), offsets):
+		if element.tag == "screen":
+			domSkin.remove(element)
+			skeleton.append(data[position:start])
+			position = end
+			name = element.attrib.get("name", None)
+			if name:  # Without a name, it's useless!
+				scrnID = element.attrib.get("id", None)
+				widgets = getScreenWidgets(element)
+				screens.append((name, scrnID, element, widgets))
+				cached.append((name, scrnID, start, end, widgets))
+	skeleton.append(data[position:])
+	skinCache[filename] = {
+		"mtime": status.st_mtime,
+		"size": status.st_size,
+		"skeleton": b"".join(skeleton),
+		"screens": cached
+	}
+	skinCacheChanged = True
+	return domSkin, screens
+
+
+def getElementOffsets(data):
+	"""Return the (start, end) byte offsets of the children of the root element of an XML document."""
+	offsets = []
+	state = [0, 0, False]  # Element depth, start offset of the current child, current child has content.
+	parser = ParserCreate()
+
+	def startElement(tag, attributes):
+		state[0] += 1
+		if state[0] == 2:
+			state[1] = parser.CurrentByteIndex
+			state[2] = False
+		elif state[0] > 2:
+			state[2] = True
+
+	def endElement(tag):
+		if state[0] == 2:
+			index = parser.CurrentByteIndex
+			if state[2] or data[index - 2:index] != b"/>":  # For an empty element "<tag/>" expat reports the offset after the element.
+				index = data.index(b">", index) + 1
+			offsets.append((state[1], index))
+		state[0] -= 1
+
+	def characterData(text):
+		state[2] = True
+
+	parser.StartElementHandler = startElement
+	parser.EndElementHandler = endElement
+	parser.CharacterDataHandler = characterData
+	parser.Parse(data, True)
+	return offsets
+
+
+def saveSkinCache():
+	global skinCacheChanged
+	if skinCache is None:
+		return
+	for filename in [x for x in skinCache if x not in skinCacheFiles]:  # Forget skins that are no longer used.
+		del skinCache[filename]
+		skinCacheChanged = True
+	if skinCacheChanged:
+		cacheFile = resolveFilename(SCOPE_CONFIG, SKIN_CACHE)
+		try:
+			with open("%s.tmp" % cacheFile, "wb") as fd:
+				pickleDump({"version": SKIN_CACHE_VERSION, "files": skinCache}, fd)
+			replace("%s.tmp" % cacheFile, cacheFile)
+			skinCacheChanged = False
+		except (IOError, OSError) as err:
+			print("[Skin] Error: Unable to write skin cache '%s'!  (%s)" % (cacheFile, str(err)))
+
+
 def addOnLoadCallback(callback):
 	if callback not in onLoadCallbacks:
 		onLoadCallbacks.append(callback)
@@ -1392,11 +1548,10 @@ def readSkin(screen, skin, names, desktop):
 	usedComponents = None
 
 
-def findWidgets(name):
+def getScreenWidgets(element):
 	"""
-	Return a set of all the widgets found in a screen. Panels will be expanded
-	recursively until all referenced widgets are captured. This code only performs
-	a simple scan of the XML and no skin processing is performed.
+	Return the widgets of a screen element and the names of the panels it
+	refers to.  Nameless panels are expanded in place.
 	"""
 	def recurseNamelessPanel(panel):
 		widgets = panel.findall("widget")
@@ -1413,34 +1568,53 @@ def findWidgets(name):
 			for childPanel in panels:
 				name = childPanel.get("name", None)
 				if name:
-					widgetSet.update(findWidgets(name))
+					panelNames.append(name)
 				else:
 					recurseNamelessPanel(childPanel)
 
 	widgetSet = set()
-	element, path = domScreens.get(name, (None, None))
-	if element is not None:
-		widgets = element.findall("widget")
-		if widgets is not None:
-			for widget in widgets:
-				name = widget.get("name", None)
-				if name is not None:
-					widgetSet.add(name)
-				source = widget.get("source", None)
-				if source is not None:
-					widgetSet.add(source)
-				addonConnection = widget.get("connection", None)
-				if addonConnection is not None:
-					for x in addonConnection.split(","):
-						widgetSet.add(x)
-		panels = element.findall("panel")
-		if panels is not None:
-			for panel in panels:
-				name = panel.get("name", None)
-				if name:
-					widgetSet.update(findWidgets(name))
-				else:
-					recurseNamelessPanel(panel)
+	panelNames = []
+	widgets = element.findall("widget")
+	if widgets is not None:
+		for widget in widgets:
+			name = widget.get("name", None)
+			if name is not None:
+				widgetSet.add(name)
+			source = widget.get("source", None)
+			if source is not None:
+				widgetSet.add(source)
+			addonConnection = widget.get("connection", None)
+			if addonConnection is not None:
+				for x in addonConnection.split(","):
+					widgetSet.add(x)
+	panels = element.findall("panel")
+	if panels is not None:
+		for panel in panels:
+			name = panel.get("name", None)
+			if name:
+				panelNames.append(name)
+			else:
+				recurseNamelessPanel(panel)
+	return (frozenset(widgetSet), tuple(panelNames))
+
+
+def findWidgets(name):
+	"""
+	Return a set of all the widgets found in a screen. Panels will be expanded
+	recursively until all referenced widgets are captured. This code only performs
+	a simple scan of the XML and no skin processing is performed.  The widgets of
+	each screen are collected when the skin is loaded, so the screen itself does
+	not need to be parsed.
+	"""
+	widgets = screenWidgets.get(name)
+	if widgets is None:
+		element, path = domScreens.get(name, (None, None))
+		if element is None:
+			return set()
+		widgets = screenWidgets[name] = getScreenWidgets(element)
+	widgetSet = set(widgets[0])
+	for panel in widgets[1]:
+		widgetSet.update(findWidgets(panel))
 	return widgetSet
 
 
@@ -1,9 +1,75 @@
-from bisect import insort
+from bisect import bisect_left, insort
+from heapq import heapify, heappop, heappush
 from time import time, localtime, mktime
 from enigma import eTimer, eActionMap
 import datetime
 
 
+# The occurrences of a repeated timer, expanded from the local (wall clock)
+# time of day of its begin and end, so they keep their local time across
+# daylight saving changes. Occurrences at a local time which does not exist
+# on a day (skipped by a daylight saving change) are left out.
+# Occurrences are only calculated once and extended on demand.
+class RepeatedOccurrences:
+	def __init__(self, begin, end, repeated):
+		self.localBegin = localtime(begin)
+		self.localEnd = localtime(end)
+		beginDate = datetime.date(self.localBegin.tm_year, self.localBegin.tm_mon, self.localBegin.tm_mday)
+		endDate = datetime.date(self.localEnd.tm_year, self.localEnd.tm_mon, self.localEnd.tm_mday)
+		self.pattern = (repeated, self.localBegin[3:6], self.localEnd[3:6], (endDate - beginDate).days)
+		self.nextDate = beginDate
+		self.begins = []
+		self.ends = []
+
+	def update(self, begin, end, repeated):
+		# re-use the calculated occurrences when only the day of the timer changed
+		occurrences = RepeatedOccurrences(begin, end, repeated)
+		if occurrences.pattern != self.pattern or (self.begins and begin < self.begins[0]) or (not self.begins and occurrences.nextDate < self.nextDate):
+			return occurrences
+		self.localBegin = occurrences.localBegin
+		self.localEnd = occurrences.localEnd
+		return self
+
+	@staticmethod
+	def makeTime(date, hms):
+		t = int(mktime((date.year, date.month, date.day, hms[0], hms[1], hms[2], 0, 0, -1)))
+		return t if localtime(t).tm_hour == hms[0] else None
+
+	def extend(self, days=14):
+		repeated, beginTime, endTime, span = self.pattern
+		for x in range(days):
+			date = self.nextDate
+			self.nextDate += datetime.timedelta(days=1)
+			if repeated & (1 << date.weekday()):
+				begin = self.makeTime(date, beginTime)
+				end = self.makeTime(date + datetime.timedelta(days=span), endTime)
+				if begin is not None and end is not None:
+					self.begins.append(begin)
+					self.ends.append(end)
+
+	# the first occurrence which begins at or after minBegin and
+	# ends (running=True) or begins (running=False) at or after now
+	def getNext(self, minBegin, now, running=True):
+		while True:
+			index = max(bisect_left(self.begins, minBegin), bisect_left(self.ends if running else self.begins, now))
+			if index < len(self.begins):
+				break
+			self.extend()
+		if index > 64:  # forget the past
+			del self.begins[:index]
+			del self.ends[:index]
+			index = 0
+		return self.begins[index], self.ends[index]
+
+	# all occurrences which begin within start..end
+	def getBetween(self, start, end):
+		while not self.begins or self.begins[-1] < end:
+			self.extend()
+		first = bisect_left(self.begins, start)
+		last = bisect_left(self.begins, end)
+		return list(zip(self.begins[first:last], self.ends[first:last]))
+
+
 class TimerEntry:
 	StateWaiting = 0  # Waiting for the recording start time
 	StatePrepared = 1  # Pre recording preparation has been completed, about to start recording
@@ -19,6 +85,18 @@ class TimerEntry:
 		4: "Failed"
 	}
 
+	# The attributes getNextActivation() depends on. Setting one of them
+	# re-schedules the entry in the activation heap of its Timer, so it does
+	# not matter whether the code changing it calls Timer.timeChanged().
+	ActivationAttributes = frozenset(("begin", "end", "start_prepare", "state", "disabled"))
+
+	def __setattr__(self, name, value):
+		object.__setattr__(self, name, value)
+		if name in self.ActivationAttributes:
+			scheduler = self.__dict__.get("activationScheduler")
+			if scheduler is not None:
+				scheduler.activationChanged(self)
+
 	def __init__(self, begin, end):
 		self.begin = begin
 		self.prepare_time = 20
@@ -28,6 +106,8 @@ class TimerEntry:
 		self.findNextEvent = False
 		self.resetRepeated()
 		self.repeatedbegindate = begin
+		self.occurrences = None
+		self.occurrencesKey = None
 		self.backoff = 0
 
 		self.disabled = False
@@ -64,6 +144,17 @@ class TimerEntry:
 	def isFindNextEvent(self):
 		return self.findNextEvent
 
+	# the (cached) occurrences of a repeated timer, recalculated when begin, end or repeated change
+	def getRepeatedOccurrences(self):
+		key = (self.begin, self.end, self.repeated)
+		if self.occurrencesKey != key:
+			self.occurrencesKey = key
+			if self.occurrences is None:
+				self.occurrences = RepeatedOccurrences(self.begin, self.end, self.repeated)
+			else:
+				self.occurrences = self.occurrences.update(self.begin, self.end, self.repeated)
+		return self.occurrences
+
 	# update self.begin and self.end according to the self.repeated-flags
 	def processRepeated(self, findRunningEvent=True, findNextEvent=False):
 		if self.repeated != 0:
@@ -72,31 +163,12 @@ class TimerEntry:
 				now = self.end + 120
 			self.findRunningEvent = findRunningEvent
 			self.findNextEvent = findNextEvent
-			# to avoid problems with daylight saving, we need to calculate with localtime, in struct_time representation
-			localrepeatedbegindate = localtime(self.repeatedbegindate)
-			localbegin = localtime(self.begin)
-			localend = localtime(self.end)
-			localnow = localtime(now)
-
-			day = []
-			flags = self.repeated
-			for x in (0, 1, 2, 3, 4, 5, 6):
-				if flags & 1 == 1:
-					day.append(0)
-				else:
-					day.append(1)
-				flags >>= 1
-
-			# if day is NOT in the list of repeated days
-			# OR if the day IS in the list of the repeated days, check, if event is currently running... then if findRunningEvent is false, go to the next event
-			while ((day[localbegin.tm_wday] != 0) or (mktime(localrepeatedbegindate) > mktime(localbegin)) or
-				(day[localbegin.tm_wday] == 0 and (findRunningEvent and localend < localnow) or ((not findRunningEvent) and localbegin < localnow))):
-				localbegin = self.addOneDay(localbegin)
-				localend = self.addOneDay(localend)
-
-			# we now have a struct_time representation of begin and end in localtime, but we have to calculate back to (gmt) seconds since epoch
-			self.begin = int(mktime(localbegin))
-			self.end = int(mktime(localend))
+
+			# the first occurrence on a repeated day, not before the repeat begin date and
+			# (if findRunningEvent is true) still running or (otherwise) not started yet
+			begin, end = self.getRepeatedOccurrences().getNext(max(self.begin, self.repeatedbegindate), now, findRunningEvent)
+			self.begin = begin
+			self.end = end
 			if self.begin == self.end:
 				self.end += 1
 
@@ -158,6 +230,32 @@ class TimerEntry:
 		self.disabled = False
 
 
+# The timer_list of a Timer. It is still a plain list kept sorted with insort(),
+# but every entry which gets added or removed is also (un)scheduled in the
+# activation heap of the Timer owning the list.
+class TimerList(list):
+	def __init__(self, owner):
+		list.__init__(self)
+		self.owner = owner
+
+	def insert(self, index, entry):
+		list.insert(self, index, entry)
+		self.owner.scheduleEntry(entry)
+
+	def append(self, entry):
+		list.append(self, entry)
+		self.owner.scheduleEntry(entry)
+
+	def remove(self, entry):
+		list.remove(self, entry)
+		self.owner.unscheduleEntry(entry)
+
+	def pop(self, index=-1):
+		entry = list.pop(self, index)
+		self.owner.unscheduleEntry(entry)
+		return entry
+
+
 class Timer:
 	# the time between "polls". We do this because
 	# we want to account for time jumps etc.
@@ -178,9 +276,81 @@ class Timer:
 		self.timer.callback.append(self.calcNextActivation)
 		self.lastActivation = time()
 
+		# saveTimer() requests are coalesced, see saveTimer()
+		self.saveTimerPending = False
+		self.saveTimerTimer = eTimer()
+		self.saveTimerTimer.callback.append(self.flushTimer)
+
 		self.calcNextActivation()
 		self.on_state_change = []
 
+	def setTimerList(self, entries):
+		# the activation heap holds [next activation, sequence, entry] items.
+		# Items are never removed from the middle of the heap, instead the
+		# entry's current sequence number is kept in self.scheduled and items
+		# with an outdated sequence number are dropped when they surface.
+		self.activations = []
+		self.scheduled = {}
+		self.disabledEntries = []
+		self.activationSequence = 0
+		self.__timer_list = TimerList(self)
+		for entry in entries:
+			self.__timer_list.append(entry)
+
+	timer_list = property(lambda self: self.__timer_list, setTimerList)
+
+	def scheduleEntry(self, entry):
+		self.activationSequence += 1
+		self.scheduled[entry] = self.activationSequence
+		entry.activationScheduler = self
+		heappush(self.activations, [entry.getNextActivation(), self.activationSequence, entry])
+		if len(self.activations) > 2 * len(self.scheduled) + 100:
+			# Drop the outdated items, entries of far in the future surface late.
+			self.activations[:] = [item for item in self.activations if self.scheduled.get(item[2]) == item[1]]  # In place, getNextActivationItem() may be iterating over it.
+			heapify(self.activations)
+
+	def unscheduleEntry(self, entry):
+		self.scheduled.pop(entry, None)
+
+	# Called by an entry of the list when an attribute its activation time
+	# depends on was changed in place.
+	def activationChanged(self, entry):
+		if entry in self.scheduled:
+			self.scheduleEntry(entry)
+
+	# Returns the heap item of the enabled entry which has to be activated
+	# next. Outdated items are dropped, items of entries whose activation time
+	# changed in place are re-sorted and disabled entries are put aside until
+	# they are enabled again. Changes of the activation time that do not go
+	# through the attributes of TimerEntry.ActivationAttributes, e.g. a time
+	# computed from other attributes in a subclass, are only noticed when the
+	# item surfaces, such changes must be followed by Timer.timeChanged().
+	def getNextActivationItem(self):
+		if self.disabledEntries:
+			disabledEntries = self.disabledEntries
+			self.disabledEntries = []
+			for entry in disabledEntries:
+				if entry in self.scheduled:
+					if entry.disabled:
+						self.disabledEntries.append(entry)
+					else:
+						self.scheduleEntry(entry)
+		activations = self.activations
+		while activations:
+			item = activations[0]
+			entry = item[2]
+			if self.scheduled.get(entry) != item[1]:
+				heappop(activations)
+			elif entry.disabled:
+				heappop(activations)
+				self.disabledEntries.append(entry)
+			elif item[0] != entry.getNextActivation():
+				heappop(activations)
+				self.scheduleEntry(entry)
+			else:
+				return item
+		return None
+
 	def stateChanged(self, entry):
 		for f in self.on_state_change:
 			f(entry)
@@ -250,6 +420,33 @@ class Timer:
 				print "no NAV" .
 	'''
 
+	# Writing the timer list is expensive (and fsyncs), so saveTimer() only marks
+	# the list as dirty and writes it once the save delay has expired. Multiple
+	# changes within the delay result in a single write. flushTimer() writes
+	# a pending change immediately and must be used before shutting down.
+	def saveTimer(self):
+		delay = self.getSaveDelay()
+		if delay <= 0:
+			self.saveTimerPending = True
+			self.flushTimer()
+		elif not self.saveTimerPending:
+			self.saveTimerPending = True
+			self.saveTimerTimer.start(delay, True)
+
+	def flushTimer(self):
+		self.saveTimerTimer.stop()
+		if self.saveTimerPending:
+			self.saveTimerPending = False
+			self.writeTimer()
+
+	# can be overridden, delay in ms between saveTimer() and the actual write
+	def getSaveDelay(self):
+		return 0
+
+	# must be overridden
+	def writeTimer(self):
+		pass
+
 	def setNextActivation(self, now, when):
 		delay = int((when - now) * 1000)
 		self.timer.start(delay, 1)
@@ -271,14 +468,10 @@ class Timer:
 
 		min = int(now) + self.MaxWaitTime
 
-		self.timer_list and self.timer_list.sort()  # resort/refresh list, try to fix hanging timers
-
 		# calculate next activation point
-		timer_list = [t for t in self.timer_list if not t.disabled]
-		if timer_list:
-			w = timer_list[0].getNextActivation()
-			if w < min:
-				min = w
+		item = self.getNextActivationItem()
+		if item and item[0] < min:
+			min = item[0]
 
 		if int(now) < 1072224000 and min > now + 5:
 			# system time has not yet been set (before 01.01.2004), keep a short poll interval
@@ -353,18 +546,20 @@ class Timer:
 		#
 
 		wasActivated = False
+		busy = []  # items of entries which are currently being activated
 		while True:
-			entry = None
-			for tmr in self.timer_list:
-				if not tmr.disabled and not getattr(tmr, "currentlyActivated", False):
-					entry = tmr
-					break
-			if entry and entry.getNextActivation() < t:
-				entry.currentlyActivated = True
-				self.doActivate(entry, False)
-				del entry.currentlyActivated
-				wasActivated = True
-			else:
+			item = self.getNextActivationItem()
+			if item is None or item[0] >= t:
 				break
+			entry = item[2]
+			if getattr(entry, "currentlyActivated", False):
+				busy.append(heappop(self.activations))
+				continue
+			entry.currentlyActivated = True
+			self.doActivate(entry, False)
+			del entry.currentlyActivated
+			wasActivated = True
+		for item in busy:
+			heappush(self.activations, item)
 		if wasActivated and dosave:
 			self.saveTimer()
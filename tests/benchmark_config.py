@@ -0,0 +1,130 @@
+# Benchmark for loading and saving the settings file with Components.config.
+#
+# Creates a synthetic config tree with several thousand entries (like a box
+# with many plugins installed) and measures Config.unpickle() of a base and a
+# non-base settings file and Config.pickle() after changing a single value,
+# against the previous implementation (eval() per key, full re-sort per pickle).
+#
+# Run with:
+#   PYTHONPATH=../lib/python python benchmark_config.py [number of sections] [entries per section]
+
+import builtins
+import sys
+import types
+from timeit import default_timer
+
+
+# minimal replacements for the modules Components.config imports, only what config.py needs at import time
+def stub(name, **attributes):
+	module = types.ModuleType(name)
+	module.__dict__.update(attributes)
+	sys.modules[name] = module
+
+
+stub("enigma", getPrevAsciiCode=lambda: 0)
+stub("Tools.NumericalTextInput", NumericalTextInput=type("NumericalTextInput", (), {"__init__": lambda self, *args, **kwargs: None}))
+stub("Tools.Directories", resolveFilename=lambda scope, base="": "/nonexistent/" + base, SCOPE_CONFIG=0, fileExists=lambda *args: False)
+stub("Components.Harddisk", harddiskmanager=None)
+builtins._ = lambda text: text
+
+from Components.config import Config, ConfigInteger, ConfigSubsection, ConfigText, ConfigYesNo  # noqa: E402
+import Components.config  # noqa: E402
+
+
+class LegacyConfig(Config):
+	# pickle_this() and unpickle() as they were before
+	def pickle_this(self, prefix, topickle, result):
+		for (key, val) in sorted(topickle.items(), key=lambda x: int(x[0]) if x[0].isdigit() else x[0].lower()):
+			name = '.'.join((prefix, key))
+			if isinstance(val, dict):
+				self.pickle_this(name, val, result)
+			elif isinstance(val, tuple):
+				result += [name, '=', str(val[0]), '\n']
+			else:
+				result += [name, '=', str(val), '\n']
+
+	def unpickle(self, lines, base_file=True):
+		tree = {}
+		configbase = tree.setdefault("config", {})
+		for element in lines:
+			if not element or element[0] == '#':
+				continue
+			result = element.split('=', 1)
+			if len(result) != 2:
+				continue
+			(name, val) = result
+			val = val.strip()
+			names = name.split('.')
+			base = configbase
+			for n in names[1:-1]:
+				base = base.setdefault(n, {})
+			base[names[-1]] = val
+			if not base_file:
+				try:
+					configEntry = eval(name, {"config": self})
+					if configEntry is not None:
+						configEntry.value = val
+				except (SyntaxError, KeyError):
+					pass
+		if "config" in tree:
+			self.setSavedValue(tree["config"])
+
+
+def build(configClass, sections, entries):
+	config = configClass()
+	config.plugins = ConfigSubsection()
+	for section in range(sections):
+		subsection = ConfigSubsection()
+		setattr(config.plugins, "Plugin%d" % section, subsection)
+		for entry in range(entries):
+			setattr(subsection, "text%d" % entry, ConfigText(default=""))
+			setattr(subsection, "number%d" % entry, ConfigInteger(default=0))
+			setattr(subsection, "enabled%d" % entry, ConfigYesNo(default=False))
+	return config
+
+
+def settings(sections, entries):
+	lines = []
+	for section in range(sections):
+		for entry in range(entries):
+			lines.append("config.plugins.Plugin%d.text%d=some text %d\n" % (section, entry, entry))
+			lines.append("config.plugins.Plugin%d.number%d=%d\n" % (section, entry, entry + 1))
+			lines.append("config.plugins.Plugin%d.enabled%d=True\n" % (section, entry))
+	return sorted(lines)
+
+
+def measure(function, repeat=5):
+	best = None
+	for x in range(repeat):
+		start = default_timer()
+		function()
+		duration = default_timer() - start
+		best = duration if best is None else min(best, duration)
+	return best * 1000
+
+
+def main():
+	sections = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+	entries = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+	lines = settings(sections, entries)
+	print("%d settings in %d sections" % (len(lines), sections))
+	for name, configClass in (("legacy", LegacyConfig), ("current", Config)):
+		config = build(configClass, sections, entries)
+		Components.config.config = config
+		load = measure(lambda: config.unpickle(lines, True))
+		loadNonBase = measure(lambda: config.unpickle(lines, False))
+		config.pickle()
+		element = config.plugins.Plugin0.text0
+		changes = iter(range(1000))
+
+		def change():
+			element.value = "changed %d" % next(changes)
+			element.save()
+			config.pickle()
+
+		save = measure(change)
+		print("%-8s load: %8.1f ms   load non-base: %8.1f ms   save one change: %8.1f ms" % (name, load, loadNonBase, save))
+
+
+if __name__ == "__main__":
+	main()
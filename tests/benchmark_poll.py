@@ -0,0 +1,130 @@
+# Wakeup count of the converter poll timers.
+#
+# Simulates the Poll converters of a typical infobar plus LCD skin on a
+# virtual clock and counts the main loop wakeups (distinct times at which at
+# least one timer fires) per second, for one timer per converter as before and
+# for the shared Components.Converter.Poll scheduler.  The scheduler statistics
+# are printed as well, as they would be reported on a box.
+#
+# Run with:
+#   PYTHONPATH=../lib/python python benchmark_poll.py [seconds]
+
+import sys
+import types
+
+# (poll interval in ms, number of converters) for an infobar plus LCD skin
+CONVERTERS = [(100, 2), (500, 3), (1000, 12), (2000, 4), (5000, 6), (30000, 2), (60000, 5)]
+
+
+class Clock:
+	def __init__(self):
+		self.now = 0  # in ms
+		self.timers = []
+
+	def time(self):
+		return 1700000000.0 + self.now / 1000.0  # an arbitrary phase of the wall clock
+
+	def run(self, duration):
+		wakeups = 0
+		end = self.now + duration
+		while True:
+			active = [timer for timer in self.timers if timer.due is not None]
+			if not active:
+				break
+			due = min(timer.due for timer in active)
+			if due > end:
+				break
+			self.now = due
+			wakeups += 1
+			for timer in active:
+				if timer.due == due:
+					timer.fire()
+		self.now = end
+		return wakeups
+
+
+clock = Clock()
+
+
+class eTimer:
+	def __init__(self):
+		self.callback = []
+		self.due = None
+		clock.timers.append(self)
+
+	def start(self, msec, singleshot=False):
+		self.interval = msec
+		self.singleshot = singleshot
+		self.due = clock.now + msec
+
+	def stop(self):
+		self.due = None
+
+	def fire(self):
+		self.due = None if self.singleshot else clock.now + self.interval
+		for callback in self.callback[:]:
+			callback()
+
+
+stub = types.ModuleType("enigma")
+stub.eTimer = eTimer
+sys.modules["enigma"] = stub
+stub = types.ModuleType("Components.GUIComponent")
+stub.GUIComponent = type("GUIComponent", (), {})
+sys.modules["Components.GUIComponent"] = stub
+
+import Components.Converter.Poll  # noqa: E402
+from Components.Converter.Poll import Poll  # noqa: E402
+
+Components.Converter.Poll.time = clock.time
+
+
+class LegacyPoll:
+	# one eTimer per converter as before the shared scheduler
+	def __init__(self, interval):
+		self.timer = eTimer()
+		self.timer.callback.append(self.poll)
+		self.timer.start(interval)
+
+	def poll(self):
+		pass
+
+
+class Converter(Poll):
+	CHANGED_POLL = 4
+
+	def __init__(self, interval):
+		Poll.__init__(self)
+		self.downstream_elements = []
+		self.poll_interval = interval
+		self.poll_enabled = True
+
+	def changed(self, what):
+		pass
+
+
+def main():
+	duration = int(sys.argv[1]) * 1000 if len(sys.argv) > 1 else 600000
+	count = sum(number for interval, number in CONVERTERS)
+	print("%d converters, %d s" % (count, duration // 1000))
+	elements = []
+	for interval, number in CONVERTERS:
+		for x in range(number):
+			clock.now += 37  # converters are created while the skin is applied, at slightly different times
+			elements.append(LegacyPoll(interval))
+	print("%-8s wakeups/s: %6.2f" % ("legacy", clock.run(duration) * 1000.0 / duration))
+	for element in elements:
+		element.timer.stop()
+	elements = []
+	for interval, number in CONVERTERS:
+		for x in range(number):
+			clock.now += 37
+			elements.append(Converter(interval))
+	scheduler = Components.Converter.Poll.pollScheduler
+	scheduler.resetStatistics()
+	print("%-8s wakeups/s: %6.2f" % ("shared", clock.run(duration) * 1000.0 / duration))
+	print("scheduler statistics: %s" % ", ".join("%s=%.2f" % item for item in sorted(scheduler.getStatistics().items())))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,126 @@
+# Microbenchmark for the activation scheduling of timer.Timer.
+#
+# Compares the cost of a timer poll (calcNextActivation) and of activating
+# timers with the activation heap against the previous implementation, which
+# re-sorted and re-scanned the whole timer_list on every poll.
+#
+# Run with:
+#   PYTHONPATH=../lib/python python benchmark_timer.py [number of timers]
+
+import sys
+import types
+from bisect import insort
+from time import time
+from timeit import default_timer
+
+
+# minimal enigma replacement, only what timer.py needs
+class eTimer:
+	def __init__(self):
+		self.callback = []
+
+	def start(self, msec, singleshot=False):
+		pass
+
+	def stop(self):
+		pass
+
+
+enigma = types.ModuleType("enigma")
+enigma.eTimer = eTimer
+enigma.eActionMap = None
+sys.modules["enigma"] = enigma
+
+from timer import Timer, TimerEntry  # noqa: E402
+
+
+class BenchTimerEntry(TimerEntry):
+	def __init__(self, begin, end):
+		TimerEntry.__init__(self, begin, end)
+		self.resetState()
+
+	def getNextActivation(self):
+		if self.state == self.StateEnded or self.state == self.StateFailed:
+			return self.end
+		return {self.StatePrepared: self.begin - 20,
+				self.StateRunning: self.begin,
+				self.StateEnded: self.end}[self.state + 1]
+
+	def activate(self):
+		return True
+
+
+class HeapTimer(Timer):
+	pass
+
+
+class LegacyTimer(Timer):
+	# calcNextActivation() and processActivation() as they were before the activation heap
+	def calcNextActivation(self, dosave=True):
+		now = time()
+		self.processActivation(dosave)
+		self.lastActivation = now
+		min = int(now) + self.MaxWaitTime
+		self.timer_list and self.timer_list.sort()
+		timer_list = [t for t in self.timer_list if not t.disabled]
+		if timer_list:
+			w = timer_list[0].getNextActivation()
+			if w < min:
+				min = w
+		self.setNextActivation(now, min)
+
+	def processActivation(self, dosave):
+		t = int(time()) + 1
+		while True:
+			entry = None
+			for tmr in self.timer_list:
+				if not tmr.disabled and not getattr(tmr, "currentlyActivated", False):
+					entry = tmr
+					break
+			if entry and entry.getNextActivation() < t:
+				entry.currentlyActivated = True
+				self.doActivate(entry, False)
+				del entry.currentlyActivated
+			else:
+				break
+
+
+def fill(timer, count, now):
+	for x in range(count):
+		begin = now + 3600 + x * 300
+		entry = BenchTimerEntry(begin, begin + 1800)
+		entry.disabled = x % 10 == 0
+		insort(timer.timer_list, entry)
+
+
+def benchPolls(timerClass, count, polls):
+	timer = timerClass()
+	fill(timer, count, int(time()))
+	start = default_timer()
+	for x in range(polls):
+		timer.calcNextActivation(False)
+	return (default_timer() - start) / polls
+
+
+def benchActivations(timerClass, count):
+	# all timers have started but not ended yet, so the poll moves every
+	# one of them through the prepared and running states
+	timer = timerClass()
+	now = int(time())
+	for x in range(count):
+		insort(timer.timer_list, BenchTimerEntry(now - 60 - x, now + 7200 + x))
+	start = default_timer()
+	timer.calcNextActivation(False)
+	return default_timer() - start
+
+
+def main():
+	count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+	polls = 200
+	print("%d timers" % count)
+	for name, timerClass in (("legacy", LegacyTimer), ("heap", HeapTimer)):
+		print("%-8s poll: %8.1f us   activate all: %8.1f ms" % (name, benchPolls(timerClass, count, polls) * 1e6, benchActivations(timerClass, count) * 1e3))
+
+
+if __name__ == "__main__":
+	main()